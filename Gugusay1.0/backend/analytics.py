@@ -0,0 +1,231 @@
+# 统计分析模块：把 JL 的时间、渠道、字数一次性载入紧凑的列式数组，按时间粒度和渠道做向量化聚合
+# 用 NumPy 的 bincount 聚合（build.py 会一并打包）；从源码运行且未安装时退回到逐行计数（结果相同，只是慢一些）
+import threading
+import time
+from array import array
+from datetime import date
+
+GRANULARITIES = ('year', 'month', 'day', 'weekday', 'hour')
+# weekday 和 hour 的桶是固定的，没有记录的桶也返回 0
+FIXED_BUCKETS = {'weekday': range(7), 'hour': range(24)}
+SCAN_BATCH = 5000
+
+
+def _numpy():
+    try:
+        import numpy
+    except Exception:
+        return None
+    return numpy
+
+
+def _parse_datetime(text):
+    """'YYYY-MM-DD HH:MM:SS' -> (year, month, ordinal, hour)；没有时间部分时 hour 为 -1，无法解析时返回 None"""
+    try:
+        day = date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+    except (TypeError, ValueError):
+        return None
+    hour = text[11:13]
+    return day.year, day.month, day.toordinal(), int(hour) if hour.isdigit() and int(hour) < 24 else -1
+
+
+class Snapshot:
+    """某一数据版本下 JL 的列式快照：每条记录占 13 字节，渠道名存为下标"""
+
+    def __init__(self, version):
+        self.version = version
+        self.years = array('h')
+        self.months = array('b')
+        self.ordinals = array('i')
+        self.hours = array('b')
+        self.channel_codes = array('h')
+        self.lengths = array('i')
+        self.channels = []
+        self.skipped = 0
+        self.build_ms = 0.0
+        self._columns = None
+
+    def load(self, conn):
+        started = time.perf_counter()
+        codes = {}
+        cursor = conn.execute('SELECT datetime, channel, LENGTH(content) FROM JL')
+        while True:
+            rows = cursor.fetchmany(SCAN_BATCH)
+            if not rows:
+                break
+            for datetime_val, channel, length in rows:
+                parsed = _parse_datetime(datetime_val)
+                if parsed is None:
+                    self.skipped += 1
+                    continue
+                channel = channel or ''
+                code = codes.get(channel)
+                if code is None:
+                    code = codes[channel] = len(self.channels)
+                    self.channels.append(channel)
+                self.years.append(parsed[0])
+                self.months.append(parsed[1])
+                self.ordinals.append(parsed[2])
+                self.hours.append(parsed[3])
+                self.channel_codes.append(code)
+                self.lengths.append(length or 0)
+        self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+        return self
+
+    def __len__(self):
+        return len(self.years)
+
+    def columns(self, numpy):
+        """array 转成 NumPy 数组（共享缓冲区，不复制）"""
+        if self._columns is None:
+            self._columns = {
+                name: numpy.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)
+                for name in ('years', 'months', 'ordinals', 'hours', 'channel_codes', 'lengths')
+            }
+        return self._columns
+
+    def bucket_label(self, granularity, key):
+        if granularity == 'month':
+            return f'{key // 12:04d}-{key % 12 + 1:02d}'
+        if granularity == 'day':
+            return date.fromordinal(key).isoformat()
+        if granularity == 'year':
+            return str(key)
+        return key
+
+    def aggregate(self, granularity, channel=None, year=None, split=False):
+        """按粒度聚合条数和字数，返回 [(桶键, 条数, 字数, {渠道: 条数} 或 None)]，桶键升序"""
+        numpy = _numpy()
+        if numpy is not None and len(self):
+            return self._aggregate_numpy(numpy, granularity, channel, year, split)
+        return self._aggregate_python(granularity, channel, year, split)
+
+    def _channel_code(self, channel):
+        return self.channels.index(channel) if channel in self.channels else -1
+
+    def _aggregate_numpy(self, numpy, granularity, channel, year, split):
+        columns = self.columns(numpy)
+        keys = self._keys_numpy(columns, granularity)
+        mask = keys >= 0
+        if channel is not None:
+            mask &= columns['channel_codes'] == self._channel_code(channel)
+        if year is not None:
+            mask &= columns['years'] == year
+        keys = keys[mask]
+        if not len(keys):
+            return []
+        # 日粒度的键很稀疏，先映射到紧凑的下标再 bincount
+        unique, inverse = numpy.unique(keys, return_inverse=True)
+        counts = numpy.bincount(inverse, minlength=len(unique))
+        chars = numpy.bincount(inverse, weights=columns['lengths'][mask], minlength=len(unique))
+        by_channel = None
+        if split:
+            width = len(self.channels)
+            by_channel = numpy.bincount(
+                inverse * width + columns['channel_codes'][mask], minlength=len(unique) * width
+            ).reshape(len(unique), width)
+        result = []
+        for position, key in enumerate(unique.tolist()):
+            channels = None
+            if by_channel is not None:
+                channels = {self.channels[code]: int(count) for code, count in enumerate(by_channel[position].tolist()) if count}
+            result.append((key, int(counts[position]), int(chars[position]), channels))
+        return result
+
+    def _keys_numpy(self, columns, granularity):
+        if granularity == 'year':
+            return columns['years'].astype('int64')
+        if granularity == 'month':
+            return columns['years'].astype('int64') * 12 + columns['months'] - 1
+        if granularity == 'day':
+            return columns['ordinals'].astype('int64')
+        if granularity == 'weekday':
+            # date.weekday()：周一为 0；序数 1（公元 1 年 1 月 1 日）是周一
+            return (columns['ordinals'].astype('int64') - 1) % 7
+        return columns['hours'].astype('int64')
+
+    def _key(self, granularity, index):
+        if granularity == 'year':
+            return self.years[index]
+        if granularity == 'month':
+            return self.years[index] * 12 + self.months[index] - 1
+        if granularity == 'day':
+            return self.ordinals[index]
+        if granularity == 'weekday':
+            return (self.ordinals[index] - 1) % 7
+        return self.hours[index]
+
+    def _aggregate_python(self, granularity, channel, year, split):
+        code = self._channel_code(channel) if channel is not None else None
+        buckets = {}
+        for index in range(len(self)):
+            if code is not None and self.channel_codes[index] != code:
+                continue
+            if year is not None and self.years[index] != year:
+                continue
+            key = self._key(granularity, index)
+            if key < 0:
+                continue
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [0, 0, {} if split else None]
+            bucket[0] += 1
+            bucket[1] += self.lengths[index]
+            if split:
+                name = self.channels[self.channel_codes[index]]
+                bucket[2][name] = bucket[2].get(name, 0) + 1
+        return [(key, *buckets[key]) for key in sorted(buckets)]
+
+
+class AnalyticsEngine:
+    """按数据版本缓存列式快照：版本号变化（任意写入、回填、替换数据库）后的第一次查询重新载入"""
+
+    def __init__(self, connect, version):
+        self._connect = connect
+        self._version = version
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def snapshot(self):
+        # 先读版本号再载入：载入期间发生的写入只会让快照被视为过期，不会漏掉
+        version = self._version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                conn = self._connect()
+                try:
+                    self._snapshot = Snapshot(version).load(conn)
+                finally:
+                    conn.close()
+            return self._snapshot
+
+    def reset(self):
+        self._snapshot = None
+
+    def timeseries(self, granularity, channel=None, year=None, split=False):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f'unknown granularity: {granularity}')
+        snapshot = self.snapshot()
+        started = time.perf_counter()
+        rows = snapshot.aggregate(granularity, channel, year, split)
+        if granularity in FIXED_BUCKETS:
+            present = {row[0]: row for row in rows}
+            rows = [present.get(key, (key, 0, 0, {} if split else None)) for key in FIXED_BUCKETS[granularity]]
+        buckets = []
+        for key, count, chars, channels in rows:
+            bucket = {'key': snapshot.bucket_label(granularity, key), 'count': count, 'char_count': chars}
+            if split:
+                bucket['channels'] = channels
+            buckets.append(bucket)
+        return {
+            'granularity': granularity,
+            'channel': channel,
+            'year': year,
+            'buckets': buckets,
+            'records': len(snapshot),
+            'engine': 'numpy' if _numpy() is not None else 'python',
+            'buildMs': snapshot.build_ms,
+            'queryMs': round((time.perf_counter() - started) * 1000, 1),
+        }
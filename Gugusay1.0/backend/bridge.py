@@ -0,0 +1,156 @@
+"""Data calls served over the pywebview js_api bridge instead of loopback HTTP.
+
+main.Api inherits DataApi, so every public method here is callable from the window as
+window.pywebview.api.<name>(...). utils/api.js sends GET /api/... URLs through request(); only the
+read-only resources in ROUTES are served here, anything else answers 404 with "unsupported" and
+the client falls back to HTTP. Results use the same shapes as the HTTP endpoints.
+"""
+import time
+import urllib.parse
+
+from backend import metrics
+from backend.config import DEFAULT_PAGE_SIZE
+from backend.database import db_manager
+from backend.params import int_param, page_size_param, str_param
+from backend.scheduler import scheduler
+
+STATS_KINDS = ("summary", "combined", "year-month", "channels")
+
+
+class DataApi:
+    """Read-only DatabaseManager calls. Each call returns {"status", "data"} or {"status", "error"}."""
+
+    def _call(self, endpoint, fn):
+        # Same bookkeeping as an HTTP request: counts as UI activity, holds the swap gate and
+        # returns the thread's connection to the pool (pywebview runs each call on a new thread).
+        scheduler.request_started()
+        started = time.perf_counter()
+        status = 200
+        try:
+            with db_manager.reading():
+                data = fn()
+            if data is None:
+                status = 404
+                return {"status": status, "error": "not found"}
+            return {"status": status, "data": data}
+        except ValueError as e:
+            status = 400
+            return {"status": status, "error": str(e)}
+        except Exception as e:
+            status = 500
+            print(f"bridge call {endpoint} failed: {e}")
+            return {"status": status, "error": "internal error"}
+        finally:
+            db_manager.release_connection()
+            scheduler.request_finished()
+            metrics.record_server(f"BRIDGE {endpoint}", (time.perf_counter() - started) * 1000, status)
+
+    def get_records(self, page=1, page_size=DEFAULT_PAGE_SIZE, search="", channel="", year_month=""):
+        page = int_param(page, 1)
+        page_size = page_size_param(page_size)
+        return self._call("/api/records", lambda: db_manager.get_records(
+            page, page_size, str_param(search), str_param(channel), str_param(year_month)
+        ))
+
+    def get_record(self, record_id):
+        record_id = int_param(record_id, None)
+        if record_id is None:
+            return {"status": 400, "error": "invalid record id"}
+        return self._call("/api/records/:id", lambda: db_manager.get_record(record_id))
+
+    def search(self, keyword, page=1, page_size=DEFAULT_PAGE_SIZE, mode="full", pinyin=True):
+        keyword = str_param(keyword)
+        if not keyword:
+            return {"status": 400, "error": "keyword is required"}
+        page = int_param(page, 1)
+        page_size = page_size_param(page_size)
+        mode = "snippet" if mode == "snippet" else "full"
+        return self._call("/api/search", lambda: db_manager.search_records(keyword, page, page_size, mode, bool(pinyin)))
+
+    def get_tree(self):
+        return self._call("/api/year-months", db_manager.get_year_month_tree)
+
+    def get_channels(self):
+        return self._call("/api/channels", db_manager.get_channels)
+
+    def get_total_count(self, page_size=DEFAULT_PAGE_SIZE):
+        page_size = page_size_param(page_size)
+        return self._call("/api/total-count", lambda: db_manager.get_total_count(page_size))
+
+    def get_stats(self, kind="summary"):
+        if kind not in STATS_KINDS:
+            return {"status": 404, "error": f"unknown stats: {kind}"}
+        handlers = {
+            "summary": db_manager.get_summary_stats,
+            "combined": db_manager.get_combined_stats,
+            "year-month": db_manager.get_year_month_tree,
+            "channels": db_manager.get_channels,
+        }
+        return self._call(f"/api/stats/{kind}", handlers[kind])
+
+    def locate(self, record=None, year_month=None, channel=None, page_size=DEFAULT_PAGE_SIZE, anchor="newest"):
+        page_size = page_size_param(page_size)
+        anchor = "oldest" if anchor == "oldest" else "newest"
+        if record not in (None, ""):
+            record_id = int_param(record, None)
+            if record_id is None:
+                return {"status": 400, "error": "invalid record id"}
+            return self._call("/api/locate", lambda: db_manager.locate(record_id=record_id, page_size=page_size))
+        if isinstance(year_month, str):
+            return self._call("/api/locate", lambda: db_manager.locate(year_month=year_month, page_size=page_size, anchor=anchor))
+        if isinstance(channel, str):
+            return self._call("/api/locate", lambda: db_manager.locate(channel=channel, page_size=page_size, anchor=anchor))
+        return {"status": 400, "error": "record, yearMonth or channel is required"}
+
+    def get_search_history(self):
+        return self._call("/api/search", db_manager.get_search_history)
+
+    def get_latest_page(self, page_size=10):
+        page_size = page_size_param(page_size, 10)
+        return self._call("/api/latest-page", lambda: db_manager.get_latest_record_page(page_size))
+
+    def request(self, url):
+        """Serve a GET /api/... URL the way the HTTP server would, for the resources in ROUTES."""
+        parsed = urllib.parse.urlparse(str_param(url))
+        path_parts = [urllib.parse.unquote(part) for part in parsed.path.strip("/").split("/")]
+        route = ROUTES.get(path_parts[1]) if len(path_parts) >= 2 and path_parts[0] == "api" else None
+        if route is None:
+            return {"status": 404, "error": "unsupported", "unsupported": True}
+        query = {key: values[0] for key, values in urllib.parse.parse_qs(parsed.query, keep_blank_values=True).items()}
+        return route(self, path_parts[2:], query)
+
+
+def _route_records(api, rest, query):
+    if rest:
+        return api.get_record(rest[0]) if len(rest) == 1 else {"status": 404, "error": "not found"}
+    return api.get_records(query.get("page"), query.get("pageSize"), query.get("search", ""),
+                           query.get("channel", ""), query.get("yearMonth", ""))
+
+
+def _route_stats(api, rest, query):
+    if len(rest) != 1 or rest[0] not in STATS_KINDS:
+        return {"status": 404, "error": "unsupported", "unsupported": True}
+    return api.get_stats(rest[0])
+
+
+def _route_search(api, rest, query):
+    # Without a keyword the HTTP endpoint returns the search history.
+    if not query.get("keyword"):
+        return api.get_search_history()
+    return api.search(query["keyword"], query.get("page"), query.get("pageSize"),
+                      query.get("mode", "full"), query.get("pinyin", "1") != "0")
+
+
+ROUTES = {
+    "records": _route_records,
+    "search": _route_search,
+    "year-months": lambda api, rest, query: api.get_tree(),
+    "channels": lambda api, rest, query: api.get_channels(),
+    "total-count": lambda api, rest, query: api.get_total_count(query.get("pageSize")),
+    "stats": _route_stats,
+    "locate": lambda api, rest, query: api.locate(
+        query.get("record"), query.get("yearMonth"), query.get("channel"),
+        query.get("pageSize"), query.get("anchor", "newest"),
+    ),
+    "latest-page": lambda api, rest, query: api.get_latest_page(query.get("pageSize")),
+}
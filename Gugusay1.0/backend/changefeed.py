@@ -0,0 +1,110 @@
+# 变更推送模块：读取 JL_changelog 计算增量，并在写入时唤醒等待中的事件流
+import threading
+
+from backend import timeline
+from backend.config import CHANGELOG_KEEP
+
+MAX_CHANGES = 500
+
+
+def latest_seq(conn):
+    row = conn.execute('SELECT MAX(seq) FROM JL_changelog').fetchone()
+    return row[0] or 0
+
+
+def changes_since(conn, since, limit=MAX_CHANGES):
+    """返回 since 之后的变化，按记录合并（同一记录只保留最终状态），附带受影响的计数
+
+    since 早于保留范围（流水已被清理）或变化太多时返回 reset=True，调用方应整体刷新。
+    """
+    latest = latest_seq(conn)
+    result = {'latest': latest, 'reset': False, 'changes': [], 'counts': {}}
+    if since > latest:
+        # 客户端的 seq 来自另一份数据库
+        result['reset'] = True
+        return result
+    if since == latest:
+        return result
+    oldest = conn.execute('SELECT MIN(seq) FROM JL_changelog').fetchone()[0]
+    if since < oldest - 1:
+        result['reset'] = True
+        return result
+    rows = conn.execute('''
+        SELECT seq, record_id, action, old_month, old_channel, new_month, new_channel
+        FROM JL_changelog WHERE seq > ? ORDER BY seq LIMIT ?
+    ''', (since, limit + 1)).fetchall()
+    if len(rows) > limit:
+        result['reset'] = True
+        return result
+
+    actions = {}
+    months, channels = set(), set()
+    for seq, record_id, action, old_month, old_channel, new_month, new_channel in rows:
+        months.update(key for key in (old_month, new_month) if key is not None)
+        channels.update(key for key in (old_channel, new_channel) if key is not None)
+        previous = actions.get(record_id)
+        if previous == 'insert' and action == 'delete':
+            # 插入后又删除，客户端从未见过，直接跳过
+            del actions[record_id]
+            continue
+        if previous == 'insert' and action == 'update':
+            action = 'insert'
+        actions[record_id] = action
+
+    records = {}
+    live_ids = [record_id for record_id, action in actions.items() if action != 'delete']
+    if live_ids:
+        placeholders = ','.join('?' * len(live_ids))
+        for row in conn.execute(f'SELECT {", ".join(timeline.RECORD_COLUMNS)} FROM JL WHERE id IN ({placeholders})', live_ids):
+            records[row[0]] = timeline.row_to_record(row)
+    for record_id, action in actions.items():
+        record = records.get(record_id)
+        if action != 'delete' and record is None:
+            # 读取流水和读取记录之间被删除，下一次增量会带上这次删除
+            continue
+        result['changes'].append({'id': record_id, 'action': action, 'record': record})
+
+    result['counts'] = {
+        'total': timeline.total_count(conn),
+        'month': {key: timeline.dimension_count(conn, 'month', key) for key in sorted(months)},
+        'channel': {key: timeline.dimension_count(conn, 'channel', key) for key in sorted(channels)},
+    }
+    return result
+
+
+def prune(conn, keep=CHANGELOG_KEEP):
+    """只保留最近 keep 条流水（更早的客户端会收到 reset 并整体刷新）"""
+    cursor = conn.execute('DELETE FROM JL_changelog WHERE seq <= (SELECT MAX(seq) FROM JL_changelog) - ?', (keep,))
+    conn.commit()
+    return cursor.rowcount
+
+
+class ChangeFeed:
+    """事件流的唤醒器：写入监听递增版本号并通知所有等待者
+
+    epoch 在数据库被整体替换时加一，旧的 seq 不再有意义，客户端需要整体刷新。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.version = 0
+        self.epoch = 0
+        self.closed = False
+
+    def apply_write(self, action, record_id, old, new):
+        with self._cond:
+            self.version += 1
+            if action == 'swap':
+                self.epoch += 1
+            self._cond.notify_all()
+
+    def wait(self, version, timeout):
+        """等待 version 之后的写入，返回当前版本号（超时或关闭时可能与传入值相同）"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version or self.closed, timeout)
+            return self.version
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
@@ -1,4 +1,5 @@
-﻿import shutil
+﻿import os
+import shutil
 import sys
 from pathlib import Path
 
@@ -28,9 +29,12 @@ def _resource_root(runtime_root: Path) -> Path:
 RUNTIME_ROOT = _runtime_root()
 APP_ROOT = str(_resource_root(RUNTIME_ROOT))
 
+ASSETS_DIR = str(Path(APP_ROOT) / "assets")
 DATA_DIR = str(RUNTIME_ROOT / "data")
 MEDIA_DIR = str(RUNTIME_ROOT / "media")
 DB_PATH = str(Path(DATA_DIR) / "SR.db")
+# Bundled character table (traditional -> simplified, pinyin) used to normalize search text.
+HANZI_TABLE_PATH = str(Path(APP_ROOT) / "backend" / "data" / "hanzi.tsv")
 
 SERVER_HOST = "localhost"
 SERVER_PORT = 3000
@@ -41,7 +45,30 @@ WINDOW_HEIGHT = 900
 WINDOW_MIN_SIZE = (800, 600)
 
 DEFAULT_PAGE_SIZE = 6
+# Largest page size either transport (HTTP or the js_api bridge) will serve.
+MAX_PAGE_SIZE = 500
 SEARCH_HISTORY_LIMIT = 10
+SEARCH_SNIPPET_RADIUS = 40
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_TERMS = 200000
+# Read caches in DatabaseManager: decoded records (bytes, estimated) and cached COUNT results (entries).
+RECORD_CACHE_MAX_BYTES = 8 * 1024 * 1024
+COUNT_CACHE_SIZE = 256
+# Rows kept in JL_changelog; clients that fall further behind reload instead of patching.
+CHANGELOG_KEEP = 10000
+# Seconds between keep-alive comments on the /api/events stream.
+EVENTS_KEEPALIVE_SECONDS = 15
+
+# Background scheduler: worker threads, and seconds without API requests before idle-only jobs run.
+SCHEDULER_WORKERS = 2
+SCHEDULER_IDLE_SECONDS = 10
+
+# Cached update-check results older than this (seconds) are refreshed in the background.
+UPDATE_CHECK_MAX_AGE = 6 * 3600
+
+# Database snapshots: how many to keep under data/snapshots, and pages copied per backup step.
+SNAPSHOT_KEEP = 5
+SNAPSHOT_PAGES_PER_STEP = 256
 
 
 def _bundled_db_candidates() -> list[Path]:
@@ -54,6 +81,11 @@ def _bundled_db_candidates() -> list[Path]:
 
 
 def ensure_directories() -> None:
+    """Create runtime folders and seed SR.db from the bundle on first run.
+
+    Not run at import time: copying the bundled database can take a while, so the
+    database manager calls this lazily the first time a connection is needed.
+    """
     Path(DATA_DIR).mkdir(parents=True, exist_ok=True)
     Path(MEDIA_DIR).mkdir(parents=True, exist_ok=True)
 
@@ -61,8 +93,8 @@ def ensure_directories() -> None:
     if not db_file.exists():
         for candidate in _bundled_db_candidates():
             if candidate.exists():
-                shutil.copy2(candidate, db_file)
+                # Copy under a temporary name so an interrupted first run never leaves a truncated SR.db.
+                temp_file = db_file.with_name(db_file.name + ".copying")
+                shutil.copy2(candidate, temp_file)
+                os.replace(temp_file, db_file)
                 break
-
-
-ensure_directories()
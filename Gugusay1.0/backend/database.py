@@ -1,103 +1,299 @@
 # 数据库管理模块
+import os
+import shutil
 import sqlite3
 import threading
+import time
 from contextlib import contextmanager
-from backend.config import DB_PATH
+from backend import analytics, changefeed, db_swap, dedupe, entities, media_index, media_scanner, migrations, normalize, query_language, record_cache, related, snapshots, snippet, startup, timeline
+from backend.config import DB_PATH, SEARCH_SNIPPET_RADIUS, SUGGEST_LIMIT, ensure_directories
+from backend.scheduler import PRIORITY_LOW, scheduler
+from backend.search_history import SearchHistoryBuffer
+from backend.suggest import SuggestIndex
 
 class DatabaseManager:
     """数据库管理器（使用连接池优化）"""
 
     def __init__(self, db_path=None, pool_size=5):
-        """初始化数据库管理器"""
+        """初始化数据库管理器（延迟到首次获取连接时才初始化数据库）"""
         self.db_path = db_path or DB_PATH
         self._local = threading.local()
         self._lock = threading.Lock()
-        self.init_database()
+        self._ready = False
+        # 数据库热替换：请求和后台连接持有读锁；替换后代数加一，各线程的连接随之重建
+        self._gate = db_swap.ReadWriteGate()
+        self._generation = 0
+        self._thread_connections = []
+        self._connections_lock = threading.Lock()
+        # 请求线程结束后归还的空闲连接 (conn, generation)，多线程服务器下复用连接和页缓存
+        self.pool_size = pool_size
+        self._pool = []
+        # 搜索历史只在内存中读写，后台批量落盘
+        self.search_history = SearchHistoryBuffer(self._open_connection)
+        # 记录写入后的回调，用于增量维护内存索引和缓存
+        self._write_listeners = []
+        self.suggest_index = SuggestIndex(self._open_connection)
+        self.query_planner = query_language.QueryPlanner()
+        self.add_write_listener(self.suggest_index.apply_write)
+        # 单条记录和计数结果的读缓存，写入时失效
+        self.record_cache = record_cache.RecordCache()
+        self.add_write_listener(self.record_cache.apply_write)
+        # 在缓存失效之后唤醒等待变更的事件流
+        self.change_feed = changefeed.ChangeFeed()
+        self.add_write_listener(self.change_feed.apply_write)
+        # 统计用的列式快照，以事件流的版本号判断是否过期
+        self.analytics = analytics.AnalyticsEngine(
+            self._open_connection, lambda: (self.change_feed.epoch, self.change_feed.version)
+        )
+        # 相关推文的 TF-IDF 索引文件放在数据库旁边，写入后的变化在查询时从 JL_changelog 补上
+        self.related_index = related.RelatedIndex(self.db_path + '.related', self._open_connection)
+        self._related_queued = False
+
+    def ensure_ready(self):
+        """准备数据目录并初始化数据库，只执行一次，可在后台线程提前调用"""
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            if self.db_path == DB_PATH:
+                ensure_directories()
+                startup.mark('data directories ready')
+            conn = self._connect_thread_local()
+            self.init_database(conn)
+            self._ready = True
+            startup.mark('database ready')
+
+    def _open_connection(self):
+        """为后台任务打开一个独立连接（调用方负责关闭）
+
+        连接打开期间持有读锁，数据库替换会等它关闭。
+        """
+        self.ensure_ready()
+        return db_swap.open_gated(self._gate, self.db_path)
+
+    def _background_should_stop(self, job=None):
+        """后台任务的批次间检查：任务被取消、界面重新忙碌，或有数据库替换在等待时停下并关闭连接
+
+        后台任务的连接整个运行期间都持有读锁，不在批次之间让路的话替换会等到超时。
+        """
+        def should_stop():
+            return self._gate.writer_waiting or (job is not None and job.should_stop())
+        return should_stop
+
+    def _connect_thread_local(self):
+        conn = None
+        with self._connections_lock:
+            while self._pool:
+                pooled, generation = self._pool.pop()
+                if generation == self._generation:
+                    conn = pooled
+                    break
+            if conn is None:
+                # 允许替换数据库的线程关闭其他线程的空闲连接
+                conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._thread_connections.append(conn)
+        self._local.conn = conn
+        self._local.generation = self._generation
+        return conn
 
     def get_connection(self):
-        """获取数据库连接（线程局部变量）"""
-        if not hasattr(self._local, 'conn') or self._local.conn is None:
-            self._local.conn = sqlite3.connect(self.db_path)
-        return self._local.conn
+        """获取数据库连接（线程局部变量，优先从连接池取，数据库被替换后重新打开）"""
+        if not self._ready:
+            self.ensure_ready()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.generation != self._generation:
+            conn = self._connect_thread_local()
+        return conn
 
     def close_connection(self):
         """关闭当前线程的数据库连接"""
-        if hasattr(self._local, 'conn') and self._local.conn:
-            self._local.conn.close()
+        conn = getattr(self._local, 'conn', None)
+        if conn:
+            with self._connections_lock:
+                if conn in self._thread_connections:
+                    self._thread_connections.remove(conn)
+            conn.close()
             self._local.conn = None
 
-    def init_database(self):
-        """初始化数据库"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # 一次性执行所有SQL语句，减少数据库操作次数
-        sql_statements = [
-            # 创建JL表
-            '''
-            CREATE TABLE IF NOT EXISTS JL (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                datetime TEXT NOT NULL,
-                content TEXT,
-                channel TEXT,
-                media_type TEXT DEFAULT 'text',
-                media_path TEXT
-            )
-            ''',
-            # 创建索引（优化查询性能）
-            'CREATE INDEX IF NOT EXISTS idx_jl_datetime ON JL(datetime)',
-            'CREATE INDEX IF NOT EXISTS idx_jl_channel ON JL(channel)',
-            'CREATE INDEX IF NOT EXISTS idx_jl_media_type ON JL(media_type)',
-            # 创建reading_progress表
-            '''
-            CREATE TABLE IF NOT EXISTS reading_progress (
-                id INTEGER PRIMARY KEY,
-                last_viewed_id INTEGER,
-                last_viewed_datetime TEXT
-            )
-            ''',
-            # 创建search_history表
-            '''
-            CREATE TABLE IF NOT EXISTS search_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                keyword TEXT NOT NULL UNIQUE,
-                search_datetime TEXT
-            )
-            '''
-        ]
-
-        # 执行所有SQL语句
-        for sql in sql_statements:
-            cursor.execute(sql)
-
-        # 确保search_history表有search_datetime列
+    def release_connection(self):
+        """请求结束时把当前线程的连接归还连接池（池满或数据库已被替换时关闭）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            if conn in self._thread_connections:
+                if self._local.generation == self._generation and len(self._pool) < self.pool_size:
+                    self._pool.append((conn, self._local.generation))
+                    return
+                self._thread_connections.remove(conn)
+        conn.close()
+
+    @contextmanager
+    def reading(self):
+        """处理一个请求期间持有读锁，数据库替换会等待进行中的请求结束"""
+        with self._gate.read():
+            yield
+
+    def swap_database(self, new_path, backup_path=None, timeout=10.0):
+        """在不重启应用的情况下用 new_path 替换当前数据库
+
+        先校验新文件并复制到数据库旁边，然后等待进行中的请求和后台连接结束，
+        关闭所有连接，原子重命名到位，重新打开并执行迁移，最后清空内存缓存。
+        旧数据库以硬链接（不支持时复制）保留为 backup_path。
+        """
+        started = time.perf_counter()
+        error = db_swap.validate_database(new_path)
+        if error:
+            return {'success': False, 'error': error}
+        # 先把缓冲的搜索历史写入旧库，随旧库一起备份
+        self.flush_pending_writes()
+        staged = self.db_path + '.new'
+        shutil.copy2(new_path, staged)
         try:
-            cursor.execute('ALTER TABLE search_history ADD COLUMN search_datetime TEXT')
-        except sqlite3.OperationalError as e:
-            if 'duplicate column name' not in str(e).lower():
-                raise e
-
-        # 只在有需要时更新search_history表
-        cursor.execute('SELECT COUNT(*) FROM search_history WHERE search_datetime IS NULL')
-        null_count = cursor.fetchone()[0]
-        if null_count > 0:
-            cursor.execute('''
-                UPDATE search_history
-                SET search_datetime = datetime('now', 'localtime')
-                WHERE search_datetime IS NULL
-            ''')
-
-        conn.commit()
+            with self._gate.write(timeout):
+                with self._connections_lock:
+                    connections = self._thread_connections
+                    self._thread_connections = []
+                    self._pool = []
+                    self._generation += 1
+                    self._ready = False
+                for conn in connections:
+                    conn.close()
+                if backup_path and os.path.exists(self.db_path):
+                    if os.path.exists(backup_path):
+                        os.remove(backup_path)
+                    try:
+                        os.link(self.db_path, backup_path)
+                    except OSError:
+                        shutil.copy2(self.db_path, backup_path)
+                os.replace(staged, self.db_path)
+                self.ensure_ready()
+        except (db_swap.SwapTimeout, OSError) as e:
+            if os.path.exists(staged):
+                os.remove(staged)
+            return {'success': False, 'error': str(e)}
+        self.search_history.reset()
+        self.suggest_index.reset()
+        self.query_planner.clear()
+        self.analytics.reset()
+        self.related_index.invalidate()
+        self._notify_write('swap', None)
+        return {'success': True, 'generation': self._generation, 'seconds': round(time.perf_counter() - started, 3)}
+
+    def add_write_listener(self, listener):
+        """登记写入监听：listener(action, record_id, old, new)，old/new 为写入前后的记录字典或 None"""
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, action, record_id, old=None, new=None):
+        for listener in self._write_listeners:
+            try:
+                listener(action, record_id, old, new)
+            except Exception as e:
+                print(f"write listener failed: {e}")
+
+    def _fetch_row(self, conn, record_id):
+        row = conn.execute(
+            'SELECT id, datetime, content, channel, media_type, media_path FROM JL WHERE id = ?', (record_id,)
+        ).fetchone()
+        return timeline.row_to_record(row) if row else None
+
+    def init_database(self, conn=None):
+        """初始化数据库：只执行尚未应用的迁移，已是最新版本时不做任何操作"""
+        conn = conn or self.get_connection()
+        applied = migrations.apply_migrations(conn)
+        if applied:
+            startup.mark(f'migrations applied: {", ".join(applied)}')
+        if migrations.pending_backfills(conn):
+            self._schedule_backfills()
+
+    def create_snapshot(self, job=None):
+        """在线备份当前数据库为压缩快照（由后台调度器执行，可随任务取消）"""
+        conn = self._open_connection()
+        try:
+            return snapshots.create_snapshot(conn, should_stop=self._background_should_stop(job))
+        except snapshots.SnapshotCancelled:
+            return {'cancelled': True}
+        finally:
+            conn.close()
+
+    def list_snapshots(self):
+        return snapshots.list_snapshots()
+
+    def restore_snapshot(self, name):
+        """用快照热替换当前数据库，替换前的数据库保留为 .before-restore"""
+        temp_path = self.db_path + '.restore'
+        try:
+            snapshots.extract_snapshot(name, temp_path)
+            return self.swap_database(temp_path, backup_path=self.db_path + '.before-restore')
+        except (ValueError, OSError) as e:
+            return {'success': False, 'error': str(e)}
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _schedule_backfills(self, delay=0.0):
+        scheduler.submit('schema backfill', self._run_backfills, priority=PRIORITY_LOW, delay=delay, idle_only=True)
+
+    def _run_backfills(self, job):
+        """由后台调度器在界面空闲时分批执行耗时的数据回填，使用独立连接，不阻塞前台读取
+
+        界面重新忙碌或有数据库替换在等待时在批次之间让出，稍后重新排队继续。
+        """
+        conn = self._open_connection()
+        try:
+            completed = migrations.run_backfills(conn, should_stop=self._background_should_stop(job))
+            if completed:
+                print(f"backfills completed: {', '.join(completed)}")
+                # 回填会改变记录附带的媒体信息：按一次整体写入通知，清空记录缓存并让 ETag 失效
+                self._notify_write('backfill', None)
+            remaining = migrations.pending_backfills(conn)
+        finally:
+            conn.close()
+        if remaining and not job.cancelled and not scheduler.stopping:
+            self._schedule_backfills(delay=1.0)
+        return {'completed': completed, 'remaining': remaining}
+
+    def _attach_media(self, conn, records):
+        """为记录附加结构化的 media 数组（一次查询 JL_media），属于重复组的记录再附加分组信息"""
+        media = media_index.load_media(conn, [record['id'] for record in records])
+        clusters = dedupe.load_clusters(conn, [record['id'] for record in records])
+        for record in records:
+            items = media.get(record['id'])
+            if not items and record.get('media_path'):
+                # 尚未回填到 JL_media 的旧记录，临时从 media_path 解析
+                items = [
+                    dict(dict.fromkeys(media_index.MEDIA_COLUMNS), path=path, kind=media_index.media_kind(path))
+                    for path in media_index.split_media_paths(record['media_path'])
+                ]
+            record['media'] = items or []
+            if record['id'] in clusters:
+                # duplicate_of 为组内最早发布的记录，时间线在同一页里把其他转发折叠到它下面
+                record['duplicate_of'], record['duplicate_count'] = clusters[record['id']]
+        return records
+
+    def _count(self, conn, query, params=()):
+        """执行 COUNT 查询，结果按 (SQL, 参数) 缓存到下一次写入"""
+        params = tuple(params)
+        return self.record_cache.count((query, params), lambda: conn.execute(query, params).fetchone()[0])
+
+    def cache_stats(self):
+        return self.record_cache.stats()
 
     def get_record(self, record_id):
-        """获取单条记录"""
+        """获取单条记录（优先读缓存）"""
+        cached = self.record_cache.get_record(record_id)
+        if cached is not None:
+            return cached
+        version = self.record_cache.version
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM JL WHERE id = ?', (record_id,))
         record = cursor.fetchone()
 
         if record:
-            return {
+            result = {
                 'id': record[0],
                 'datetime': record[1],
                 'content': record[2],
@@ -105,6 +301,9 @@ class DatabaseManager:
                 'media_type': record[4],
                 'media_path': record[5]
             }
+            result = self._attach_media(conn, [result])[0]
+            self.record_cache.put_record(result, version)
+            return result
         return None
 
     def get_records(self, page, page_size, search='', channel='', year_month=''):
@@ -128,8 +327,8 @@ class DatabaseManager:
             query += ' AND datetime LIKE ?'
             params.append(f'{year_month}%')
 
-        # 按时间倒序排列
-        query += ' ORDER BY datetime DESC'
+        # 按时间倒序排列（同一时间按 id 倒序，与 /api/locate 的时间线顺序一致）
+        query += ' ORDER BY datetime DESC, id DESC'
 
         # 分页
         offset = (page - 1) * page_size
@@ -152,8 +351,7 @@ class DatabaseManager:
             count_query += ' AND datetime LIKE ?'
             count_params.append(f'{year_month}%')
 
-        cursor.execute(count_query, count_params)
-        total_records = cursor.fetchone()[0]
+        total_records = self._count(conn, count_query, count_params)
         total_pages = (total_records + page_size - 1) // page_size
 
         # 格式化结果
@@ -175,42 +373,57 @@ class DatabaseManager:
                 'page': page
             })
 
+        self._attach_media(conn, result['records'])
         return result
 
-    def search_records(self, keyword, page, page_size):
-        """搜索记录（优化版：使用窗口函数替代子查询）"""
+    def search_records(self, keyword, page, page_size, mode='full', pinyin=True):
+        """搜索记录
+
+        正文按 JL_norm 中的归一化形式匹配：繁简体互相命中，pinyin=True 时字母关键词还按全拼（只在音节边界上）和首字母匹配。
+        JL_norm 回填完成之前退回直接匹配 content。
+        mode='snippet' 时不返回完整内容，只返回命中位置附近的片段和高亮位置，
+        片段在同一条查询中由 SQLite 截取；打开结果时再按页加载完整记录。
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        # 添加搜索历史
-        try:
-            cursor.execute(
-                'INSERT OR IGNORE INTO search_history (keyword, search_datetime) VALUES (?, datetime("now", "localtime"))',
-                (keyword,)
-            )
-            conn.commit()
-        except:
-            pass
-
-        # 搜索记录（使用窗口函数一次性计算位置）
-        query = '''
-            SELECT
-                JL_sub.id, JL_sub.datetime, JL_sub.content, JL_sub.channel, JL_sub.media_type, JL_sub.media_path,
-                (SELECT COUNT(*) + 1 FROM JL WHERE datetime > JL_sub.datetime) as position
-            FROM JL JL_sub
-            WHERE JL_sub.content LIKE ? OR JL_sub.channel LIKE ?
-            ORDER BY JL_sub.datetime DESC
+        # 添加搜索历史（只写内存缓冲，不在搜索路径上提交事务）
+        self.search_history.record(keyword)
+
+        # 归一化后的正文包含原样的子串，所以影子表的匹配结果是直接匹配 content 的超集
+        matched = normalize.match_subquery(conn, keyword, pinyin)
+        if matched is None:
+            where, where_params = 'content LIKE ? OR channel LIKE ?', [f'%{keyword}%', f'%{keyword}%']
+            needle, haystack, fold = keyword, 'content', None
+        else:
+            where, where_params = f'channel LIKE ? OR id IN ({matched[0]})', [f'%{keyword}%'] + matched[1]
+            # 简体正文与 content 逐字对应，在其中定位繁简体命中（拼音命中无法定位，从开头截取）
+            needle, fold = normalize.simplify(keyword), normalize.simplify
+            haystack = '(SELECT simplified FROM JL_norm WHERE JL_norm.id = JL.id)'
+
+        snippet_mode = mode == 'snippet'
+        if snippet_mode:
+            columns, column_params = snippet.snippet_select(SEARCH_SNIPPET_RADIUS, needle, haystack)
+            columns = 'id, datetime, channel, media_type, ' + columns
+        else:
+            columns, column_params = 'id, datetime, content, channel, media_type, media_path', []
+
+        # 搜索记录（每条结果在时间线中的位置由按月计数表计算，不再逐行 COUNT(*)）
+        query = f'''
+            SELECT {columns}
+            FROM JL
+            WHERE {where}
+            ORDER BY datetime DESC, id DESC
             LIMIT ? OFFSET ?
         '''
-        params = [f'%{keyword}%', f'%{keyword}%', page_size, (page - 1) * page_size]
+        params = column_params + where_params + [page_size, (page - 1) * page_size]
 
         cursor.execute(query, params)
         records = cursor.fetchall()
 
         # 获取总记录数
-        count_query = 'SELECT COUNT(*) FROM JL WHERE content LIKE ? OR channel LIKE ?'
-        cursor.execute(count_query, [f'%{keyword}%', f'%{keyword}%'])
-        total_records = cursor.fetchone()[0]
+        count_query = f'SELECT COUNT(*) FROM JL WHERE {where}'
+        total_records = self._count(conn, count_query, where_params)
         total_pages = (total_records + page_size - 1) // page_size
 
         # 格式化结果
@@ -219,13 +432,27 @@ class DatabaseManager:
             'currentPage': page,
             'totalPages': total_pages,
             'total': total_records,
-            'searchKeyword': keyword
+            'searchKeyword': keyword,
+            'mode': 'snippet' if snippet_mode else 'full'
         }
 
         for record in records:
-            position = record[6]  # 从查询结果中直接获取位置
+            position = timeline.timeline_position(conn, record[0], record[1])
             page_in_all = (position + 5) // 6
 
+            if snippet_mode:
+                item = {
+                    'id': record[0],
+                    'datetime': record[1],
+                    'channel': record[2],
+                    'media_type': record[3],
+                    'contentLength': record[4] or 0,
+                    'page': page_in_all
+                }
+                item.update(snippet.build_snippet(record[6], needle, record[5], record[4], fold))
+                result['records'].append(item)
+                continue
+
             result['records'].append({
                 'id': record[0],
                 'datetime': record[1],
@@ -236,6 +463,72 @@ class DatabaseManager:
                 'page': page_in_all
             })
 
+        if not snippet_mode:
+            self._attach_media(conn, result['records'])
+        return result
+
+    def query_records(self, text, page, page_size, mode='full', explain=False):
+        """按查询语言检索（如 channel:微博 after:2014-01 before:2015-06 has:video -关键词）
+
+        语法错误时抛出 query_language.QuerySyntaxError。explain=True 时附带 EXPLAIN QUERY PLAN 结果。
+        """
+        conn = self.get_connection()
+        terms = query_language.canonical(query_language.parse(text))
+        self.search_history.record(text.strip())
+        plan, info = self.query_planner.plan(conn, terms)
+        params = self.query_planner.bind(plan, terms)
+
+        snippet_mode = mode == 'snippet'
+        if snippet_mode:
+            keywords = [term.value for term in terms if term.field == 'keyword' and not term.negated]
+            keyword = max(keywords, key=len) if keywords else ''
+            columns, column_params = snippet.snippet_select(SEARCH_SNIPPET_RADIUS, keyword)
+            columns = 'id, datetime, channel, media_type, ' + columns
+        else:
+            columns, column_params = 'id, datetime, content, channel, media_type, media_path', []
+
+        query = f'SELECT {columns} FROM {plan.from_clause} WHERE {plan.where} ORDER BY datetime DESC, id DESC LIMIT ? OFFSET ?'
+        query_params = column_params + params + [page_size, (page - 1) * page_size]
+        count_query = f'SELECT COUNT(*) FROM {plan.from_clause} WHERE {plan.where}'
+
+        rows = conn.execute(query, query_params).fetchall()
+        total_records = self._count(conn, count_query, params)
+        total_pages = (total_records + page_size - 1) // page_size
+
+        records = []
+        for row in rows:
+            position = timeline.timeline_position(conn, row[0], row[1])
+            if snippet_mode:
+                item = {
+                    'id': row[0],
+                    'datetime': row[1],
+                    'channel': row[2],
+                    'media_type': row[3],
+                    'contentLength': row[4] or 0,
+                    'page': (position + 5) // 6
+                }
+                item.update(snippet.build_snippet(row[6], keyword, row[5], row[4]))
+            else:
+                item = timeline.row_to_record(row)
+                item['page'] = (position + 5) // 6
+            records.append(item)
+        if not snippet_mode:
+            self._attach_media(conn, records)
+
+        result = {
+            'records': records,
+            'currentPage': page,
+            'totalPages': total_pages,
+            'total': total_records,
+            'query': text,
+            'terms': [term._asdict() for term in terms],
+            'plan': info,
+            'mode': 'snippet' if snippet_mode else 'full'
+        }
+        if explain:
+            result['explain'] = [
+                row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, query_params).fetchall()
+            ]
         return result
 
     def get_on_this_day(self, month_day, page, page_size):
@@ -260,8 +553,7 @@ class DatabaseManager:
 
         # 获取总记录数
         count_query = "SELECT COUNT(*) FROM JL WHERE strftime('%m-%d', datetime) = ?"
-        cursor.execute(count_query, [month_day])
-        total_records = cursor.fetchone()[0]
+        total_records = self._count(conn, count_query, [month_day])
         total_pages = (total_records + page_size - 1) // page_size
 
         # 格式化结果
@@ -284,6 +576,7 @@ class DatabaseManager:
                 'page': page
             })
 
+        self._attach_media(conn, result['records'])
         return result
 
     def add_record(self, datetime_val, content_val, channel_val='', media_type_val='text', media_path_val=''):
@@ -294,27 +587,46 @@ class DatabaseManager:
             INSERT INTO JL (datetime, content, channel, media_type, media_path)
             VALUES (?, ?, ?, ?, ?)
         ''', (datetime_val, content_val, channel_val, media_type_val, media_path_val))
+        record_id = cursor.lastrowid
+        media_index.replace_record_media(conn, record_id, media_path_val)
+        entities.replace_record_entities(conn, record_id, content_val, datetime_val)
+        normalize.replace_record_norm(conn, record_id, content_val)
         conn.commit()
+        self._notify_write('insert', record_id, new=self._fetch_row(conn, record_id))
         return {'success': True}
 
     def update_record(self, record_id, datetime_val, content_val, channel_val='', media_type_val='text', media_path_val=''):
         """更新记录"""
         conn = self.get_connection()
+        old = self._fetch_row(conn, record_id)
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE JL
             SET datetime=?, content=?, channel=?, media_type=?, media_path=?
             WHERE id=?
         ''', (datetime_val, content_val, channel_val, media_type_val, media_path_val, record_id))
+        media_index.replace_record_media(conn, record_id, media_path_val)
+        entities.replace_record_entities(conn, record_id, content_val, datetime_val)
+        normalize.replace_record_norm(conn, record_id, content_val)
         conn.commit()
+        if old:
+            self._notify_write('update', record_id, old, self._fetch_row(conn, record_id))
         return {'success': True}
 
     def delete_record(self, record_id):
         """删除记录"""
         conn = self.get_connection()
+        old = self._fetch_row(conn, record_id)
+        # 属于重复组时，触发器会改写同组其他记录的分组信息
+        clustered = conn.execute('SELECT 1 FROM JL_duplicate WHERE record_id = ?', (record_id,)).fetchone()
         cursor = conn.cursor()
         cursor.execute('DELETE FROM JL WHERE id = ?', (record_id,))
         conn.commit()
+        if old:
+            self._notify_write('delete', record_id, old=old)
+        if clustered:
+            # 同组记录缓存里的 duplicate_of / duplicate_count 已经过时
+            self._notify_write('duplicates', None)
         return {'success': True}
 
     def get_year_month_tree(self):
@@ -418,6 +730,36 @@ class DatabaseManager:
 
         return {'stats': stats}
 
+    def get_timeseries(self, granularity, channel=None, year=None, split=False):
+        """按时间粒度（year/month/day/weekday/hour）统计条数和字数，可按渠道、年份筛选或按渠道拆分"""
+        return self.analytics.timeseries(granularity, channel=channel, year=year, split=split)
+
+    def get_top_entities(self, kind, since=None, until=None, limit=50):
+        """时间范围内最常出现的话题、提及或链接（只读 JL_entity 索引）"""
+        conn = self.get_connection()
+        return {
+            'kind': kind,
+            'since': since,
+            'until': until,
+            'entities': entities.top_entities(conn, kind, since, until, limit)
+        }
+
+    def get_entity_records(self, kind, value, page, page_size):
+        """包含某个话题、提及或链接的记录，按时间线顺序分页"""
+        conn = self.get_connection()
+        value = entities.normalize_value(kind, value)
+        total_records = self.record_cache.count(('entity', kind, value), lambda: entities.count_records(conn, kind, value))
+        records = entities.record_page(conn, kind, value, page, page_size)
+        for record in records:
+            record['page'] = page
+        self._attach_media(conn, records)
+        return {
+            'records': records,
+            'currentPage': page,
+            'totalPages': (total_records + page_size - 1) // page_size,
+            'total': total_records
+        }
+
     def get_reading_progress(self):
         """获取阅读进度"""
         conn = self.get_connection()
@@ -445,46 +787,45 @@ class DatabaseManager:
         conn.commit()
         return {'success': True}
 
-    def get_search_history(self):
-        """获取搜索历史"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT keyword FROM search_history
-            ORDER BY search_datetime DESC
-            LIMIT 10
-        ''')
-        rows = cursor.fetchall()
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        """搜索联想：内存前缀索引查找，不访问 JL 表（首次调用时构建索引）"""
+        history = [item['keyword'] for item in self.search_history.get()]
+        return {
+            'query': query,
+            'suggestions': self.suggest_index.suggest(query, limit, history)
+        }
 
-        result = [{'keyword': row[0]} for row in rows if row[0]]
-        return {'history': result}
+    def get_search_history(self):
+        """获取搜索历史（由内存提供）"""
+        return {'history': self.search_history.get()}
 
     def add_search_history(self, keyword):
         """添加搜索历史"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO search_history (keyword, search_datetime)
-            VALUES (?, datetime("now", "localtime"))
-            ON CONFLICT(keyword) DO UPDATE SET search_datetime = datetime("now", "localtime")
-        ''', (keyword,))
-        conn.commit()
+        self.search_history.record(keyword)
         return {'success': True}
 
     def delete_search_history(self, keyword):
         """删除搜索历史"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM search_history WHERE keyword = ?', (keyword,))
-        conn.commit()
+        self.search_history.delete(keyword)
         return {'success': True}
 
+    def flush_pending_writes(self):
+        """把缓冲中的写入落盘（退出前调用）"""
+        if self._ready:
+            self.search_history.flush()
+
+    def get_changes(self, since):
+        """since 之后的记录变化（已合并）和受影响的计数，供 /api/changes 和事件流使用"""
+        conn = self.get_connection()
+        result = changefeed.changes_since(conn, since)
+        self._attach_media(conn, [change['record'] for change in result['changes'] if change['record']])
+        result['epoch'] = self.change_feed.epoch
+        return result
+
     def get_total_count(self, page_size=6):
-        """获取总记录数"""
+        """获取总记录数（对按月计数表求和）"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM JL')
-        total_count = cursor.fetchone()[0]
+        total_count = self.record_cache.count(('total',), lambda: timeline.total_count(conn))
         total_pages = (total_count + page_size - 1) // page_size
 
         return {
@@ -492,24 +833,19 @@ class DatabaseManager:
             'totalPages': total_pages
         }
 
+    def _dimension_count(self, conn, dimension, key):
+        return self.record_cache.count(('dimension', dimension, key), lambda: timeline.dimension_count(conn, dimension, key))
+
     def get_latest_record_page(self, page_size=10):
         """获取最新记录页"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM JL')
-        total_records = cursor.fetchone()[0]
-        total_pages = (total_records + page_size - 1) // page_size
-
         # 最新记录应该在第一页（按时间倒序排列）
         return {'page': 1}
 
     def get_year_month_page(self, year, month, page_size=6):
-        """获取年月页"""
+        """获取年月页（该月筛选列表的最后一页，即最早的记录）"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        query = 'SELECT COUNT(*) FROM JL WHERE datetime LIKE ?'
-        cursor.execute(query, [f'{year}-{month}%'])
-        total_records = cursor.fetchone()[0]
+        key = timeline.normalize_year_month(f'{year}-{month}')
+        total_records = self._dimension_count(conn, 'month', key) if key else 0
         total_pages = (total_records + page_size - 1) // page_size
 
         return {'page': total_pages}
@@ -517,16 +853,7 @@ class DatabaseManager:
     def get_channel_page(self, channel, page_size=6):
         """获取渠道页"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-
-        if channel:
-            query = 'SELECT COUNT(*) FROM JL WHERE channel = ?'
-            cursor.execute(query, [channel])
-        else:
-            query = 'SELECT COUNT(*) FROM JL WHERE channel IS NULL OR channel = ""'
-            cursor.execute(query)
-
-        total_records = cursor.fetchone()[0]
+        total_records = self._dimension_count(conn, 'channel', channel or '')
         total_pages = (total_records + page_size - 1) // page_size
 
         # 如果没有记录，返回第1页而不是第0页
@@ -545,17 +872,114 @@ class DatabaseManager:
         if not result:
             return {'page': None}
 
-        record_datetime = result[0]
-
-        cursor.execute('''
-            SELECT COUNT(*) + 1 as position
-            FROM JL
-            WHERE datetime > ?
-        ''', (record_datetime,))
-        position = cursor.fetchone()[0]
+        position = timeline.timeline_position(conn, record_id, result[0])
         page = (position + page_size - 1) // page_size
 
         return {'page': page}
 
-# 创建全局数据库管理器实例
+    def locate(self, record_id=None, year_month=None, channel=None, page_size=6, anchor='newest'):
+        """一次返回目标记录（或年月、渠道）的位置、所在页和该页记录，找不到时返回 None"""
+        conn = self.get_connection()
+        result = timeline.locate(conn, record_id, year_month, channel, page_size, anchor)
+        if result:
+            for record in result['records']:
+                record['page'] = result['page']
+            self._attach_media(conn, result['records'])
+        return result
+
+    def scan_media(self, verify=True):
+        """检查媒体文件：缺失、孤立（无记录引用）以及与清单校验值不符的文件"""
+        conn = self._open_connection()
+        try:
+            result = media_scanner.scan_media(conn, verify=verify)
+        finally:
+            conn.close()
+        if result['updated']:
+            # 校验后写回了 JL_media 的大小：清空记录缓存并让 ETag 失效
+            self._notify_write('media', None)
+        return result
+
+    def cleanup_media(self, dry_run=True):
+        """把孤立媒体文件移入隔离目录（默认只预览不移动）"""
+        conn = self._open_connection()
+        try:
+            return media_scanner.cleanup_orphans(conn, dry_run=dry_run)
+        finally:
+            conn.close()
+
+    def index_media(self, job=None):
+        """增量解析媒体文件头（按 size 与 mtime），把尺寸、时长和占位图写入 media_meta 与 JL_media"""
+        conn = self._open_connection()
+        try:
+            result = media_scanner.index_media_metadata(conn, should_stop=self._background_should_stop(job))
+        finally:
+            conn.close()
+        if result['probed'] or result['removed'] or result['filled']:
+            # 记录附带的媒体信息变了：清空记录缓存并让 ETag 失效
+            self._notify_write('media', None)
+        return result
+
+    def detect_duplicates(self, job=None):
+        """为新记录计算 MinHash 签名并重新分组近似重复的记录（签名在进程池中计算）"""
+        conn = self._open_connection()
+        try:
+            result = dedupe.detect_duplicates(conn, should_stop=self._background_should_stop(job))
+        finally:
+            conn.close()
+        if result['changed']:
+            # 记录附带的分组信息变了：清空记录缓存并让 ETag 失效
+            self._notify_write('duplicates', None)
+        return result
+
+    def get_related(self, record_id, limit=10):
+        """与某条记录内容最相近的记录（TF-IDF 余弦相似度），记录不存在时返回 None
+
+        索引尚未建立或需要重建时在后台排队重建，建好之前 records 为空、building 为 True。
+        """
+        conn = self.get_connection()
+        started = time.perf_counter()
+        try:
+            scores = self.related_index.related(conn, record_id, limit)
+        except KeyError:
+            return None
+        if self.related_index.stale:
+            self._schedule_related_rebuild()
+        records = []
+        if scores:
+            by_id = {}
+            placeholders = ','.join('?' * len(scores))
+            for row in conn.execute(f'SELECT {", ".join(timeline.RECORD_COLUMNS)} FROM JL WHERE id IN ({placeholders})',
+                                    [other_id for other_id, _ in scores]):
+                by_id[row[0]] = timeline.row_to_record(row)
+            for other_id, score in scores:
+                if other_id in by_id:
+                    records.append(dict(by_id[other_id], score=score))
+            self._attach_media(conn, records)
+        return {
+            'id': record_id,
+            'records': records,
+            'building': scores is None,
+            'tookMs': round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def _schedule_related_rebuild(self):
+        if not self._related_queued:
+            self._related_queued = True
+            scheduler.submit('related index', self.rebuild_related, priority=PRIORITY_LOW, idle_only=True)
+
+    def rebuild_related(self, job=None):
+        """重建相关推文索引；索引已是最新（没有增量）时跳过"""
+        try:
+            stats = self.related_index.stats()
+            if not stats['stale'] and not stats['delta'] and not stats['hidden']:
+                return {'skipped': True}
+            return self.related_index.rebuild(should_stop=self._background_should_stop(job))
+        finally:
+            self._related_queued = False
+
+    def get_duplicate_clusters(self, page, page_size):
+        """按时间倒序分页列出近似重复的记录组"""
+        return dedupe.cluster_page(self.get_connection(), page, page_size)
+
+# 创建全局数据库管理器实例（不会在导入时访问数据库）
 db_manager = DatabaseManager()
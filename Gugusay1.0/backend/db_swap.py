@@ -0,0 +1,131 @@
+# 数据库热替换模块：读写闸门、后台连接的闸门登记，以及替换前对新数据库的校验
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from backend import migrations
+
+
+class SwapTimeout(TimeoutError):
+    pass
+
+
+class ReadWriteGate:
+    """请求和后台连接持有读锁，替换数据库时持有写锁
+
+    写锁优先：有替换在等待时，新的读者会被挡住，已有的读者结束后立即替换。
+    同一线程可以重复获取读锁（请求处理过程中打开后台连接不会自锁）。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @property
+    def writer_waiting(self):
+        """有替换在等待写锁：长时间持有读锁的后台任务应在批次之间关闭连接让路"""
+        return self._waiting_writers > 0
+
+    def holds_read(self):
+        return getattr(self._local, 'depth', 0) > 0
+
+    def acquire_read(self):
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            self._local.depth = depth + 1
+            return
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = 1
+
+    def release_read(self):
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self, timeout):
+        """等待所有读者结束后独占；timeout 秒内等不到时抛出 SwapTimeout，不影响读者"""
+        if self.holds_read():
+            raise RuntimeError('cannot swap the database while holding a read lock')
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                if not self._cond.wait_for(lambda: not self._writer and not self._readers, timeout):
+                    raise SwapTimeout('database is busy')
+                self._writer = True
+            finally:
+                self._waiting_writers -= 1
+                self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class GatedConnection(sqlite3.Connection):
+    """后台任务使用的连接：打开期间持有闸门的读锁，close() 时释放"""
+
+    _release = None
+
+    def close(self):
+        release, self._release = self._release, None
+        try:
+            super().close()
+        finally:
+            if release:
+                release()
+
+
+def open_gated(gate, db_path, timeout=30):
+    gate.acquire_read()
+    try:
+        conn = sqlite3.connect(db_path, timeout=timeout, factory=GatedConnection)
+    except Exception:
+        gate.release_read()
+        raise
+    conn._release = gate.release_read
+    return conn
+
+
+def validate_database(path):
+    """以只读方式检查待替换的数据库，返回错误信息，合格时返回 None"""
+    path = Path(path)
+    if not path.is_file():
+        return 'database file not found'
+    try:
+        conn = sqlite3.connect(f'{path.resolve().as_uri()}?mode=ro', uri=True)
+    except sqlite3.Error as e:
+        return str(e)
+    try:
+        if conn.execute('PRAGMA quick_check').fetchone()[0] != 'ok':
+            return 'integrity check failed'
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'JL'").fetchone():
+            return 'missing table JL'
+        if migrations.get_schema_version(conn) > migrations.latest_version():
+            return 'database was created by a newer version'
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+    return None
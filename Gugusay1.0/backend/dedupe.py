@@ -0,0 +1,229 @@
+# 近似重复检测模块：对正文的字符 shingle 计算 MinHash 签名，用 LSH 分桶找出候选对，
+# 把同一内容在多个渠道的转发归为一组存入 JL_duplicate，时间线据此折叠
+# 签名计算在进程池中并行；本模块只依赖标准库，子进程导入它的代价很小
+import os
+import random
+import re
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# 64 个哈希函数分成 16 段、每段 4 行：相似度约 0.5 以上的记录大概率至少落进同一个桶
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# 候选对的签名估计相似度达到这个值才算重复
+SIMILARITY_THRESHOLD = 0.7
+SHINGLE_SIZE = 3
+# 去掉链接和标点后太短的正文（如“哈哈哈”）不参与比较
+MIN_LENGTH = 12
+# 成员过多的桶通常是模板化的短句，跳过以免两两比较退化成平方
+MAX_BUCKET = 100
+# 小于这个数量时直接在当前线程计算，进程池的启动开销不值得
+POOL_THRESHOLD = 2000
+CHUNK_SIZE = 500
+
+# 32 位以内的最大素数：a * x + b 不会超出 64 位，签名可以按 'I' 存储
+PRIME = 4294967291
+_rng = random.Random(20110101)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+
+URL_RE = re.compile(r'https?://\S+', re.IGNORECASE)
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """小写并去掉链接、空白和标点，同一内容在不同渠道的排版差异不影响比较"""
+    return ''.join(WORD_RE.findall(URL_RE.sub(' ', (text or '').lower())))
+
+
+def signature(text):
+    """正文的 MinHash 签名（NUM_PERM 个 32 位整数的字节串）；正文太短时返回 None"""
+    text = normalize(text)
+    if len(text) < MIN_LENGTH:
+        return None
+    hashes = {zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8')) for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return array('I', [min((a * x + b) % PRIME for x in hashes) for a, b in PERMUTATIONS]).tobytes()
+
+
+def compute_signatures(rows):
+    """[(record_id, content)] -> [(record_id, signature)]，在进程池的子进程中执行"""
+    return [(record_id, signature(content)) for record_id, content in rows]
+
+
+def similarity(left, right):
+    """两个签名相同位置取值相等的比例，即 Jaccard 相似度的估计"""
+    left, right = array('I', left), array('I', right)
+    return sum(1 for x, y in zip(left, right) if x == y) / NUM_PERM
+
+
+def _pool_size():
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def _unsigned(conn):
+    return conn.execute('''
+        SELECT JL.id, JL.content FROM JL
+        LEFT JOIN JL_minhash m ON m.record_id = JL.id
+        WHERE m.record_id IS NULL
+        ORDER BY JL.id
+    ''').fetchall()
+
+
+def _store_signatures(conn, results):
+    conn.executemany('INSERT OR REPLACE INTO JL_minhash (record_id, signature) VALUES (?, ?)', results)
+    conn.commit()
+
+
+def sign_new_records(conn, should_stop=None, processes=None):
+    """为还没有签名的记录（新增或正文被修改过的）计算签名，每块提交一次，取消后下次从剩余部分继续"""
+    rows = _unsigned(conn)
+    chunks = [rows[start:start + CHUNK_SIZE] for start in range(0, len(rows), CHUNK_SIZE)]
+    signed = 0
+    if len(rows) < POOL_THRESHOLD:
+        for chunk in chunks:
+            if should_stop and should_stop():
+                break
+            _store_signatures(conn, compute_signatures(chunk))
+            signed += len(chunk)
+        return signed
+    executor = ProcessPoolExecutor(max_workers=processes or _pool_size())
+    try:
+        for results in executor.map(compute_signatures, chunks):
+            _store_signatures(conn, results)
+            signed += len(results)
+            if should_stop and should_stop():
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return signed
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        while parent != self.parent[parent]:
+            self.parent[parent] = self.parent[self.parent[parent]]
+            parent = self.parent[parent]
+        self.parent[item] = parent
+        return parent
+
+    def union(self, left, right):
+        self.parent[self.find(left)] = self.find(right)
+
+
+def find_clusters(conn, should_stop=None):
+    """对全部签名做 LSH 分桶，验证候选对后用并查集合并成组
+
+    返回 {record_id: cluster_id}，只包含至少两条记录的组；cluster_id 是组内最早发布的记录。
+    """
+    signatures = {}
+    order = {}
+    for record_id, blob, datetime_val in conn.execute('''
+        SELECT m.record_id, m.signature, JL.datetime
+        FROM JL_minhash m JOIN JL ON JL.id = m.record_id
+        WHERE m.signature IS NOT NULL
+    '''):
+        signatures[record_id] = blob
+        order[record_id] = (datetime_val or '', record_id)
+
+    groups = _UnionFind()
+    checked = set()
+    band_bytes = ROWS * 4
+    for band in range(BANDS):
+        if should_stop and should_stop():
+            return None
+        buckets = {}
+        for record_id, blob in signatures.items():
+            buckets.setdefault(blob[band * band_bytes:(band + 1) * band_bytes], []).append(record_id)
+        for members in buckets.values():
+            if len(members) < 2 or len(members) > MAX_BUCKET:
+                continue
+            for i, left in enumerate(members):
+                for right in members[i + 1:]:
+                    pair = (left, right)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    if similarity(signatures[left], signatures[right]) >= SIMILARITY_THRESHOLD:
+                        groups.union(left, right)
+
+    clusters = {}
+    for record_id in groups.parent:
+        clusters.setdefault(groups.find(record_id), []).append(record_id)
+    result = {}
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        primary = min(members, key=order.__getitem__)
+        result.update((record_id, primary) for record_id in members)
+    return result
+
+
+def detect_duplicates(conn, should_stop=None, processes=None):
+    """增量签名后重新分组，分组有变化时整体替换 JL_duplicate"""
+    started = time.perf_counter()
+    signed = sign_new_records(conn, should_stop, processes)
+    result = {'signed': signed, 'changed': False}
+    clusters = None if should_stop and should_stop() else find_clusters(conn, should_stop)
+    if clusters is None:
+        result['cancelled'] = True
+    else:
+        current = dict(conn.execute('SELECT record_id, cluster_id FROM JL_duplicate'))
+        if current != clusters:
+            conn.execute('DELETE FROM JL_duplicate')
+            conn.executemany('INSERT INTO JL_duplicate (record_id, cluster_id) VALUES (?, ?)', clusters.items())
+            conn.commit()
+            result['changed'] = True
+        result['clusters'] = len(set(clusters.values()))
+        result['duplicates'] = len(clusters) - result['clusters']
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def load_clusters(conn, record_ids):
+    """{record_id: (cluster_id, 组内记录数)}，只包含属于某个重复组的记录"""
+    if not record_ids:
+        return {}
+    placeholders = ','.join('?' * len(record_ids))
+    rows = conn.execute(f'''
+        SELECT d.record_id, d.cluster_id, (SELECT COUNT(*) FROM JL_duplicate c WHERE c.cluster_id = d.cluster_id)
+        FROM JL_duplicate d
+        WHERE d.record_id IN ({placeholders})
+    ''', list(record_ids)).fetchall()
+    return {record_id: (cluster_id, size) for record_id, cluster_id, size in rows}
+
+
+def cluster_page(conn, page, page_size):
+    """按主记录时间倒序分页列出重复组，每组附带成员的时间、渠道和正文开头"""
+    # 与分页查询相同的条件：只统计主记录仍然存在的组
+    total = conn.execute('''
+        SELECT COUNT(*) FROM JL_duplicate d JOIN JL ON JL.id = d.cluster_id
+        WHERE d.record_id = d.cluster_id
+    ''').fetchone()[0]
+    cluster_ids = [row[0] for row in conn.execute('''
+        SELECT d.cluster_id FROM JL_duplicate d JOIN JL ON JL.id = d.cluster_id
+        WHERE d.record_id = d.cluster_id
+        ORDER BY JL.datetime DESC, JL.id DESC
+        LIMIT ? OFFSET ?
+    ''', (page_size, (page - 1) * page_size))]
+    clusters = {cluster_id: [] for cluster_id in cluster_ids}
+    if cluster_ids:
+        placeholders = ','.join('?' * len(cluster_ids))
+        for cluster_id, record_id, datetime_val, channel, excerpt in conn.execute(f'''
+            SELECT d.cluster_id, JL.id, JL.datetime, JL.channel, substr(JL.content, 1, 80)
+            FROM JL_duplicate d JOIN JL ON JL.id = d.record_id
+            WHERE d.cluster_id IN ({placeholders})
+            ORDER BY JL.datetime, JL.id
+        ''', cluster_ids):
+            clusters[cluster_id].append({'id': record_id, 'datetime': datetime_val, 'channel': channel, 'excerpt': excerpt})
+    return {
+        'clusters': [{'id': cluster_id, 'records': clusters[cluster_id]} for cluster_id in cluster_ids],
+        'currentPage': page,
+        'totalPages': (total + page_size - 1) // page_size,
+        'total': total
+    }
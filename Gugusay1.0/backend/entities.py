@@ -0,0 +1,119 @@
+# 实体索引模块：从正文中提取话题、@提及和链接，存入 JL_entity 子表，话题浏览按索引查询而不扫描 content
+import re
+
+from backend import timeline
+
+KINDS = ('topic', 'mention', 'url')
+# 链接遇到空白、引号、尖括号或全角标点时结束；提取时先去掉链接，避免其中的 #锚点 和 @ 被当成话题或提及
+URL_RE = re.compile(r'https?://[^\s<>"\'\u3000-\u303f\uff01-\uff5e]+', re.IGNORECASE)
+URL_TRAILING = '.,;:!?)]}\'"'
+# 微博话题：#话题# 成对出现；中间有空格时必须含中文，否则 "#Python and #tips" 会被当成一个话题
+WEIBO_TOPIC_RE = re.compile(r'(?<!&)#([^#\r\n]{1,64}?)#')
+CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+# 推特话题：#word，前面不能是字母数字、& 或 #（排除 HTML 实体 &#123; 和 ##）
+HASHTAG_RE = re.compile(r'(?<![\w&#])#(\w{1,64})')
+# @提及：前面不能是字母数字或 .（排除邮箱地址），昵称由文字、数字、_ 和 - 组成
+MENTION_RE = re.compile(r'(?<![\w.@])@([\w\-]{1,30})')
+MAX_VALUE_LENGTH = 200
+
+
+def extract_entities(text):
+    """返回正文中的实体集合 {(kind, value)}；话题和提及统一为小写，链接去掉末尾的标点"""
+    entities = set()
+    if not text:
+        return entities
+    for match in URL_RE.finditer(text):
+        url = match.group(0).rstrip(URL_TRAILING)
+        if len(url) > len('https://') and len(url) <= MAX_VALUE_LENGTH:
+            entities.add(('url', url))
+    text = URL_RE.sub(' ', text)
+    text = _extract_weibo_topics(text, entities)
+    for match in HASHTAG_RE.finditer(text):
+        if not match.group(1).isdigit():
+            entities.add(('topic', match.group(1).lower()))
+    for match in MENTION_RE.finditer(text):
+        entities.add(('mention', match.group(1).lower()))
+    return entities
+
+
+def _extract_weibo_topics(text, entities):
+    """取出成对的 #话题#，返回去掉这些话题后的正文；不成立的配对从后一个 # 继续匹配"""
+    pieces = []
+    position = start = 0
+    while True:
+        match = WEIBO_TOPIC_RE.search(text, position)
+        if not match:
+            break
+        topic = match.group(1).strip()
+        if topic and not topic.isdigit() and (topic == ''.join(topic.split()) or CJK_RE.search(topic)):
+            entities.add(('topic', topic.lower()))
+            pieces.append(text[start:match.start()])
+            position = start = match.end()
+        else:
+            position = match.start() + 1
+    pieces.append(text[start:])
+    return ' '.join(pieces)
+
+
+def normalize_value(kind, value):
+    """查询参数按提取时的规则统一（话题和提及不区分大小写）"""
+    value = (value or '').strip()
+    return value if kind == 'url' else value.lstrip('#@').rstrip('#').lower()
+
+
+def replace_record_entities(conn, record_id, content, datetime_val):
+    """用正文重建某条记录的 JL_entity 行（调用方负责提交事务）"""
+    conn.execute('DELETE FROM JL_entity WHERE record_id = ?', (record_id,))
+    rows = [(kind, value, record_id, datetime_val) for kind, value in extract_entities(content)]
+    if rows:
+        conn.executemany('INSERT INTO JL_entity (kind, value, record_id, datetime) VALUES (?, ?, ?, ?)', rows)
+    return len(rows)
+
+
+def _time_range(since, until):
+    """把年、年月或日期形式的起止范围转换为 datetime 文本的比较条件"""
+    conditions, params = [], []
+    if since:
+        conditions.append('datetime >= ?')
+        params.append(since)
+    if until:
+        # until 是前缀：'2023-05' 包含整个五月
+        conditions.append('datetime < ?')
+        params.append(until + timeline.PREFIX_END)
+    return conditions, params
+
+
+def top_entities(conn, kind, since=None, until=None, limit=50):
+    """时间范围内出现在最多记录中的实体，返回 [{'value', 'count', 'latest'}]"""
+    conditions, params = _time_range(since, until)
+    where = ' AND '.join(['kind = ?'] + conditions)
+    # 有时间范围时按 (kind, datetime) 索引只读范围内的行，否则按主键顺序分组
+    indexed = 'INDEXED BY idx_jl_entity_time' if conditions else ''
+    rows = conn.execute(f'''
+        SELECT value, COUNT(*) AS count, MAX(datetime) AS latest
+        FROM JL_entity {indexed}
+        WHERE {where}
+        GROUP BY value
+        ORDER BY count DESC, latest DESC
+        LIMIT ?
+    ''', [kind] + params + [limit]).fetchall()
+    return [{'value': value, 'count': count, 'latest': latest} for value, count, latest in rows]
+
+
+def count_records(conn, kind, value):
+    return conn.execute(
+        'SELECT COUNT(*) FROM JL_entity WHERE kind = ? AND value = ?', (kind, value)
+    ).fetchone()[0]
+
+
+def record_page(conn, kind, value, page, page_size):
+    """包含某个实体的记录，按时间线顺序分页（走 (kind, value, datetime) 索引，不读取其他记录）"""
+    columns = ', '.join(f'JL.{column}' for column in timeline.RECORD_COLUMNS)
+    rows = conn.execute(f'''
+        SELECT {columns}
+        FROM JL_entity e JOIN JL ON JL.id = e.record_id
+        WHERE e.kind = ? AND e.value = ?
+        ORDER BY e.datetime DESC, e.record_id DESC
+        LIMIT ? OFFSET ?
+    ''', (kind, value, page_size, (page - 1) * page_size)).fetchall()
+    return [timeline.row_to_record(row) for row in rows]
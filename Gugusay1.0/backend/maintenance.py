@@ -0,0 +1,105 @@
+# 数据库维护任务：在界面空闲时由后台调度器执行，每个任务使用独立连接
+from backend import changefeed
+from backend.scheduler import PRIORITY_LOW
+
+HOUR = 3600
+# incremental_vacuum 每批释放的页数，批次之间检查是否需要让出
+VACUUM_BATCH_PAGES = 256
+# PRAGMA auto_vacuum 的返回值：0 NONE，1 FULL，2 INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _with_connection(db_manager, task):
+    """task(conn, should_stop)：should_stop() 在任务被取消、界面忙碌或有数据库替换在等待时为真"""
+    def run(job):
+        conn = db_manager._open_connection()
+        try:
+            return task(conn, db_manager._background_should_stop(job))
+        finally:
+            conn.close()
+    return run
+
+
+def analyze(conn, should_stop):
+    """首次运行时收集统计信息，之后由 PRAGMA optimize 按需更新"""
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    if has_stats:
+        return 'skipped'
+    conn.execute('ANALYZE')
+    conn.commit()
+    return 'analyzed'
+
+
+def optimize(conn, should_stop):
+    conn.execute('PRAGMA optimize')
+    conn.commit()
+    return 'ok'
+
+
+def optimize_fulltext(conn, should_stop):
+    """合并 FTS5 的分段 b-tree（全文索引不存在或仍在回填时跳过）"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'JL_fts'").fetchone():
+        return 'skipped'
+    if conn.execute("SELECT 1 FROM schema_backfill WHERE name = 'jl_fts'").fetchone():
+        return 'skipped'
+    conn.execute("INSERT INTO JL_fts (JL_fts) VALUES ('optimize')")
+    conn.commit()
+    return 'ok'
+
+
+def prune_changelog(conn, should_stop):
+    return {'deleted': changefeed.prune(conn)}
+
+
+def incremental_vacuum(conn, should_stop):
+    """分批归还空闲页，批次之间检查是否需要让出；只处理已开启 INCREMENTAL 模式的数据库"""
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        return {'freed_pages': 0, 'skipped': 'auto_vacuum is not incremental'}
+    freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    freed = 0
+    while freelist and not should_stop():
+        # execute() 只单步执行一次，每次只释放一页；executescript 会执行到底，一批释放 VACUUM_BATCH_PAGES 页
+        conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_BATCH_PAGES})')
+        remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        freed += freelist - remaining
+        if remaining >= freelist:
+            break
+        freelist = remaining
+    return {'freed_pages': freed}
+
+
+def convert_to_incremental(conn, should_stop):
+    """把未开启 auto_vacuum 的数据库转换为 INCREMENTAL 模式
+
+    修改 auto_vacuum 需要一次完整的 VACUUM 才生效，期间无法中断，所以只在用户要求时执行。
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        return {'converted': False}
+    freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    return {'converted': True, 'freed_pages': freelist}
+
+
+def submit_vacuum_conversion(scheduler, db_manager):
+    return scheduler.submit('vacuum conversion', _with_connection(db_manager, convert_to_incremental))
+
+
+def register_jobs(scheduler, db_manager):
+    """登记周期性维护任务（均为空闲时执行，包括每日快照）以及搜索联想索引的预热"""
+    scheduler.every('analyze', 24 * HOUR, _with_connection(db_manager, analyze), initial_delay=60)
+    scheduler.every('pragma optimize', 6 * HOUR, _with_connection(db_manager, optimize), initial_delay=120)
+    scheduler.every('fulltext optimize', 24 * HOUR, _with_connection(db_manager, optimize_fulltext), initial_delay=300)
+    scheduler.every('incremental vacuum', 24 * HOUR, _with_connection(db_manager, incremental_vacuum), initial_delay=600)
+    scheduler.every('changelog prune', 24 * HOUR, _with_connection(db_manager, prune_changelog), initial_delay=450)
+    scheduler.every('database snapshot', 24 * HOUR, db_manager.create_snapshot, initial_delay=900)
+    scheduler.every('media metadata', 6 * HOUR, db_manager.index_media, initial_delay=180)
+    scheduler.every('duplicate detection', 6 * HOUR, db_manager.detect_duplicates, initial_delay=240)
+    scheduler.every('related index', 24 * HOUR, db_manager.rebuild_related, initial_delay=1200)
+    scheduler.submit(
+        'suggest index warm-up',
+        lambda job: db_manager.suggest_index.warm(),
+        priority=PRIORITY_LOW,
+        delay=30,
+        idle_only=True,
+    )
@@ -0,0 +1,69 @@
+# 媒体索引模块：维护 JL_media 子表（每条记录的媒体文件逐行存放）
+import os
+
+from backend import media_meta
+from backend.config import MEDIA_DIR
+
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.ogg', '.mov', '.m4v'}
+MEDIA_COLUMNS = ('path', 'kind', 'size', 'width', 'height', 'duration', 'placeholder')
+
+
+def split_media_paths(media_path):
+    """把 JL.media_path 中逗号分隔的路径拆成列表（去空白、去空项）"""
+    if not media_path:
+        return []
+    return [path.strip() for path in media_path.split(',') if path.strip()]
+
+
+def normalize_media_path(path):
+    """把记录中的媒体路径（"media/x.png"、"/media/x.png"）转换为相对 MEDIA_DIR 的路径"""
+    rel = (path or '').replace('\\', '/').lstrip('/')
+    if rel.startswith('media/'):
+        rel = rel[len('media/'):]
+    return rel
+
+
+def media_kind(path):
+    """根据扩展名判断媒体类型"""
+    extension = os.path.splitext(path)[1].lower()
+    return 'video' if extension in VIDEO_EXTENSIONS else 'image'
+
+
+def replace_record_media(conn, record_id, media_path, media_dir=MEDIA_DIR, probe=True):
+    """用 media_path 重建某条记录的 JL_media 行，并带上文件的尺寸、时长等元数据（调用方负责提交事务）
+
+    新上传、尚未索引的文件当场解析文件头，保存后的记录立即带有尺寸。
+    probe=False 时只写路径和类型，元数据留空，由空闲时的 index_media_metadata 补上。
+    """
+    conn.execute('DELETE FROM JL_media WHERE record_id = ?', (record_id,))
+    paths = split_media_paths(media_path)
+    meta = media_meta.lookup_or_probe(conn, [normalize_media_path(path) for path in paths], media_dir) if probe else {}
+    empty = dict.fromkeys(media_meta.META_FIELDS)
+    rows = []
+    for ordinal, path in enumerate(paths):
+        info = meta.get(normalize_media_path(path), empty)
+        rows.append((record_id, ordinal, path, media_kind(path)) + tuple(info[field] for field in media_meta.META_FIELDS))
+    if rows:
+        conn.executemany(
+            'INSERT INTO JL_media (record_id, ordinal, path, kind, size, width, height, duration, placeholder) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+    return len(rows)
+
+
+def load_media(conn, record_ids):
+    """一次查询取出多条记录的媒体列表，返回 {record_id: [media, ...]}"""
+    media = {record_id: [] for record_id in record_ids}
+    if not record_ids:
+        return media
+    placeholders = ','.join('?' * len(media))
+    cursor = conn.execute(f'''
+        SELECT record_id, path, kind, size, width, height, duration, placeholder
+        FROM JL_media
+        WHERE record_id IN ({placeholders})
+        ORDER BY record_id, ordinal
+    ''', list(media))
+    for row in cursor.fetchall():
+        media[row[0]].append(dict(zip(MEDIA_COLUMNS, row[1:])))
+    return media
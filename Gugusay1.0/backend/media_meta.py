@@ -0,0 +1,301 @@
+# 媒体元数据模块：只读取文件头解析图片尺寸、视频尺寸和时长（不解码整个文件），结果按路径缓存在 media_meta 表
+import os
+import struct
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.m4v'}
+META_FIELDS = ('size', 'width', 'height', 'duration', 'placeholder')
+# JPEG 的 SOF 段一般紧跟在 EXIF 之后，超过这个距离仍未找到就放弃
+JPEG_SCAN_LIMIT = 4 * 1024 * 1024
+# moov 只含索引信息，超过这个大小视为异常文件
+MOOV_LIMIT = 64 * 1024 * 1024
+# 占位图的色块网格（横图 4x3，竖图 3x4）
+PLACEHOLDER_GRID = (4, 3)
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def is_media_file(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS | VIDEO_EXTENSIONS
+
+
+def _png(head):
+    return struct.unpack('>II', head[16:24])
+
+
+def _gif(head):
+    return struct.unpack('<HH', head[6:10])
+
+
+def _webp(head):
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    return None
+
+
+def _exif_orientation(data):
+    """从 APP1 段的 EXIF 中读取方向标记（0x0112），没有时返回 1"""
+    if not data.startswith(b'Exif\x00\x00'):
+        return 1
+    tiff = data[6:]
+    order = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if not order or len(tiff) < 8:
+        return 1
+    offset = struct.unpack(order + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return 1
+    count = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+    for index in range(count):
+        entry = tiff[offset + 2 + index * 12:offset + 14 + index * 12]
+        if len(entry) < 12:
+            break
+        if struct.unpack(order + 'H', entry[:2])[0] == 0x0112:
+            return struct.unpack(order + 'H', entry[8:10])[0]
+    return 1
+
+
+def _jpeg(f):
+    """逐段跳过 JPEG 标记直到 SOF（只读段头，不读图像数据）；EXIF 方向为 5~8 时宽高互换"""
+    f.seek(2)
+    orientation = 1
+    while f.tell() < JPEG_SCAN_LIMIT:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue
+        if marker == 0xD9 or marker == 0xDA:
+            return None
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', f.read(5))
+            return (height, width) if orientation >= 5 else (width, height)
+        if marker == 0xE1:
+            orientation = _exif_orientation(f.read(length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+    return None
+
+
+def _mp4_boxes(data):
+    offset = 0
+    while offset + 8 <= len(data):
+        size, kind = struct.unpack('>I4s', data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header:
+            return
+        yield kind, data[offset + header:offset + size]
+        offset += size
+
+
+def _parse_moov(moov):
+    """从 moov 中取 mvhd 的时长和视频轨道 tkhd 的显示尺寸（旋转 90/270 度时宽高互换）"""
+    duration = None
+    tracks = []
+    for kind, payload in _mp4_boxes(moov):
+        if kind == b'mvhd':
+            if payload[0] == 1:
+                timescale, length = struct.unpack('>IQ', payload[20:32])
+            else:
+                timescale, length = struct.unpack('>II', payload[12:20])
+            if timescale:
+                duration = round(length / timescale, 3)
+        elif kind == b'trak':
+            track = {'handler': None, 'size': None}
+            for child, body in _mp4_boxes(payload):
+                if child == b'tkhd':
+                    base = 36 if body[0] == 1 else 24
+                    a, b = struct.unpack('>ii', body[base + 16:base + 24])
+                    width, height = struct.unpack('>II', body[base + 52:base + 60])
+                    width, height = width >> 16, height >> 16
+                    track['size'] = (height, width) if a == 0 and b != 0 else (width, height)
+                elif child == b'mdia':
+                    for grandchild, inner in _mp4_boxes(body):
+                        if grandchild == b'hdlr':
+                            track['handler'] = inner[8:12]
+            tracks.append(track)
+    sizes = [track['size'] for track in tracks if track['handler'] == b'vide' and track['size']]
+    sizes = sizes or [track['size'] for track in tracks if track['size'] and track['size'][0]]
+    width, height = sizes[0] if sizes else (None, None)
+    return {'width': width or None, 'height': height or None, 'duration': duration}
+
+
+def _mp4(f, file_size):
+    """按顶层 box 头跳转找到 moov（无论在文件头还是文件尾），只读取 moov 本身"""
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        size, kind = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size:
+            return None
+        if kind == b'moov':
+            if size > MOOV_LIMIT:
+                return None
+            f.seek(offset + header_size)
+            return _parse_moov(f.read(size - header_size))
+        offset += size
+    return None
+
+
+def _probe_stream(f, file_size):
+    head = f.read(32)
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        size = _png(head)
+    elif head[:6] in (b'GIF87a', b'GIF89a'):
+        size = _gif(head)
+    elif head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        size = _webp(head)
+    elif head.startswith(b'\xff\xd8'):
+        size = _jpeg(f)
+    elif head[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip'):
+        return dict(_mp4(f, file_size) or {}, kind='video')
+    else:
+        return {}
+    if not size:
+        return {'kind': 'image'}
+    return {'kind': 'image', 'width': size[0] or None, 'height': size[1] or None}
+
+
+def _placeholder(path, width, height):
+    """几个色块组成的模糊占位图，格式为 "4x3:" 加每块的 RRGGBB
+
+    需要解码像素，使用 Pillow（JPEG 用 draft 按 1/8 缩放解码）。打包时由 build.py 一并打包，
+    从源码运行且未安装时返回 None。
+    """
+    try:
+        from PIL import Image, ImageOps
+    except Exception:
+        return None
+    columns, rows = PLACEHOLDER_GRID if width >= height else PLACEHOLDER_GRID[::-1]
+    try:
+        with Image.open(path) as image:
+            image.draft('RGB', (columns * 16, rows * 16))
+            small = ImageOps.exif_transpose(image).convert('RGB').resize((columns, rows), Image.BILINEAR)
+            pixels = small.tobytes()
+    except Exception:
+        return None
+    return f'{columns}x{rows}:' + pixels.hex()
+
+
+def probe_file(path):
+    """读取一个媒体文件的元数据，返回 META_FIELDS 字典；无法识别的格式只有 size，文件不存在时返回 None"""
+    try:
+        file_size = os.path.getsize(path)
+    except OSError:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            info = _probe_stream(f, file_size)
+    except (OSError, struct.error, IndexError):
+        # 文件头损坏或被截断：仍记录大小，避免每次都重新解析
+        info = {}
+    meta = dict.fromkeys(META_FIELDS)
+    meta['size'] = file_size
+    meta.update((key, info.get(key)) for key in ('width', 'height', 'duration'))
+    if info.get('kind') == 'image' and meta['width'] and meta['height']:
+        meta['placeholder'] = _placeholder(path, meta['width'], meta['height'])
+    return meta
+
+
+def known_files(conn):
+    """已索引文件的 {path: (size, mtime_ns)}，用于增量判断"""
+    return {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute('SELECT path, size, mtime_ns FROM media_meta')}
+
+
+def _select(conn, paths):
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    placeholders = ','.join('?' * len(paths))
+    rows = conn.execute(f'''
+        SELECT path, mtime_ns, size, width, height, duration, placeholder FROM media_meta WHERE path IN ({placeholders})
+    ''', paths)
+    return {row[0]: (row[1], dict(zip(META_FIELDS, row[2:]))) for row in rows}
+
+
+def lookup(conn, paths):
+    """按相对 MEDIA_DIR 的路径取出元数据，返回 {path: meta}"""
+    return {path: meta for path, (_, meta) in _select(conn, paths).items()}
+
+
+def lookup_or_probe(conn, paths, media_dir):
+    """取出元数据；文件未索引或 size/mtime 已变化时当场解析文件头并写入缓存（调用方负责提交事务）"""
+    cached = _select(conn, paths)
+    result = {}
+    fresh = []
+    for path in dict.fromkeys(paths):
+        full_path = os.path.join(media_dir, path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            if path in cached:
+                result[path] = cached[path][1]
+            continue
+        if path in cached and (cached[path][1]['size'], cached[path][0]) == (stat.st_size, stat.st_mtime_ns):
+            result[path] = cached[path][1]
+            continue
+        meta = probe_file(full_path)
+        if meta:
+            result[path] = meta
+            fresh.append((path, stat.st_mtime_ns, meta))
+    if fresh:
+        store(conn, fresh)
+    return result
+
+
+def store(conn, entries):
+    """写入 (path, mtime_ns, meta) 列表（调用方负责提交事务）"""
+    conn.executemany('''
+        INSERT INTO media_meta (path, size, mtime_ns, width, height, duration, placeholder)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            size = excluded.size, mtime_ns = excluded.mtime_ns, width = excluded.width,
+            height = excluded.height, duration = excluded.duration, placeholder = excluded.placeholder
+    ''', [
+        (path, meta['size'], mtime_ns, meta['width'], meta['height'], meta['duration'], meta['placeholder'])
+        for path, mtime_ns, meta in entries
+    ])
+
+
+def forget(conn, paths):
+    conn.executemany('DELETE FROM media_meta WHERE path = ?', [(path,) for path in paths])
+
+
+def sync_record_media(conn, paths):
+    """把 media_meta 中这些文件的元数据写到引用它们的 JL_media 行（路径可能带 media/ 或 /media/ 前缀）"""
+    rows = [
+        (meta['size'], meta['width'], meta['height'], meta['duration'], meta['placeholder'], path, f'media/{path}', f'/media/{path}')
+        for path, meta in lookup(conn, paths).items()
+    ]
+    conn.executemany('''
+        UPDATE JL_media SET size = ?, width = ?, height = ?, duration = ?, placeholder = ?
+        WHERE path IN (?, ?, ?)
+    ''', rows)
+    return len(rows)
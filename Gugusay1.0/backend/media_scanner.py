@@ -0,0 +1,236 @@
+# 媒体完整性检查模块：对照 SR.db 和媒体清单找出缺失、孤立和校验不符的文件，并增量解析媒体文件头
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from backend import media_index, media_meta, migrations
+from backend.config import DATA_DIR, MEDIA_DIR
+
+MANIFEST_NAME = 'media-manifest.json'
+QUARANTINE_DIR = Path(DATA_DIR) / 'media_quarantine'
+SCAN_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+HASH_CHUNK = 1024 * 1024
+# 检查时既不报告也不移动的文件
+IGNORED_NAMES = {MANIFEST_NAME, 'Thumbs.db', 'desktop.ini', '.DS_Store'}
+
+normalize_media_path = media_index.normalize_media_path
+
+
+def _manifest_candidates(media_dir):
+    return [Path(DATA_DIR) / MANIFEST_NAME, Path(media_dir) / MANIFEST_NAME]
+
+
+def _scan_dir(directory, prefix):
+    files = {}
+    subdirs = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            rel = f'{prefix}{entry.name}'
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, f'{rel}/'))
+            elif entry.is_file(follow_symlinks=False) and entry.name not in IGNORED_NAMES:
+                st = entry.stat(follow_symlinks=False)
+                files[rel] = (st.st_size, st.st_mtime_ns)
+    return files, subdirs
+
+
+def walk_media(media_dir, workers=SCAN_WORKERS):
+    """列出 media_dir 下的所有文件 {相对路径: (size, mtime_ns)}，各子目录并行扫描"""
+    files = {}
+    if not os.path.isdir(media_dir):
+        return files
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_dir, media_dir, '')}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, subdirs = future.result()
+                files.update(found)
+                for directory, prefix in subdirs:
+                    pending.add(pool.submit(_scan_dir, directory, prefix))
+    return files
+
+
+def load_manifest(media_dir, manifest_path=None):
+    """读取 media-manifest.json，返回 {相对路径: {'size', 'sha256'}}，没有清单时返回 None"""
+    candidates = [Path(manifest_path)] if manifest_path else _manifest_candidates(media_dir)
+    for candidate in candidates:
+        if not candidate.is_file():
+            continue
+        with open(candidate, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {
+            normalize_media_path(item['path']): {'size': item.get('size'), 'sha256': (item.get('sha256') or '').lower()}
+            for item in data.get('files', [])
+            if item.get('path')
+        }
+    return None
+
+
+def referenced_media(conn):
+    """被记录引用的媒体文件 {相对路径: [记录 id]}，按 JL_media 的路径索引一次读出"""
+    refs = {}
+    if 'jl_media' in migrations.pending_backfills(conn):
+        # JL_media 仍在回填，改读原始的 media_path 列
+        rows = conn.execute("SELECT id, media_path FROM JL WHERE media_path IS NOT NULL AND media_path != ''")
+        for record_id, media_path in rows:
+            for path in media_index.split_media_paths(media_path):
+                refs.setdefault(normalize_media_path(path), []).append(record_id)
+        return refs
+    for path, record_id in conn.execute('SELECT path, record_id FROM JL_media ORDER BY path'):
+        refs.setdefault(normalize_media_path(path), []).append(record_id)
+    return refs
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_files(conn, media_dir, files, paths, workers=SCAN_WORKERS):
+    """返回 {path: sha256}；size 和 mtime 未变的文件直接用 media_file 中记下的校验值"""
+    cached = {}
+    for path, size, mtime_ns, sha256 in conn.execute('SELECT path, size, mtime_ns, sha256 FROM media_file'):
+        if path in files and files[path] == (size, mtime_ns) and sha256:
+            cached[path] = sha256
+    to_hash = [path for path in paths if path not in cached]
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = pool.map(lambda rel: _sha256_file(os.path.join(media_dir, rel)), to_hash)
+            fresh = dict(zip(to_hash, digests))
+        conn.executemany('''
+            INSERT INTO media_file (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256
+        ''', [(path, files[path][0], files[path][1], digest) for path, digest in fresh.items()])
+        cached.update(fresh)
+    return {path: cached[path] for path in paths}
+
+
+def scan_media(conn, media_dir=MEDIA_DIR, manifest_path=None, verify=True):
+    """对照数据库和媒体清单检查 media_dir
+
+    报告被引用但不存在的文件、没有记录引用的孤立文件，以及大小或 sha256 与清单不符的文件；
+    verify=False 时只比较大小，不计算校验值。校验通过的被引用文件会把大小和校验值写回 JL_media，
+    写回的行数在 updated 中返回（调用方据此通知写入监听）。
+    """
+    started = time.perf_counter()
+    files = walk_media(media_dir)
+    manifest = load_manifest(media_dir, manifest_path)
+    refs = referenced_media(conn)
+    corrupted = []
+    hashed = 0
+    updated = 0
+    if manifest:
+        listed = [path for path in manifest if path in files]
+        digests = hash_files(conn, media_dir, files, listed) if verify else {}
+        hashed = len(digests)
+        for path in listed:
+            expected = manifest[path]
+            size = files[path][0]
+            if expected['size'] is not None and expected['size'] != size:
+                corrupted.append({'path': path, 'reason': 'size', 'expected': expected['size'], 'actual': size})
+            elif path in digests and expected['sha256'] and digests[path] != expected['sha256']:
+                corrupted.append({'path': path, 'reason': 'sha256', 'expected': expected['sha256'], 'actual': digests[path]})
+        bad = {item['path'] for item in corrupted}
+        for path, digest in digests.items():
+            if path in refs and path not in bad:
+                updated += conn.execute('''
+                    UPDATE JL_media SET size = ?, sha256 = ?
+                    WHERE path IN (?, ?, ?) AND (size IS NOT ? OR sha256 IS NOT ?)
+                ''', (files[path][0], digest, path, f'media/{path}', f'/media/{path}', files[path][0], digest)).rowcount
+    conn.commit()
+
+    missing = [{'path': path, 'record_ids': ids} for path, ids in sorted(refs.items()) if path not in files]
+    orphaned = [
+        {'path': path, 'size': files[path][0], 'in_manifest': bool(manifest and path in manifest)}
+        for path in sorted(files)
+        if path not in refs
+    ]
+    return {
+        'file_count': len(files),
+        'referenced_count': len(refs),
+        'manifest_count': len(manifest) if manifest is not None else None,
+        'hashed_count': hashed,
+        'updated': updated,
+        'missing': missing,
+        'orphaned': orphaned,
+        'corrupted': corrupted,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def index_media_metadata(conn, media_dir=MEDIA_DIR, should_stop=None, batch_size=200):
+    """解析新增或变化的媒体文件头写入 media_meta，并把结果同步到 JL_media
+
+    size 和 mtime 与已存行一致的文件跳过，重复运行只需遍历目录；每批提交一次，
+    should_stop() 为真时在批次之间停下。
+    """
+    started = time.perf_counter()
+    files = walk_media(media_dir)
+    known = media_meta.known_files(conn)
+    removed = [path for path in known if path not in files]
+    stale = [path for path, stat in files.items() if known.get(path) != stat and media_meta.is_media_file(path)]
+    media_meta.forget(conn, removed)
+    conn.commit()
+
+    probed = 0
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        for start in range(0, len(stale), batch_size):
+            if should_stop and should_stop():
+                break
+            batch = stale[start:start + batch_size]
+            results = pool.map(lambda rel: media_meta.probe_file(os.path.join(media_dir, rel)), batch)
+            entries = [(rel, files[rel][1], dict(meta, size=files[rel][0])) for rel, meta in zip(batch, results) if meta]
+            media_meta.store(conn, entries)
+            media_meta.sync_record_media(conn, [rel for rel, _, _ in entries])
+            conn.commit()
+            probed += len(batch)
+
+    # 文件尚未索引时就写入的 JL_media 行（例如 jl_media 回填写入的）
+    unfilled = {
+        normalize_media_path(path)
+        for (path,) in conn.execute('SELECT DISTINCT path FROM JL_media WHERE width IS NULL AND duration IS NULL')
+    }
+    indexed = media_meta.lookup(conn, unfilled)
+    filled = media_meta.sync_record_media(conn, [path for path, meta in indexed.items() if meta['width'] or meta['duration']])
+    conn.commit()
+    return {
+        'file_count': len(files),
+        'probed': probed,
+        'pending': len(stale) - probed,
+        'removed': len(removed),
+        'filled': filled,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def cleanup_orphans(conn, media_dir=MEDIA_DIR, manifest_path=None, dry_run=True):
+    """把孤立文件移入 DATA_DIR/media_quarantine/<时间戳>/，不直接删除
+
+    仍在媒体清单中的文件保留（待安装的数据库更新可能引用它们）；
+    移动前重新检查一次，上次检查之后被编辑引用的文件不会被移走。
+    """
+    report = scan_media(conn, media_dir, manifest_path, verify=False)
+    candidates = [item['path'] for item in report['orphaned'] if not item['in_manifest']]
+    target_root = QUARANTINE_DIR / time.strftime('%Y%m%d-%H%M%S')
+    moved = []
+    if not dry_run:
+        for rel in candidates:
+            source = Path(media_dir) / rel
+            target = target_root / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(source), str(target))
+            moved.append(rel)
+    return {
+        'dry_run': dry_run,
+        'candidates': candidates,
+        'moved': moved,
+        'quarantine_dir': str(target_root) if moved else '',
+    }
@@ -0,0 +1,84 @@
+import threading
+from collections import deque
+
+# Recent samples kept per endpoint for percentiles; older ones only count towards the totals.
+WINDOW = 200
+MAX_ENDPOINTS = 100
+# Client sources: "network" (200), "revalidated" (304 from our ETag), "deduped" (shared an in-flight request),
+# "bridge" (served over the pywebview js_api instead of HTTP)
+CLIENT_SOURCES = ("network", "revalidated", "deduped", "bridge", "aborted", "error")
+
+_lock = threading.Lock()
+_server = {}
+_client = {}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _bucket(table, name):
+    bucket = table.get(name)
+    if bucket is None:
+        if len(table) >= MAX_ENDPOINTS:
+            return None
+        bucket = {"count": 0, "total_ms": 0.0, "recent": deque(maxlen=WINDOW), "sources": {}}
+        table[name] = bucket
+    return bucket
+
+
+def _add(table, name, ms, source=None):
+    bucket = _bucket(table, name)
+    if bucket is None:
+        return
+    ms = round(ms, 1)
+    bucket["count"] += 1
+    bucket["total_ms"] += ms
+    bucket["recent"].append(ms)
+    if source:
+        bucket["sources"][source] = bucket["sources"].get(source, 0) + 1
+
+
+def record_server(endpoint, ms, status=None):
+    """Time spent handling one API request on the server."""
+    with _lock:
+        _add(_server, endpoint, ms, "not_modified" if status == 304 else None)
+
+
+def record_client(samples):
+    """Accept timing samples posted by utils/api.js; returns how many were kept."""
+    kept = 0
+    with _lock:
+        for sample in samples if isinstance(samples, list) else []:
+            if not isinstance(sample, dict):
+                continue
+            endpoint = sample.get("endpoint")
+            ms = sample.get("ms")
+            source = sample.get("source")
+            if not isinstance(endpoint, str) or not isinstance(ms, (int, float)) or source not in CLIENT_SOURCES:
+                continue
+            _add(_client, endpoint[:100], max(0.0, float(ms)), source)
+            kept += 1
+    return kept
+
+
+def _summary(table):
+    result = {}
+    for name, bucket in sorted(table.items()):
+        recent = list(bucket["recent"])
+        result[name] = {
+            "count": bucket["count"],
+            "avg_ms": round(bucket["total_ms"] / bucket["count"], 1) if bucket["count"] else None,
+            "p50_ms": _percentile(recent, 0.5),
+            "p95_ms": _percentile(recent, 0.95),
+            "sources": dict(bucket["sources"]),
+        }
+    return result
+
+
+def get_report():
+    with _lock:
+        return {"server": _summary(_server), "client": _summary(_client)}
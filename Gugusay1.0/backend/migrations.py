@@ -0,0 +1,547 @@
+# 数据库结构迁移模块（基于 PRAGMA user_version）
+import sqlite3
+import time
+from collections import namedtuple
+
+from backend import entities, media_index, normalize
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply'])
+Backfill = namedtuple('Backfill', ['name', 'step'])
+
+MIGRATIONS = []
+BACKFILLS = {}
+
+
+def migration(version, name):
+    """注册一个迁移步骤，版本号必须严格递增"""
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f'migration version must increase: {version}')
+        MIGRATIONS.append(Migration(version, name, func))
+        return func
+    return decorator
+
+
+def backfill(name):
+    """注册一个分批回填任务
+
+    step(conn, position, batch_size) 返回 (本批处理的行数, 新的进度位置)，处理行数为 0 表示完成。
+    进度位置保存在 schema_backfill 中，中断后从上次位置继续。
+    """
+    def decorator(func):
+        BACKFILLS[name] = Backfill(name, func)
+        return func
+    return decorator
+
+
+def queue_backfill(conn, name):
+    """在迁移事务内登记需要后台回填的任务"""
+    if name not in BACKFILLS:
+        raise ValueError(f'unknown backfill: {name}')
+    conn.execute(
+        'INSERT OR IGNORE INTO schema_backfill (name, queued_at) VALUES (?, datetime("now", "localtime"))',
+        (name,)
+    )
+
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def apply_migrations(conn):
+    """执行所有未应用的迁移，每个迁移独立事务，成功后写入 user_version
+
+    已是最新版本的数据库只读取一次 user_version，不做任何其他操作。
+    返回本次应用的迁移名称列表。
+    """
+    current = get_schema_version(conn)
+    applied = []
+    for step in MIGRATIONS:
+        if step.version <= current:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            step.apply(conn)
+            conn.execute(f'PRAGMA user_version = {step.version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(step.name)
+    return applied
+
+
+def pending_backfills(conn):
+    try:
+        rows = conn.execute('SELECT name FROM schema_backfill ORDER BY queued_at, name').fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return [row[0] for row in rows if row[0] in BACKFILLS]
+
+
+def run_backfills(conn, batch_size=500, pause=0.02, should_stop=None):
+    """分批执行登记的回填任务，每批一个短事务，批次之间让出时间给前台读请求"""
+    completed = []
+    for name in pending_backfills(conn):
+        step = BACKFILLS[name].step
+        while True:
+            if should_stop and should_stop():
+                return completed
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                position = conn.execute(
+                    'SELECT position FROM schema_backfill WHERE name = ?', (name,)
+                ).fetchone()[0] or 0
+                processed, position = step(conn, position, batch_size)
+                if processed:
+                    conn.execute('UPDATE schema_backfill SET position = ? WHERE name = ?', (position, name))
+                else:
+                    conn.execute('DELETE FROM schema_backfill WHERE name = ?', (name,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            if not processed:
+                completed.append(name)
+                break
+            time.sleep(pause)
+    return completed
+
+
+@migration(1, 'baseline_schema')
+def _baseline_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            datetime TEXT NOT NULL,
+            content TEXT,
+            channel TEXT,
+            media_type TEXT DEFAULT 'text',
+            media_path TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_datetime ON JL(datetime)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_channel ON JL(channel)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_media_type ON JL(media_type)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reading_progress (
+            id INTEGER PRIMARY KEY,
+            last_viewed_id INTEGER,
+            last_viewed_datetime TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS search_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            keyword TEXT NOT NULL UNIQUE,
+            search_datetime TEXT
+        )
+    ''')
+    # 旧版数据库的 search_history 没有 search_datetime 列
+    if 'search_datetime' not in _column_names(conn, 'search_history'):
+        conn.execute('ALTER TABLE search_history ADD COLUMN search_datetime TEXT')
+    # 迁移登记的后台回填任务，position 为中断后继续的进度
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_backfill (
+            name TEXT PRIMARY KEY,
+            queued_at TEXT,
+            position INTEGER DEFAULT 0
+        )
+    ''')
+    queue_backfill(conn, 'search_history_datetime')
+
+
+@migration(2, 'jl_media')
+def _create_jl_media(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL_media (
+            record_id INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            size INTEGER,
+            width INTEGER,
+            height INTEGER,
+            sha256 TEXT,
+            PRIMARY KEY (record_id, ordinal)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_media_path ON JL_media(path)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_media_kind ON JL_media(kind, record_id)')
+    # 删除记录时同步删除媒体行；新增和修改由 DatabaseManager 写入
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_media_delete AFTER DELETE ON JL
+        BEGIN
+            DELETE FROM JL_media WHERE record_id = OLD.id;
+        END
+    ''')
+    queue_backfill(conn, 'jl_media')
+
+
+@migration(3, 'media_file')
+def _create_media_file(conn):
+    # 按文件缓存大小、修改时间和校验值，大小与 mtime 未变时无需重新计算 sha256
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS media_file (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            sha256 TEXT
+        ) WITHOUT ROWID
+    ''')
+
+
+@migration(4, 'jl_count')
+def _create_jl_count(conn):
+    # 按月、按渠道、按媒体类型的记录条数，由触发器随 JL 的增删改同步维护，定位、分页和查询规划器估算选择度
+    # 不再需要 COUNT(*) 扫描；month 的键是 datetime 的前 7 个字符，channel 和 media_type 的键把 NULL 归为空字符串
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL_count (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, key)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('DELETE FROM JL_count')
+    conn.execute('''
+        INSERT INTO JL_count (dimension, key, count)
+        SELECT 'month', substr(datetime, 1, 7), COUNT(*) FROM JL GROUP BY substr(datetime, 1, 7)
+    ''')
+    conn.execute('''
+        INSERT INTO JL_count (dimension, key, count)
+        SELECT 'channel', COALESCE(channel, ''), COUNT(*) FROM JL GROUP BY COALESCE(channel, '')
+    ''')
+    conn.execute('''
+        INSERT INTO JL_count (dimension, key, count)
+        SELECT 'media_type', COALESCE(media_type, ''), COUNT(*) FROM JL GROUP BY COALESCE(media_type, '')
+    ''')
+    increment = '''
+            INSERT INTO JL_count (dimension, key, count) VALUES ('month', substr(NEW.datetime, 1, 7), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+            INSERT INTO JL_count (dimension, key, count) VALUES ('channel', COALESCE(NEW.channel, ''), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+            INSERT INTO JL_count (dimension, key, count) VALUES ('media_type', COALESCE(NEW.media_type, ''), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+    '''
+    decrement = '''
+            UPDATE JL_count SET count = count - 1
+                WHERE dimension = 'month' AND key = substr(OLD.datetime, 1, 7);
+            UPDATE JL_count SET count = count - 1
+                WHERE dimension = 'channel' AND key = COALESCE(OLD.channel, '');
+            UPDATE JL_count SET count = count - 1
+                WHERE dimension = 'media_type' AND key = COALESCE(OLD.media_type, '');
+    '''
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_count_insert AFTER INSERT ON JL
+        BEGIN
+            {increment}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_count_delete AFTER DELETE ON JL
+        BEGIN
+            {decrement}
+            DELETE FROM JL_count WHERE count <= 0;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_count_update AFTER UPDATE OF datetime, channel, media_type ON JL
+        BEGIN
+            {decrement}
+            {increment}
+            DELETE FROM JL_count WHERE count <= 0;
+        END
+    ''')
+    # 渠道内按时间排序直接走索引；(channel, datetime) 覆盖了原来的单列渠道索引
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_channel_datetime ON JL(channel, datetime)')
+    conn.execute('DROP INDEX IF EXISTS idx_jl_channel')
+
+
+@migration(5, 'jl_fts')
+def _create_jl_fts(conn):
+    # content 的 trigram 全文索引（外部内容表，不重复存储正文），可加速 3 个字符及以上的子串查询
+    # 部分 SQLite 构建没有 FTS5，此时跳过，查询规划器会退回 LIKE 扫描
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS JL_fts
+            USING fts5(content, content='JL', content_rowid='id', tokenize='trigram')
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"full-text index unavailable: {e}")
+        return
+    # 回填进行中时，触发器只维护已回填过的记录（id <= position），其余由回填任务读取最新内容
+    indexed = "NOT EXISTS (SELECT 1 FROM schema_backfill WHERE name = 'jl_fts' AND position < {}.id)"
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_fts_insert AFTER INSERT ON JL
+        WHEN {indexed.format('NEW')}
+        BEGIN
+            INSERT INTO JL_fts (rowid, content) VALUES (NEW.id, NEW.content);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_fts_delete AFTER DELETE ON JL
+        WHEN {indexed.format('OLD')}
+        BEGIN
+            INSERT INTO JL_fts (JL_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_fts_update AFTER UPDATE OF content ON JL
+        WHEN {indexed.format('OLD')}
+        BEGIN
+            INSERT INTO JL_fts (JL_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+            INSERT INTO JL_fts (rowid, content) VALUES (NEW.id, NEW.content);
+        END
+    ''')
+    queue_backfill(conn, 'jl_fts')
+
+
+@migration(6, 'jl_changelog')
+def _create_jl_changelog(conn):
+    # JL 的变更流水，seq 单调递增（AUTOINCREMENT 保证删除旧条目后不会复用），
+    # 前端凭上次看到的 seq 增量获取变化；同时记下变化前后所在的月份和渠道，用于返回受影响的计数
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL_changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            old_month TEXT,
+            old_channel TEXT,
+            new_month TEXT,
+            new_channel TEXT,
+            changed_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_changelog_insert AFTER INSERT ON JL
+        BEGIN
+            INSERT INTO JL_changelog (record_id, action, new_month, new_channel)
+            VALUES (NEW.id, 'insert', substr(NEW.datetime, 1, 7), COALESCE(NEW.channel, ''));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_changelog_update AFTER UPDATE ON JL
+        BEGIN
+            INSERT INTO JL_changelog (record_id, action, old_month, old_channel, new_month, new_channel)
+            VALUES (NEW.id, 'update', substr(OLD.datetime, 1, 7), COALESCE(OLD.channel, ''),
+                    substr(NEW.datetime, 1, 7), COALESCE(NEW.channel, ''));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_changelog_delete AFTER DELETE ON JL
+        BEGIN
+            INSERT INTO JL_changelog (record_id, action, old_month, old_channel)
+            VALUES (OLD.id, 'delete', substr(OLD.datetime, 1, 7), COALESCE(OLD.channel, ''));
+        END
+    ''')
+
+
+@migration(7, 'media_meta')
+def _create_media_meta(conn):
+    # 按文件缓存文件头解析出的尺寸、时长和占位图，size 与 mtime 未变时不再重新解析
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS media_meta (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            width INTEGER,
+            height INTEGER,
+            duration REAL,
+            placeholder TEXT
+        ) WITHOUT ROWID
+    ''')
+    columns = _column_names(conn, 'JL_media')
+    if 'duration' not in columns:
+        conn.execute('ALTER TABLE JL_media ADD COLUMN duration REAL')
+    if 'placeholder' not in columns:
+        conn.execute('ALTER TABLE JL_media ADD COLUMN placeholder TEXT')
+
+
+@migration(8, 'jl_entity')
+def _create_jl_entity(conn):
+    # 正文中的话题、@提及和链接，每条记录每个实体一行；datetime 冗余存放，按实体分页和按时间范围统计都只读索引
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL_entity (
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            datetime TEXT,
+            record_id INTEGER NOT NULL,
+            PRIMARY KEY (kind, value, datetime, record_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_entity_time ON JL_entity(kind, datetime)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_entity_record ON JL_entity(record_id)')
+    # 删除记录和修改时间时同步；新增和修改正文由 DatabaseManager 写入
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_entity_delete AFTER DELETE ON JL
+        BEGIN
+            DELETE FROM JL_entity WHERE record_id = OLD.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_entity_datetime AFTER UPDATE OF datetime ON JL
+        BEGIN
+            UPDATE JL_entity SET datetime = NEW.datetime WHERE record_id = NEW.id;
+        END
+    ''')
+    queue_backfill(conn, 'jl_entity')
+
+
+@migration(9, 'jl_duplicate')
+def _create_jl_duplicate(conn):
+    # 每条记录正文的 MinHash 签名（正文太短时为 NULL），以及近似重复记录的分组；由后台任务增量维护
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL_minhash (
+            record_id INTEGER PRIMARY KEY,
+            signature BLOB
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL_duplicate (
+            record_id INTEGER PRIMARY KEY,
+            cluster_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jl_duplicate_cluster ON JL_duplicate(cluster_id)')
+    # 正文修改后签名作废，下次任务重新计算
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_minhash_update AFTER UPDATE OF content ON JL
+        BEGIN
+            DELETE FROM JL_minhash WHERE record_id = NEW.id;
+        END
+    ''')
+    # 删除记录时维护所在的重复组：只剩一条的组整体移除；删除的是主记录时，其余成员改指向剩下最早发布的一条
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_duplicate_delete AFTER DELETE ON JL
+        BEGIN
+            DELETE FROM JL_minhash WHERE record_id = OLD.id;
+            DELETE FROM JL_duplicate
+            WHERE cluster_id = (SELECT cluster_id FROM JL_duplicate WHERE record_id = OLD.id)
+              AND (SELECT COUNT(*) FROM JL_duplicate
+                   WHERE cluster_id = (SELECT cluster_id FROM JL_duplicate WHERE record_id = OLD.id)) <= 2;
+            DELETE FROM JL_duplicate WHERE record_id = OLD.id;
+            UPDATE JL_duplicate SET cluster_id = (
+                SELECT d.record_id FROM JL_duplicate d JOIN JL ON JL.id = d.record_id
+                WHERE d.cluster_id = OLD.id
+                ORDER BY JL.datetime, JL.id
+                LIMIT 1
+            )
+            WHERE cluster_id = OLD.id;
+        END
+    ''')
+
+
+@migration(10, 'jl_norm')
+def _create_jl_norm(conn):
+    # 正文的归一化形式（简体、按音节隔开的全拼、拼音首字母），繁简体互搜和拼音搜索匹配这张表；由 DatabaseManager 在写入时维护
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS JL_norm (
+            id INTEGER PRIMARY KEY,
+            simplified TEXT,
+            pinyin TEXT,
+            initials TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_norm_delete AFTER DELETE ON JL
+        BEGIN
+            DELETE FROM JL_norm WHERE id = OLD.id;
+        END
+    ''')
+    queue_backfill(conn, 'jl_norm')
+    # 与 JL_fts 相同：没有 FTS5 时只建影子表，搜索退回 LIKE 扫描影子表
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS JL_norm_fts
+            USING fts5(simplified, pinyin, initials, content='JL_norm', content_rowid='id', tokenize='trigram')
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"normalized full-text index unavailable: {e}")
+        return
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_norm_fts_insert AFTER INSERT ON JL_norm
+        BEGIN
+            INSERT INTO JL_norm_fts (rowid, simplified, pinyin, initials)
+            VALUES (NEW.id, NEW.simplified, NEW.pinyin, NEW.initials);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_jl_norm_fts_delete AFTER DELETE ON JL_norm
+        BEGIN
+            INSERT INTO JL_norm_fts (JL_norm_fts, rowid, simplified, pinyin, initials)
+            VALUES ('delete', OLD.id, OLD.simplified, OLD.pinyin, OLD.initials);
+        END
+    ''')
+
+
+@backfill('search_history_datetime')
+def _backfill_search_history_datetime(conn, position, batch_size):
+    cursor = conn.execute('''
+        UPDATE search_history
+        SET search_datetime = datetime('now', 'localtime')
+        WHERE id IN (SELECT id FROM search_history WHERE search_datetime IS NULL LIMIT ?)
+    ''', (batch_size,))
+    return cursor.rowcount, position
+
+
+@backfill('jl_media')
+def _backfill_jl_media(conn, position, batch_size):
+    rows = conn.execute('''
+        SELECT id, media_path FROM JL
+        WHERE id > ? AND media_path IS NOT NULL AND media_path != ''
+        ORDER BY id
+        LIMIT ?
+    ''', (position, batch_size)).fetchall()
+    # 回填在写事务内执行，不解析文件头，元数据由空闲时的 index_media_metadata 补上
+    for record_id, media_path in rows:
+        media_index.replace_record_media(conn, record_id, media_path, probe=False)
+    return len(rows), (rows[-1][0] if rows else position)
+
+
+@backfill('jl_fts')
+def _backfill_jl_fts(conn, position, batch_size):
+    rows = conn.execute('''
+        SELECT id, content FROM JL
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (position, batch_size)).fetchall()
+    conn.executemany('INSERT INTO JL_fts (rowid, content) VALUES (?, ?)', rows)
+    return len(rows), (rows[-1][0] if rows else position)
+
+
+@backfill('jl_entity')
+def _backfill_jl_entity(conn, position, batch_size):
+    rows = conn.execute('''
+        SELECT id, content, datetime FROM JL
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (position, batch_size)).fetchall()
+    for record_id, content, datetime_val in rows:
+        entities.replace_record_entities(conn, record_id, content, datetime_val)
+    return len(rows), (rows[-1][0] if rows else position)
+
+
+@backfill('jl_norm')
+def _backfill_jl_norm(conn, position, batch_size):
+    rows = conn.execute('''
+        SELECT id, content FROM JL
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (position, batch_size)).fetchall()
+    for record_id, content in rows:
+        normalize.replace_record_norm(conn, record_id, content)
+    return len(rows), (rows[-1][0] if rows else position)
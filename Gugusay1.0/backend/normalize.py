@@ -0,0 +1,163 @@
+# 检索归一化模块：把正文转换为简体字、全拼和拼音首字母，存入 JL_norm 影子表；
+# 搜索时关键词做同样的转换后匹配影子表，繁简体互搜和拼音搜索都不必在查询时转换 content
+# 全拼按音节用空格隔开，拼音关键词切分成音节后只在音节边界上匹配（hang 不会命中 zhang）
+# 转换表 backend/data/hanzi.tsv 随程序打包（逐字转换，多音字取常用读音），不依赖第三方库
+import re
+import threading
+
+from backend.config import HANZI_TABLE_PATH
+
+HAN = '\u3400-\u9fff\uf900-\ufaff'
+# 一段连续的汉字，或一段连续的其他文字（字母、数字等）；标点和空白把正文切开
+SEGMENT_RE = re.compile(rf'([{HAN}]+)|[^\W{HAN}]+')
+URL_RE = re.compile(r'https?://\S+', re.IGNORECASE)
+VOWEL_RE = re.compile('[aeiouv]')
+# 拼音关键词：去掉空格后至少 2 个字母
+PINYIN_MIN_LENGTH = 2
+# 一个拼音关键词最多尝试的音节切分数（如 xian 可切为 xian 或 xi an）
+MAX_SEGMENTATIONS = 8
+# 全拼列中隔开两段汉字的标记：音节匹配不会跨过标点、空白或其他文字
+SEGMENT_BREAK = ' / '
+# trigram 全文索引只能加速至少 3 个字符的子串
+FTS_MIN_LENGTH = 3
+
+_tables = None
+_lock = threading.Lock()
+
+
+def _load():
+    """读取转换表，返回 (繁转简的 str.translate 表, {汉字: 拼音}, 切分关键词用的音节集合)；只在第一次使用时读取"""
+    global _tables
+    if _tables is None:
+        with _lock:
+            if _tables is None:
+                simplified, pinyin = {}, {}
+                try:
+                    with open(HANZI_TABLE_PATH, encoding='utf-8') as f:
+                        for line in f:
+                            if line.startswith('#'):
+                                continue
+                            fields = line.rstrip('\n').split('\t')
+                            if len(fields) > 1 and fields[1]:
+                                pinyin[fields[0]] = fields[1]
+                            if len(fields) > 2:
+                                simplified[fields[0]] = fields[2]
+                except OSError as e:
+                    print(f"hanzi table unavailable: {e}")
+                # 切分关键词时不用 n、m、ng 这类没有元音的叹词读音，否则 xian 会多出 xia n 之类的切法
+                syllables = frozenset(value for value in pinyin.values() if VOWEL_RE.search(value))
+                _tables = (str.maketrans(simplified), pinyin, syllables)
+    return _tables
+
+
+def simplify(text):
+    """逐字转换为简体，其余字符不变"""
+    return (text or '').translate(_load()[0])
+
+
+def romanize(text):
+    """返回 (全拼, 首字母)：全拼中音节以空格隔开，每段汉字之间用 SEGMENT_BREAK 隔开，首尾各留一个空格，
+    使每个音节两侧都有边界；首字母每段连写，段之间用空格隔开。非汉字只保留在简体列中。
+
+    例如 "臺灣 iPhone 用户" -> (" tai wan / yong hu ", "tw yh")
+    """
+    pinyin = _load()[1]
+    segments, current = [], []
+    for match in SEGMENT_RE.finditer(URL_RE.sub(' ', text or '')):
+        for char in match.group(1) or '':
+            syllable = pinyin.get(char)
+            if syllable:
+                current.append(syllable)
+            elif current:
+                # 没有读音的字同样断开，避免前后两个音节连成一个词
+                segments.append(current)
+                current = []
+        if current:
+            segments.append(current)
+            current = []
+    if not segments:
+        return '', ''
+    full = SEGMENT_BREAK.join(' '.join(segment) for segment in segments)
+    initials = ' '.join(''.join(syllable[0] for syllable in segment) for segment in segments)
+    return f' {full} ', initials
+
+
+def segment_pinyin(letters, limit=MAX_SEGMENTATIONS):
+    """把连写的拼音切分为音节，返回各种切法（长音节优先，最多 limit 种）；无法完整切分时返回空列表"""
+    syllables = _load()[2]
+    longest = max(map(len, syllables), default=0)
+    size = len(letters)
+    # reachable[i]：letters[i:] 能否完整切分；从后往前算一遍，枚举时不会走进死路
+    reachable = [False] * size + [True]
+    for start in range(size - 1, -1, -1):
+        reachable[start] = any(
+            reachable[end] and letters[start:end] in syllables
+            for end in range(start + 1, min(size, start + longest) + 1)
+        )
+    results = []
+    stack = [(0, [])]
+    while stack and len(results) < limit:
+        start, parts = stack.pop()
+        if start == size:
+            results.append(parts)
+            continue
+        # 逆序压栈，使长音节的切法先出栈
+        for end in range(start + 1, min(size, start + longest) + 1):
+            if reachable[end] and letters[start:end] in syllables:
+                stack.append((end, parts + [letters[start:end]]))
+    return results
+
+
+def replace_record_norm(conn, record_id, content):
+    """用正文重建某条记录的 JL_norm 行（调用方负责提交事务）
+
+    先删除再插入而不是 INSERT OR REPLACE：REPLACE 删除旧行时不会触发 JL_norm_fts 的删除触发器。
+    """
+    full, initials = romanize(content)
+    conn.execute('DELETE FROM JL_norm WHERE id = ?', (record_id,))
+    conn.execute(
+        'INSERT INTO JL_norm (id, simplified, pinyin, initials) VALUES (?, ?, ?, ?)',
+        (record_id, simplify(content), full, initials)
+    )
+
+
+def keyword_terms(keyword, pinyin=True):
+    """关键词在各列上的匹配内容 [(列名, 子串)]；由字母组成的关键词同时按全拼和首字母匹配
+
+    全拼按关键词的每种音节切分各匹配一次，子串两端带空格，只能从音节开头匹配到音节结尾。
+    """
+    terms = [('simplified', simplify(keyword))]
+    letters = keyword.replace(' ', '').lower()
+    if pinyin and len(letters) >= PINYIN_MIN_LENGTH and letters.isascii() and letters.isalpha():
+        terms += [('pinyin', f' {" ".join(parts)} ') for parts in segment_pinyin(letters)]
+        terms.append(('initials', letters))
+    return terms
+
+
+def _exists(conn, name):
+    return conn.execute('SELECT 1 FROM sqlite_master WHERE name = ?', (name,)).fetchone() is not None
+
+
+def match_subquery(conn, keyword, pinyin=True):
+    """返回 (子查询, 参数)，子查询选出归一化后包含关键词的记录 id；影子表尚未回填完成时返回 None
+
+    至少 3 个字符的子串走 JL_norm_fts 的 trigram 索引，较短的合并为一次 JL_norm 扫描。
+    """
+    if not _exists(conn, 'JL_norm'):
+        return None
+    if conn.execute("SELECT 1 FROM schema_backfill WHERE name = 'jl_norm'").fetchone():
+        return None
+    fts = _exists(conn, 'JL_norm_fts')
+    selects, params = [], []
+    scanned, scanned_params = [], []
+    for column, value in keyword_terms(keyword, pinyin):
+        if fts and len(value) >= FTS_MIN_LENGTH:
+            selects.append(f'SELECT rowid FROM JL_norm_fts WHERE {column} LIKE ?')
+            params.append(f'%{value}%')
+        else:
+            scanned.append(f'{column} LIKE ?')
+            scanned_params.append(f'%{value}%')
+    if scanned:
+        selects.append(f'SELECT id FROM JL_norm WHERE {" OR ".join(scanned)}')
+        params += scanned_params
+    return ' UNION '.join(selects), params
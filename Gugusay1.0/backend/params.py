@@ -0,0 +1,25 @@
+"""Query parameter parsing shared by the HTTP server and the js_api bridge.
+
+Both transports must accept the same values: a missing, malformed or non-positive number falls back
+to the default, and page sizes are capped so one request cannot ask for the whole table.
+"""
+from backend.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+def int_param(value, default, maximum=None):
+    """Positive integer from a JS number or query string value; missing or invalid values use the default."""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, str):
+        value = int(value) if value.isdigit() else None
+    if not isinstance(value, int) or value <= 0:
+        return default
+    return min(value, maximum) if maximum else value
+
+
+def page_size_param(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    return int_param(value, default, maximum)
+
+
+def str_param(value, default=""):
+    return value if isinstance(value, str) else default
@@ -0,0 +1,283 @@
+# 搜索查询语言模块：解析 channel:微博 after:2014-01 before:2015-06 has:video -关键词 这样的查询，
+# 按选择度挑选驱动索引，编译成参数化 SQL，并按“查询形状”缓存编译结果
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from backend import timeline
+
+Term = namedtuple('Term', ['field', 'value', 'negated'])
+Plan = namedtuple('Plan', ['shape', 'driver', 'from_clause', 'where', 'params'])
+
+FIELD_ALIASES = {
+    'channel': 'channel', 'ch': 'channel',
+    'after': 'after', 'since': 'after',
+    'before': 'before', 'until': 'before',
+    'on': 'on', 'date': 'on',
+    'has': 'has', 'type': 'has',
+}
+HAS_VALUES = {'image', 'video', 'media'}
+TOKEN_RE = re.compile(r'(-?)(?:([A-Za-z]+):)?("(?:[^"\\]|\\.)*"|\S+)')
+DATE_RE = re.compile(r'^(\d{4})(?:[-/](\d{1,2})(?:[-/](\d{1,2}))?)?$')
+# 全文索引使用 trigram，少于 3 个字符的关键词无法走索引
+FTS_MIN_LENGTH = 3
+# 驱动索引预计返回的行数超过总数的这个比例时，不如直接按时间索引顺序扫描（LIMIT 可以提前结束）
+SCAN_THRESHOLD = 0.3
+
+INDEXES = {
+    'datetime': 'idx_jl_datetime',
+    'channel': 'idx_jl_channel_datetime',
+    'media_type': 'idx_jl_media_type',
+}
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _parse_date(value):
+    """把 2014、2014-1、2014-01-05 解析为 (起点, 终点) 文本区间，终点不包含"""
+    match = DATE_RE.match(value)
+    if not match:
+        raise QuerySyntaxError(f'invalid date: {value}')
+    year, month, day = match.groups()
+    if day:
+        start = f'{year}-{int(month):02d}-{int(day):02d}'
+    elif month:
+        start = f'{year}-{int(month):02d}'
+    else:
+        start = year
+    return start, start + timeline.PREFIX_END
+
+
+def parse(text):
+    """把查询文本解析为 Term 列表；不认识的 “xxx:” 前缀按普通关键词处理"""
+    terms = []
+    for negated, field, value in TOKEN_RE.findall(text or ''):
+        name = FIELD_ALIASES.get(field.lower()) if field else None
+        if field and not name:
+            # 例如 http://example.com，整体作为关键词
+            value = f'{field}:{value}'
+        value = _unquote(value)
+        if name is None:
+            if value:
+                terms.append(Term('keyword', value, bool(negated)))
+            continue
+        if name in ('after', 'before', 'on'):
+            _parse_date(value)
+        elif name == 'has':
+            value = value.lower()
+            if value not in HAS_VALUES:
+                raise QuerySyntaxError(f'has: expects one of {", ".join(sorted(HAS_VALUES))}')
+        terms.append(Term(name, value, bool(negated)))
+    if not terms:
+        raise QuerySyntaxError('empty query')
+    return terms
+
+
+def _variant(term):
+    """形状中除字段和取反以外影响 SQL 结构的部分"""
+    if term.field == 'channel':
+        return 'empty' if term.value == '' else 'value'
+    if term.field == 'has':
+        return 'any' if term.value == 'media' else 'kind'
+    if term.field == 'keyword':
+        return 'fts' if len(term.value) >= FTS_MIN_LENGTH else 'like'
+    return ''
+
+
+def canonical(terms):
+    """按形状排序，使“a channel:x”和“channel:x a”共用同一个编译结果"""
+    return sorted(terms, key=lambda term: (term.field, term.negated, _variant(term), term.value))
+
+
+def shape_of(terms):
+    return tuple((term.field, term.negated, _variant(term)) for term in terms)
+
+
+class QueryPlanner:
+    """估算各谓词的选择度并编译查询，编译结果按 (形状, 驱动索引) 做 LRU 缓存"""
+
+    def __init__(self, cache_size=64):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---- 选择度估算（只读计数表，不扫描 JL） ----
+
+    def _fts_ready(self, conn):
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'JL_fts'").fetchone()
+        if not row:
+            return False
+        pending = conn.execute("SELECT 1 FROM schema_backfill WHERE name = 'jl_fts'").fetchone()
+        return not pending
+
+    def _month_sum(self, conn, low, high):
+        # 按月粗估：区间两端所在的月份整月计入
+        row = conn.execute('''
+            SELECT COALESCE(SUM(count), 0) FROM JL_count
+            WHERE dimension = 'month' AND key >= ? AND key <= ?
+        ''', (low[:7], high[:7])).fetchone()
+        return row[0]
+
+    def estimate(self, conn, terms, total, fts_ready):
+        """返回 {驱动索引: 预计行数}，只包含可以走索引的正向谓词"""
+        estimates = {}
+        low, high = '', timeline.PREFIX_END
+        has_range = False
+        for term in terms:
+            if term.negated:
+                continue
+            if term.field in ('after', 'before', 'on'):
+                start, end = _parse_date(term.value)
+                if term.field in ('after', 'on'):
+                    low = max(low, start)
+                if term.field == 'before':
+                    high = min(high, start)
+                if term.field == 'on':
+                    high = min(high, end)
+                has_range = True
+            elif term.field == 'channel' and term.value:
+                count = timeline.dimension_count(conn, 'channel', term.value)
+                estimates['channel'] = min(estimates.get('channel', total), count)
+            elif term.field == 'has':
+                kinds = ('image', 'video') if term.value == 'media' else (term.value,)
+                count = sum(timeline.dimension_count(conn, 'media_type', kind) for kind in kinds)
+                estimates['media_type'] = min(estimates.get('media_type', total), count)
+            elif term.field == 'keyword' and fts_ready and len(term.value) >= FTS_MIN_LENGTH:
+                # 全文索引没有廉价的计数，按关键词长度给一个经验值：越长越精确
+                count = int(total * 0.2 / (len(term.value) - FTS_MIN_LENGTH + 1)) + 1
+                estimates['fulltext'] = min(estimates.get('fulltext', total), count)
+        if has_range:
+            estimates['datetime'] = 0 if low >= high else self._month_sum(conn, low, high)
+        return estimates
+
+    def choose_driver(self, estimates, total):
+        if not estimates:
+            return 'scan'
+        driver = min(estimates, key=lambda name: (estimates[name], name != 'datetime'))
+        if estimates[driver] > total * SCAN_THRESHOLD and driver != 'datetime':
+            return 'scan'
+        return driver
+
+    # ---- 编译 ----
+
+    def _compile(self, terms, driver):
+        """生成 FROM、按执行顺序排列的 WHERE 片段，以及从 Term 取参数的函数
+
+        不作为驱动的索引列加一元 +，阻止 SQLite 选错索引；驱动条件放在最前，LIKE 放在最后。
+        """
+        def column(name, indexed):
+            return name if indexed else f'+{name}'
+
+        driver_parts, column_parts, like_parts = [], [], []
+        for index, term in enumerate(terms):
+            field, negated = term.field, term.negated
+            if field in ('after', 'before', 'on'):
+                col = column('datetime', driver == 'datetime' and not negated)
+                if field == 'after':
+                    sql, getter = f'{col} >= ?', lambda t: [_parse_date(t.value)[0]]
+                elif field == 'before':
+                    sql, getter = f'{col} < ?', lambda t: [_parse_date(t.value)[0]]
+                else:
+                    sql, getter = f'({col} >= ? AND {col} < ?)', lambda t: list(_parse_date(t.value))
+                target = driver_parts if col == 'datetime' else column_parts
+            elif field == 'channel':
+                col = column('channel', driver == 'channel' and not negated)
+                if term.value and negated:
+                    # 取反时没有渠道的记录也应保留
+                    sql, getter = "COALESCE(channel, '') = ?", lambda t: [t.value]
+                elif term.value:
+                    sql = f'{col} = ?'
+                    getter = lambda t: [t.value]
+                else:
+                    sql, getter = f"({col} IS NULL OR {col} = '')", lambda t: []
+                target = driver_parts if col == 'channel' else column_parts
+            elif field == 'has':
+                col = column('media_type', driver == 'media_type' and not negated)
+                if negated:
+                    col = "COALESCE(media_type, '')"
+                if term.value == 'media':
+                    sql, getter = f"{col} IN ('image', 'video')", lambda t: []
+                else:
+                    sql, getter = f'{col} = ?', lambda t: [t.value]
+                target = driver_parts if col == 'media_type' else column_parts
+            else:
+                if negated:
+                    sql, getter = "COALESCE(content, '') NOT LIKE ?", lambda t: [f'%{t.value}%']
+                    target = like_parts
+                elif driver == 'fulltext' and len(term.value) >= FTS_MIN_LENGTH:
+                    # MATCH 用于走索引，LIKE 复核，保证结果与普通搜索完全一致
+                    sql = 'id IN (SELECT rowid FROM JL_fts WHERE JL_fts MATCH ?) AND content LIKE ?'
+                    getter = lambda t: ['"' + t.value.replace('"', '""') + '"', f'%{t.value}%']
+                    target = driver_parts
+                else:
+                    sql, getter = 'content LIKE ?', lambda t: [f'%{t.value}%']
+                    target = like_parts
+            if negated:
+                sql = f'NOT ({sql})' if field != 'keyword' else sql
+            target.append((sql, index, getter))
+
+        parts = driver_parts + column_parts + like_parts
+        if driver in INDEXES:
+            from_clause = f'JL INDEXED BY {INDEXES[driver]}'
+        elif driver == 'fulltext':
+            from_clause = 'JL NOT INDEXED'
+        else:
+            from_clause = f"JL INDEXED BY {INDEXES['datetime']}"
+        where = ' AND '.join(sql for sql, _, _ in parts) or '1=1'
+        params = [(index, getter) for _, index, getter in parts]
+        return from_clause, where, params
+
+    def plan(self, conn, terms):
+        """返回 (Plan, 规划信息)；terms 需已经 canonical 排序"""
+        total = timeline.total_count(conn)
+        estimates = self.estimate(conn, terms, total, self._fts_ready(conn))
+        driver = self.choose_driver(estimates, total)
+        key = (shape_of(terms), driver)
+        with self._lock:
+            plan = self._cache.get(key)
+            if plan is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                cached = True
+            else:
+                self.misses += 1
+                cached = False
+        if plan is None:
+            from_clause, where, params = self._compile(terms, driver)
+            plan = Plan(key[0], driver, from_clause, where, params)
+            with self._lock:
+                self._cache[key] = plan
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        info = {
+            'driver': driver,
+            'estimates': estimates,
+            'total': total,
+            'cached': cached,
+            'shape': [list(part) for part in plan.shape],
+        }
+        return plan, info
+
+    @staticmethod
+    def bind(plan, terms):
+        params = []
+        for index, getter in plan.params:
+            params.extend(getter(terms[index]))
+        return params
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        return {'size': len(self._cache), 'capacity': self.cache_size, 'hits': self.hits, 'misses': self.misses}
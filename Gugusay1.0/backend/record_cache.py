@@ -0,0 +1,135 @@
+# 记录缓存模块：单条记录和计数查询的 LRU 缓存，按内存占用或条目数限制大小，写入时失效
+import copy
+import threading
+from collections import OrderedDict
+
+from backend.config import COUNT_CACHE_SIZE, RECORD_CACHE_MAX_BYTES
+
+# 估算记录内存占用时每条记录 / 每个媒体项的固定开销（字节）
+RECORD_OVERHEAD = 400
+MEDIA_OVERHEAD = 300
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存；weigher 为空时按条目数计重，超过 max_weight 时淘汰最久未用的条目"""
+
+    def __init__(self, max_weight, weigher=None):
+        self.max_weight = max_weight
+        self._weigher = weigher or (lambda value: 1)
+        self._data = OrderedDict()  # key -> (value, weight)
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        weight = self._weigher(value)
+        if weight > self.max_weight:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            self._data[key] = (value, weight)
+            self._weight += weight
+            while self._weight > self.max_weight:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._weight -= evicted
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._weight -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'weight': self._weight,
+                'maxWeight': self.max_weight,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+def record_weight(record):
+    weight = RECORD_OVERHEAD + len(record.get('media') or []) * MEDIA_OVERHEAD
+    for key in ('datetime', 'content', 'channel', 'media_type', 'media_path'):
+        # str 在内存中每个字符至少 1 字节，中文为 2~4 字节，这里按 2 字节估算
+        weight += len(record.get(key) or '') * 2
+    return weight
+
+
+class RecordCache:
+    """DatabaseManager 的读缓存：解码后的单条记录（按 id）和计数结果（按 SQL 与参数）
+
+    作为写入监听登记：记录被修改或删除时丢弃该记录，任何写入都清空计数缓存
+    （一次写入可能影响任意筛选条件的计数，而写入远少于读取）。
+    读取前记下 version，写入后 version 变化，读取期间发生写入时结果不放入缓存。
+    """
+
+    def __init__(self, max_record_bytes=RECORD_CACHE_MAX_BYTES, max_counts=COUNT_CACHE_SIZE):
+        self.records = LRUCache(max_record_bytes, record_weight)
+        self.counts = LRUCache(max_counts)
+        self.version = 0
+
+    def get_record(self, record_id):
+        record = self.records.get(record_id)
+        # 返回副本，调用方修改结果（如附加 page）不会污染缓存
+        return copy.deepcopy(record) if record is not None else None
+
+    def put_record(self, record, version):
+        self._put(self.records, record['id'], copy.deepcopy(record), version)
+
+    def count(self, key, compute):
+        value = self.counts.get(key)
+        if value is None:
+            version = self.version
+            value = compute()
+            self._put(self.counts, key, value, version)
+        return value
+
+    def _put(self, cache, key, value, version):
+        if version != self.version:
+            return
+        cache.put(key, value)
+        # 放入的同时发生了写入：写入方可能已经清理过，这里再撤销一次
+        if version != self.version:
+            cache.pop(key)
+
+    def apply_write(self, action, record_id, old, new):
+        self.version += 1
+        if record_id is not None:
+            self.records.pop(record_id)
+        else:
+            self.records.clear()
+        self.counts.clear()
+
+    def clear(self):
+        self.version += 1
+        self.records.clear()
+        self.counts.clear()
+
+    def stats(self):
+        return {'records': self.records.stats(), 'counts': self.counts.stats()}
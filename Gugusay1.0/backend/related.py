@@ -0,0 +1,337 @@
+# 相关推文模块：正文字符二元组的 TF-IDF 倒排索引，保存为一个文件并以 mmap 只读映射，
+# 查询时用目标记录的向量与倒排表做点积，得到余弦相似度最高的记录
+# 二元组按 crc32 散列到固定数量的列（不需要保存词表）；建索引之后的增删改从 JL_changelog 读取，
+# 在内存中以增量向量补上，增量太多或流水不连续时后台整体重建
+import bisect
+import heapq
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+
+from backend import changefeed
+
+MAGIC = b'GGSREL01'
+HEADER = struct.Struct('<8sIIIQ4x')   # magic, 列数, 文档数, 倒排项数, 建索引时的 changelog seq
+BUCKETS = 1 << 20
+BUCKET_MASK = BUCKETS - 1
+# 出现在太多记录中的二元组（如“我们”）区分度很低，且倒排表很长，不写入倒排表
+MAX_DF_RATIO = 0.05
+MIN_MAX_DF = 100
+# 查询向量只取权重最高的若干项
+QUERY_TERMS = 48
+# 内存中的增量超过这个数量时整体重建
+DELTA_LIMIT = 500
+SCAN_BATCH = 2000
+
+URL_RE = re.compile(r'https?://\S+', re.IGNORECASE)
+WORD_RE = re.compile(r'\w+')
+
+
+def _numpy():
+    try:
+        import numpy
+    except Exception:
+        return None
+    return numpy
+
+
+def term_counts(text):
+    """正文的二元组（散列后的列号）及出现次数；链接和标点把正文切成多段，二元组不跨段"""
+    counts = Counter()
+    for token in WORD_RE.findall(URL_RE.sub(' ', (text or '').lower())):
+        for start in range(len(token) - 1):
+            counts[zlib.crc32(token[start:start + 2].encode('utf-8')) & BUCKET_MASK] += 1
+    return counts
+
+
+def _idf(df, doc_count):
+    return math.log((doc_count + 1) / (df + 1)) + 1
+
+
+def weigh(counts, df, doc_count):
+    """次线性 TF 乘 IDF，再做 L2 归一化，返回 {列号: 权重}"""
+    weights = {column: (1 + math.log(tf)) * _idf(df[column], doc_count) for column, tf in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {column: weight / norm for column, weight in weights.items()} if norm else {}
+
+
+def _posting_counts(columns, df, max_df):
+    """每列的倒排项数；只出现在一条记录中的二元组不会贡献任何相似度，同样不进倒排表（但计入各记录的向量长度）"""
+    counts = array('I', bytes(4 * BUCKETS))
+    for column in columns:
+        if 2 <= df[column] <= max_df:
+            counts[column] += 1
+    return counts
+
+
+def build_index(conn, path, should_stop=None):
+    """扫描 JL 写出索引文件（先写临时文件），返回 (临时文件路径, 统计)；取消时返回 (None, None)"""
+    started = time.perf_counter()
+    # 先记下流水位置：扫描期间的写入之后作为增量补上，重复应用没有副作用
+    seq = changefeed.latest_seq(conn)
+    ids = array('I')
+    doc_ptr = array('I', [0])
+    columns = array('I')
+    tfs = array('H')
+    df = array('I', bytes(4 * BUCKETS))
+    cursor = conn.execute('SELECT id, content FROM JL ORDER BY id')
+    while True:
+        if should_stop and should_stop():
+            return None, None
+        rows = cursor.fetchmany(SCAN_BATCH)
+        if not rows:
+            break
+        for record_id, content in rows:
+            counts = term_counts(content)
+            ids.append(record_id)
+            for column, tf in counts.items():
+                columns.append(column)
+                tfs.append(min(tf, 0xFFFF))
+                df[column] += 1
+            doc_ptr.append(len(columns))
+
+    doc_count = len(ids)
+    max_df = max(MIN_MAX_DF, int(doc_count * MAX_DF_RATIO))
+    posting_counts = _posting_counts(columns, df, max_df)
+    relaxed = False
+    if not any(posting_counts) and max_df < doc_count:
+        # 正文高度模板化时，所有共有的二元组都可能超过上限，倒排表为空、任何查询都没有结果；
+        # 这时放开上限，宁可倒排表长一些
+        max_df, relaxed = doc_count, True
+        posting_counts = _posting_counts(columns, df, max_df)
+    indptr = array('I', [0])
+    for count in posting_counts:
+        indptr.append(indptr[-1] + count)
+    nnz = indptr[-1]
+    indices = array('I', bytes(4 * nnz))
+    data = array('f', bytes(4 * nnz))
+    fill = array('I', indptr[:-1])
+    for row in range(doc_count):
+        if should_stop and row % SCAN_BATCH == 0 and should_stop():
+            return None, None
+        start, end = doc_ptr[row], doc_ptr[row + 1]
+        weights = [(1 + math.log(tfs[k])) * _idf(df[columns[k]], doc_count) for k in range(start, end)]
+        norm = math.sqrt(sum(weight * weight for weight in weights)) or 1.0
+        for k in range(start, end):
+            column = columns[k]
+            if 2 <= df[column] <= max_df:
+                position = fill[column]
+                indices[position] = row
+                data[position] = weights[k - start] / norm
+                fill[column] = position + 1
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, BUCKETS, doc_count, nnz, seq))
+        for section in (ids, df, indptr, indices, data):
+            section.tofile(f)
+    return temp_path, {
+        'records': doc_count,
+        'postings': nnz,
+        'max_df': max_df,
+        'relaxed': relaxed,
+        'bytes': os.path.getsize(temp_path),
+        'seq': seq,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+class RelatedIndex:
+    """映射到内存的索引文件加上内存中的增量（新增、修改过的记录的向量，以及需要从索引中屏蔽的记录）"""
+
+    def __init__(self, path, connect):
+        self.path = path
+        self._connect = connect
+        self._lock = threading.RLock()
+        self._file = None
+        self._mmap = None
+        self._views = None
+        self._header = None
+        self._delta = {}
+        self._hidden = set()
+        self._seq = 0
+        # 文件不存在、流水已断开或增量过多，需要后台重建
+        self.stale = True
+        # 本进程最近一次重建的统计（倒排项数、实际使用的 df 上限等）
+        self.last_build = None
+
+    def _open(self):
+        if self._views is not None or not os.path.exists(self.path):
+            return self._views is not None
+        f = open(self.path, 'rb')
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            f.close()
+            return False
+        magic, buckets, doc_count, nnz, seq = HEADER.unpack_from(buffer)
+        expected = HEADER.size + 4 * (doc_count + buckets + buckets + 1 + nnz + nnz)
+        if magic != MAGIC or buckets != BUCKETS or len(buffer) != expected:
+            buffer.close()
+            f.close()
+            return False
+        whole = memoryview(buffer)
+        views = {'whole': whole}
+        offset = HEADER.size
+        for name, typecode, count in (('ids', 'I', doc_count), ('df', 'I', buckets), ('indptr', 'I', buckets + 1),
+                                      ('indices', 'I', nnz), ('data', 'f', nnz)):
+            views[name] = whole[offset:offset + 4 * count].cast(typecode)
+            views[name + '_offset'] = offset
+            offset += 4 * count
+        self._file, self._mmap, self._views = f, buffer, views
+        self._header = {'records': doc_count, 'postings': nnz, 'seq': seq}
+        self._delta.clear()
+        self._hidden.clear()
+        self._seq = seq
+        self.stale = False
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._views is not None:
+                for name, view in self._views.items():
+                    if isinstance(view, memoryview) and name != 'whole':
+                        view.release()
+                self._views['whole'].release()
+                self._mmap.close()
+                self._file.close()
+            self._file = self._mmap = self._views = self._header = None
+            self._delta.clear()
+            self._hidden.clear()
+            self.stale = True
+
+    def invalidate(self):
+        """数据库被整体替换：旧索引不再对应当前数据，删除后等待重建"""
+        with self._lock:
+            self.close()
+            for path in (self.path, self.path + '.tmp'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def rebuild(self, should_stop=None):
+        conn = self._connect()
+        try:
+            temp_path, stats = build_index(conn, self.path, should_stop)
+        finally:
+            conn.close()
+        if temp_path is None:
+            if os.path.exists(self.path + '.tmp'):
+                os.remove(self.path + '.tmp')
+            return {'cancelled': True}
+        with self._lock:
+            # Windows 上不能替换仍被映射的文件，先关闭旧映射
+            self.close()
+            os.replace(temp_path, self.path)
+            self._open()
+            self.last_build = stats
+        return stats
+
+    def _apply_changes(self, conn):
+        """把建索引之后的增删改补到内存增量中"""
+        if changefeed.latest_seq(conn) == self._seq:
+            return
+        result = changefeed.changes_since(conn, self._seq, limit=DELTA_LIMIT)
+        if result['reset']:
+            self.stale = True
+            return
+        df, doc_count = self._views['df'], self._header['records']
+        for change in result['changes']:
+            record_id = change['id']
+            self._hidden.add(record_id)
+            if change['action'] == 'delete':
+                self._delta.pop(record_id, None)
+            else:
+                self._delta[record_id] = weigh(term_counts(change['record']['content']), df, doc_count)
+        self._seq = result['latest']
+        if len(self._delta) > DELTA_LIMIT or len(self._hidden) > DELTA_LIMIT:
+            self.stale = True
+
+    def _row_of(self, record_id):
+        ids = self._views['ids']
+        row = bisect.bisect_left(ids, record_id)
+        return row if row < len(ids) and ids[row] == record_id else None
+
+    def related(self, conn, record_id, limit=10):
+        """与某条记录最相似的记录，返回 [(record_id, 相似度)]；索引尚未建立时返回 None，记录不存在时抛出 KeyError"""
+        row = conn.execute('SELECT content FROM JL WHERE id = ?', (record_id,)).fetchone()
+        if row is None:
+            raise KeyError(record_id)
+        with self._lock:
+            if not self._open():
+                self.stale = True
+                return None
+            self._apply_changes(conn)
+            views = self._views
+            query = weigh(term_counts(row[0]), views['df'], self._header['records'])
+            terms = heapq.nlargest(QUERY_TERMS, query.items(), key=lambda item: item[1])
+            exclude = set(self._hidden)
+            exclude.add(record_id)
+            numpy = _numpy()
+            if numpy is not None:
+                scores = self._score_numpy(numpy, terms, exclude, limit)
+            else:
+                scores = self._score_python(terms, exclude, limit)
+            for other_id, vector in self._delta.items():
+                if other_id != record_id:
+                    score = sum(weight * vector.get(column, 0.0) for column, weight in terms)
+                    if score > 0:
+                        scores.append((other_id, score))
+        return [(other_id, round(score, 4)) for other_id, score in heapq.nlargest(limit, scores, key=lambda item: item[1])]
+
+    def _score_python(self, terms, exclude, limit):
+        views = self._views
+        indptr, indices, data, ids = views['indptr'], views['indices'], views['data'], views['ids']
+        scores = {}
+        for column, weight in terms:
+            start, end = indptr[column], indptr[column + 1]
+            for row, value in zip(indices[start:end], data[start:end]):
+                scores[row] = scores.get(row, 0.0) + weight * value
+        # 多取一些，被屏蔽的记录过滤掉之后仍然够数
+        best = heapq.nlargest(limit + len(exclude), scores.items(), key=lambda item: item[1])
+        return [(ids[row], score) for row, score in best if ids[row] not in exclude]
+
+    def _score_numpy(self, numpy, terms, exclude, limit):
+        views = self._views
+        indptr, ids = views['indptr'], views['ids']
+        doc_count = self._header['records']
+        if not terms or not doc_count:
+            return []
+        rows, values = [], []
+        for column, weight in terms:
+            start, end = indptr[column], indptr[column + 1]
+            if end > start:
+                rows.append(numpy.frombuffer(self._mmap, dtype='<u4', count=end - start,
+                                             offset=views['indices_offset'] + 4 * start))
+                values.append(numpy.frombuffer(self._mmap, dtype='<f4', count=end - start,
+                                               offset=views['data_offset'] + 4 * start) * weight)
+        if not rows:
+            return []
+        scores = numpy.bincount(numpy.concatenate(rows), weights=numpy.concatenate(values), minlength=doc_count)
+        for record_id in exclude:
+            row = self._row_of(record_id)
+            if row is not None:
+                scores[row] = 0
+        count = min(limit, doc_count)
+        best = numpy.argpartition(-scores, count - 1)[:count]
+        return [(ids[int(row)], float(scores[row])) for row in best if scores[row] > 0]
+
+    def stats(self):
+        with self._lock:
+            opened = self._open()
+            return {
+                'ready': opened,
+                'stale': self.stale,
+                'delta': len(self._delta),
+                'hidden': len(self._hidden),
+                # 索引存在但没有任何倒排项：所有查询都不会有结果
+                'empty': opened and self._header['postings'] == 0,
+                'last_build': self.last_build,
+                **(self._header or {}),
+            }
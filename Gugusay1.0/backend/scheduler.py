@@ -0,0 +1,277 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+from backend.config import SCHEDULER_IDLE_SECONDS, SCHEDULER_WORKERS
+
+# Lower value runs first.
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 50
+PRIORITY_LOW = 90
+
+HISTORY_SIZE = 50
+
+
+class Job:
+    """A unit of background work. The callable receives the job and should poll job.should_stop()."""
+
+    def __init__(self, job_id, name, func, priority, idle_only, interval):
+        self.id = job_id
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.idle_only = idle_only
+        self.interval = interval
+        self.state = "queued"
+        self.run_at = 0.0
+        self.runs = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.interrupted = False
+        self._cancel = threading.Event()
+        self._scheduler = None
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def should_stop(self):
+        """True once the job is cancelled, the scheduler is shutting down, or an idle-only job sees activity."""
+        if self._cancel.is_set():
+            return True
+        scheduler = self._scheduler
+        if scheduler is None:
+            return False
+        if scheduler.stopping:
+            return True
+        if self.idle_only and not scheduler.is_idle():
+            self.interrupted = True
+            return True
+        return False
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "priority": self.priority,
+            "idle_only": self.idle_only,
+            "interval": self.interval,
+            "runs": self.runs,
+            "next_run_in": round(max(0.0, self.run_at - time.monotonic()), 1) if self.state == "queued" else None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class Scheduler:
+    """In-process job scheduler: a priority queue drained by a small worker pool.
+
+    Jobs marked idle_only wait until no API request has been seen for idle_after
+    seconds, and their should_stop() turns true as soon as the UI is busy again.
+    Periodic jobs are re-queued after each run; one that stopped early because
+    the UI got busy is retried once idle again instead of a full interval later.
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS, idle_after=SCHEDULER_IDLE_SECONDS):
+        self.workers = workers
+        self.idle_after = idle_after
+        self.stopping = False
+        self._cond = threading.Condition()
+        self._delayed = []  # heap of (run_at, seq, job) not yet due
+        self._ready = []  # heap of (priority, seq, job) due to run
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._threads = []
+        self._last_activity = time.monotonic()
+        self._active_requests = 0
+
+    # ---- activity tracking ----
+
+    def note_activity(self):
+        self._last_activity = time.monotonic()
+
+    def request_started(self):
+        with self._cond:
+            self._active_requests += 1
+            self._last_activity = time.monotonic()
+
+    def request_finished(self):
+        with self._cond:
+            self._active_requests = max(0, self._active_requests - 1)
+            self._last_activity = time.monotonic()
+            self._cond.notify_all()
+
+    def idle_for(self):
+        if self._active_requests:
+            return 0.0
+        return time.monotonic() - self._last_activity
+
+    def is_idle(self):
+        return self.idle_for() >= self.idle_after
+
+    # ---- submission ----
+
+    def submit(self, name, func, priority=PRIORITY_NORMAL, delay=0.0, idle_only=False):
+        return self._add(Job(next(self._ids), name, func, priority, idle_only, None), delay)
+
+    def every(self, name, interval, func, priority=PRIORITY_LOW, initial_delay=None, idle_only=True):
+        job = Job(next(self._ids), name, func, priority, idle_only, interval)
+        return self._add(job, interval if initial_delay is None else initial_delay)
+
+    def _add(self, job, delay):
+        job._scheduler = self
+        with self._cond:
+            if self.stopping:
+                job.state = "cancelled"
+                return job
+            self._jobs[job.id] = job
+            self._push(job, delay)
+        return job
+
+    def _push(self, job, delay):
+        # Caller holds self._cond.
+        job.state = "queued"
+        job.run_at = time.monotonic() + max(0.0, delay)
+        heapq.heappush(self._delayed, (job.run_at, next(self._seq), job))
+        self._cond.notify()
+
+    def cancel(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.cancel()
+            if job.state == "queued":
+                self._finish(job, "cancelled")
+            self._cond.notify_all()
+            return True
+
+    # ---- workers ----
+
+    def _next_job(self):
+        """Pop the most urgent runnable job, or return (None, seconds to wait). Caller holds self._cond."""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, seq, job = heapq.heappop(self._delayed)
+            heapq.heappush(self._ready, (job.priority, seq, job))
+        idle = self.is_idle()
+        skipped = []
+        found = None
+        while self._ready:
+            entry = heapq.heappop(self._ready)
+            job = entry[2]
+            if job.state != "queued":
+                continue  # cancelled while waiting
+            if job.idle_only and not idle:
+                skipped.append(entry)
+                continue
+            found = job
+            break
+        for entry in skipped:
+            heapq.heappush(self._ready, entry)
+        if found is not None:
+            return found, None
+        waits = []
+        if self._delayed:
+            waits.append(self._delayed[0][0] - now)
+        if skipped:
+            waits.append(self.idle_after - self.idle_for())
+        return None, (min(waits) if waits else None)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self.stopping:
+                    job, wait = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait(timeout=max(0.05, wait) if wait is not None else None)
+                if self.stopping:
+                    return
+                job.state = "running"
+                job.started_at = time.time()
+                job.interrupted = False
+            self._run(job)
+
+    def _run(self, job):
+        try:
+            job.result = job.func(job)
+            job.error = None
+            state = "cancelled" if job.cancelled else "done"
+        except Exception as e:
+            job.error = str(e)
+            state = "failed"
+            print(f"job {job.name} failed: {e}")
+        job.runs += 1
+        with self._cond:
+            if job.interval and not job.cancelled and not self.stopping:
+                job.finished_at = time.time()
+                # Unfinished idle work resumes at the next idle window, not a full interval later.
+                self._push(job, self.idle_after if job.interrupted else job.interval)
+            else:
+                self._finish(job, state)
+
+    def _finish(self, job, state):
+        # Caller holds self._cond.
+        job.state = state
+        job.finished_at = time.time()
+        self._jobs.pop(job.id, None)
+        self._history.append(job)
+
+    # ---- lifecycle ----
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self.stopping = False
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"scheduler-{index + 1}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, timeout=5.0):
+        """Cancel queued jobs, ask running jobs to stop, and wait up to timeout seconds for workers."""
+        with self._cond:
+            if self.stopping:
+                return
+            self.stopping = True
+            for job in list(self._jobs.values()):
+                job.cancel()
+                if job.state == "queued":
+                    self._finish(job, "cancelled")
+            self._delayed.clear()
+            self._ready.clear()
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def status(self):
+        with self._cond:
+            active = sorted(self._jobs.values(), key=lambda job: (job.state != "running", job.run_at))
+            return {
+                "running": bool(self._threads) and not self.stopping,
+                "idle": self.is_idle(),
+                "idle_for": round(self.idle_for(), 1),
+                "jobs": [job.to_dict() for job in active],
+                "recent": [job.to_dict() for job in reversed(self._history)],
+            }
+
+
+scheduler = Scheduler()
@@ -0,0 +1,135 @@
+# 搜索历史写缓冲模块：搜索请求只更新内存，批量异步落盘
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from backend.config import SEARCH_HISTORY_LIMIT
+from backend.scheduler import PRIORITY_HIGH, scheduler
+
+
+class SearchHistoryBuffer:
+    """内存中的搜索历史（最近的在前），写入先缓冲，由后台调度器延时或退出时批量写入数据库"""
+
+    def __init__(self, connect, limit=SEARCH_HISTORY_LIMIT, flush_interval=5.0):
+        self._connect = connect
+        self.limit = limit
+        # 内存和磁盘都多保留一些，删除某条后仍能用较早的历史补足 limit 条
+        self.keep = limit * 2
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._entries = OrderedDict()  # keyword -> search_datetime，最近的在末尾
+        self._pending = {}              # 待写入的 keyword -> search_datetime
+        self._deleted = set()           # 待删除的 keyword
+        self._loaded = False
+        self._flush_job = None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT keyword, search_datetime FROM search_history
+                WHERE keyword IS NOT NULL AND keyword != ''
+                ORDER BY search_datetime DESC, id DESC
+                LIMIT ?
+            ''', (self.keep,)).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            if self._loaded:
+                return
+            for keyword, search_datetime in reversed(rows):
+                if keyword not in self._entries:
+                    self._entries[keyword] = search_datetime
+            self._loaded = True
+
+    def get(self):
+        """返回最近的搜索关键词（不访问数据库）"""
+        self._ensure_loaded()
+        with self._lock:
+            keywords = list(reversed(self._entries))[:self.limit]
+        return [{'keyword': keyword} for keyword in keywords]
+
+    def record(self, keyword):
+        """记录一次搜索：相同关键词去重并移到最前，稍后批量写盘"""
+        if not keyword:
+            return
+        self._ensure_loaded()
+        # 带毫秒，保证同一秒内的多次搜索在磁盘上也能正确排序
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        with self._lock:
+            self._entries.pop(keyword, None)
+            self._entries[keyword] = now
+            while len(self._entries) > self.keep:
+                self._entries.popitem(last=False)
+            self._pending.pop(keyword, None)
+            self._pending[keyword] = now
+            self._deleted.discard(keyword)
+            self._schedule_flush()
+
+    def delete(self, keyword):
+        self._ensure_loaded()
+        with self._lock:
+            self._entries.pop(keyword, None)
+            self._pending.pop(keyword, None)
+            self._deleted.add(keyword)
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        # 调用方持有 self._lock
+        if self._flush_job is None:
+            self._flush_job = scheduler.submit(
+                'search history flush', lambda job: self.flush(), priority=PRIORITY_HIGH, delay=self.flush_interval
+            )
+
+    def flush(self):
+        """把缓冲的写入和删除一次性提交，并把磁盘上的历史裁剪到 keep 条"""
+        with self._flush_lock:
+            with self._lock:
+                self._flush_job = None
+                pending = self._pending
+                deleted = self._deleted
+                self._pending = {}
+                self._deleted = set()
+            if not pending and not deleted:
+                return 0
+            conn = self._connect()
+            try:
+                conn.executemany('''
+                    INSERT INTO search_history (keyword, search_datetime)
+                    VALUES (?, ?)
+                    ON CONFLICT(keyword) DO UPDATE SET search_datetime = excluded.search_datetime
+                ''', list(pending.items()))
+                conn.executemany('DELETE FROM search_history WHERE keyword = ?', [(k,) for k in deleted])
+                conn.execute('''
+                    DELETE FROM search_history
+                    WHERE id NOT IN (
+                        SELECT id FROM search_history ORDER BY search_datetime DESC, id DESC LIMIT ?
+                    )
+                ''', (self.keep,))
+                conn.commit()
+            except Exception:
+                # 写入失败时放回缓冲，下次再试（较新的内存值优先）
+                with self._lock:
+                    for keyword, search_datetime in pending.items():
+                        if keyword not in self._deleted:
+                            self._pending.setdefault(keyword, search_datetime)
+                    self._deleted |= deleted - set(self._pending)
+                    self._schedule_flush()
+                raise
+            finally:
+                conn.close()
+            return len(pending) + len(deleted)
+
+    def reset(self):
+        """丢弃内存中的历史（数据库被替换后调用），下次访问时重新加载"""
+        with self._lock:
+            if self._flush_job is not None:
+                scheduler.cancel(self._flush_job.id)
+                self._flush_job = None
+            self._entries.clear()
+            self._pending.clear()
+            self._deleted.clear()
+            self._loaded = False
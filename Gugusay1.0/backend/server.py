@@ -1,30 +1,88 @@
+import hashlib
 import json
 import mimetypes
 import os
+import re
 import secrets
+import sys
+import time
 import urllib.parse
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
-from backend.config import APP_ROOT, MEDIA_DIR, SERVER_HOST, SERVER_PORT
+from backend import changefeed, entities, maintenance, metrics, startup
+from backend.config import APP_ROOT, ASSETS_DIR, MEDIA_DIR, EVENTS_KEEPALIVE_SECONDS, SERVER_HOST, SERVER_PORT, SUGGEST_LIMIT, UPDATE_CHECK_MAX_AGE
 from backend.database import db_manager
-from backend.update_manager import update_manager
+from backend.params import int_param, page_size_param
+from backend.query_language import QuerySyntaxError
+from backend.scheduler import scheduler
 
 APP_ROOT_PATH = Path(APP_ROOT).resolve()
+ASSETS_PATH = Path(ASSETS_DIR).resolve()
+# Bundles produced by build.py carry a content hash, so they never change under the same name.
+FINGERPRINTED_RE = re.compile(r"\.[0-9a-f]{10}\.(?:js|css)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+USE_BUNDLED_ASSETS = os.getenv("GUGUSAY_DEBUG", "0") != "1"
+# The frozen build always bundles right before packaging, and extracted files carry no useful mtimes.
+CHECK_BUNDLE_FRESHNESS = not getattr(sys, "frozen", False)
 UPDATE_API_TOKEN = secrets.token_urlsafe(24)
 LOCAL_ORIGINS = {f"http://{SERVER_HOST}:{SERVER_PORT}", "http://localhost:3000", "http://127.0.0.1:3000"}
+# Read-only resources whose response depends only on the JL data. Their ETag is derived from the
+# change feed version, so a revalidation is answered with 304 before any query runs.
+VERSIONED_RESOURCES = {
+    "records", "locate", "total-count", "year-months", "channels", "year-month", "channel",
+    "record", "latest-page", "init-data", "on-this-day", "entities", "duplicates",
+}
+# Distinguishes ETags across restarts, where the change feed version starts from zero again.
+BOOT_ID = secrets.token_hex(4)
+
+
+_stale_bundle_reported = False
+
+
+def bundle_is_current():
+    """True when assets/ was built after every source file listed in its manifest."""
+    manifest_path = ASSETS_PATH / "manifest.json"
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        built_at = manifest_path.stat().st_mtime
+        sources = [manifest["entry"], *manifest["modules"], *manifest.get("stylesheets", [])]
+        return all((APP_ROOT_PATH / name).stat().st_mtime <= built_at for name in sources)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def use_bundled_assets():
+    """Serve assets/ unless debugging or it is older than the sources (edited without a rebuild)."""
+    global _stale_bundle_reported
+    if not USE_BUNDLED_ASSETS or not (ASSETS_PATH / "index.html").is_file():
+        return False
+    if not CHECK_BUNDLE_FRESHNESS or bundle_is_current():
+        _stale_bundle_reported = False
+        return True
+    if not _stale_bundle_reported:
+        _stale_bundle_reported = True
+        print("assets/ is older than the frontend sources; serving unbundled modules (run build.py --assets-only)")
+    return False
 
 
 class RequestHandler(BaseHTTPRequestHandler):
+    etag = None
+    response_status = None
+
     def log_message(self, format, *args):
         pass
 
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+
     def do_GET(self):
         parsed = urllib.parse.urlparse(self.path)
         request_path = parsed.path
 
         if request_path == "/" or request_path == "/index.html":
-            self.serve_file(APP_ROOT_PATH / "index.html", "text/html")
+            self.serve_index()
             return
         if request_path.startswith("/api/"):
             self.handle_api_request()
@@ -33,10 +91,29 @@ class RequestHandler(BaseHTTPRequestHandler):
         file_path = self.safe_path(APP_ROOT_PATH, relative_path)
         if file_path and file_path.exists() and file_path.is_file():
             mime_type, _ = mimetypes.guess_type(str(file_path))
-            self.serve_file(file_path, mime_type or "application/octet-stream")
+            if file_path.parent == ASSETS_PATH and FINGERPRINTED_RE.search(file_path.name):
+                self.serve_fingerprinted_file(file_path, mime_type or "application/octet-stream")
+            else:
+                self.serve_file(file_path, mime_type or "application/octet-stream")
         else:
             self.send_error(404)
 
+    def serve_index(self):
+        if use_bundled_assets():
+            self.serve_file(ASSETS_PATH / "index.html", "text/html", {"Cache-Control": "no-cache"})
+        else:
+            self.serve_file(APP_ROOT_PATH / "index.html", "text/html", {"Cache-Control": "no-cache"})
+
+    def serve_fingerprinted_file(self, file_path, content_type):
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        gzip_path = file_path.with_name(file_path.name + ".gz")
+        accepts_gzip = "gzip" in (self.headers.get("Accept-Encoding") or "").lower()
+        if accepts_gzip and gzip_path.is_file():
+            headers["Content-Encoding"] = "gzip"
+            self.serve_file(gzip_path, content_type, headers)
+        else:
+            self.serve_file(file_path, content_type, headers)
+
     def do_POST(self):
         if self.path.startswith("/api/"):
             self.handle_api_request()
@@ -90,6 +167,33 @@ class RequestHandler(BaseHTTPRequestHandler):
         return True
 
     def handle_api_request(self):
+        if self.path.startswith("/api/events"):
+            # A long-lived stream: it neither keeps the UI "busy" nor blocks database swaps.
+            self.handle_events_stream()
+            return
+        # Track in-flight API requests so idle-only background jobs wait for a quiet UI.
+        # Polling the job list and posting client timings do not count as activity.
+        tracked = not self.path.startswith(("/api/jobs", "/api/metrics"))
+        # Update and snapshot requests may swap the database, which waits for every other request to drain.
+        gated = tracked and not self.path.startswith(("/api/update", "/api/snapshots"))
+        if tracked:
+            scheduler.request_started()
+        started = time.perf_counter()
+        try:
+            if gated:
+                with db_manager.reading():
+                    self.dispatch_api_request()
+            else:
+                self.dispatch_api_request()
+        finally:
+            db_manager.release_connection()
+            if tracked:
+                scheduler.request_finished()
+                resource = urllib.parse.urlparse(self.path).path.split("/")[2:3]
+                endpoint = f"{self.command} /api/{resource[0] if resource else ''}"
+                metrics.record_server(endpoint, (time.perf_counter() - started) * 1000, self.response_status)
+
+    def dispatch_api_request(self):
         parsed_path = urllib.parse.urlparse(self.path)
         path_parts = parsed_path.path.strip("/").split("/")
         if len(path_parts) < 2 or path_parts[0] != "api":
@@ -97,16 +201,36 @@ class RequestHandler(BaseHTTPRequestHandler):
             return
 
         resource = path_parts[1]
+        if self.command == "GET" and resource in VERSIONED_RESOURCES:
+            # Read the version before querying: a write during the query only makes the tag older.
+            feed = db_manager.change_feed
+            self.etag = f'W/"{BOOT_ID}-{feed.epoch}-{feed.version}"'
+            if self.etag_matches(self.etag):
+                self.send_not_modified(self.etag)
+                return
+
         if resource == "records":
             self.handle_records_api(path_parts, parsed_path)
         elif resource == "save-media-file" and self.command == "POST":
             self.save_media_file()
         elif resource == "stats":
-            self.handle_stats_api(path_parts)
+            self.handle_stats_api(path_parts, parsed_path)
         elif resource in {"progress", "reading-progress"}:
             self.handle_progress_api()
         elif resource == "search":
             self.handle_search_api(path_parts, parsed_path)
+        elif resource == "query":
+            self.handle_query_api(parsed_path)
+        elif resource == "changes":
+            query_params = urllib.parse.parse_qs(parsed_path.query)
+            since_str = query_params.get("since", [""])[0]
+            self.send_json_response(db_manager.get_changes(int(since_str) if since_str.isdigit() else 0))
+        elif resource == "suggest":
+            query_params = urllib.parse.parse_qs(parsed_path.query)
+            query = query_params.get("q", [""])[0]
+            limit_str = query_params.get("limit", [""])[0]
+            limit = min(int(limit_str), 20) if limit_str.isdigit() else SUGGEST_LIMIT
+            self.send_json_response(db_manager.suggest(query, limit))
         elif resource == "search-history":
             self.handle_search_history_api(path_parts)
         elif resource == "year-months":
@@ -115,15 +239,42 @@ class RequestHandler(BaseHTTPRequestHandler):
             self.send_json_response(db_manager.get_channels())
         elif resource == "total-count":
             query_params = urllib.parse.parse_qs(parsed_path.query)
-            page_size_str = query_params.get("pageSize", ["6"])[0]
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
             self.send_json_response(db_manager.get_total_count(page_size))
         elif resource == "update":
-            self.handle_update_api(path_parts)
+            self.handle_update_api(path_parts, parsed_path)
+        elif resource == "jobs":
+            self.handle_jobs_api(path_parts)
+        elif resource == "snapshots":
+            self.handle_snapshots_api(path_parts)
+        elif resource == "maintenance" and self.command == "POST" and path_parts[2:] == ["vacuum"]:
+            # A full VACUUM cannot be interrupted, so it only runs on request; poll /api/jobs for the result.
+            if not self.require_update_auth():
+                return
+            job = maintenance.submit_vacuum_conversion(scheduler, db_manager)
+            self.send_json_response({"success": True, "job": job.to_dict()})
+        elif resource == "startup":
+            self.send_json_response(startup.get_report())
+        elif resource == "metrics":
+            self.handle_metrics_api()
+        elif resource == "media":
+            self.handle_media_api(path_parts)
+        elif resource == "entities":
+            self.handle_entities_api(path_parts, parsed_path)
+        elif resource == "duplicates":
+            self.handle_duplicates_api(path_parts, parsed_path)
+        elif resource == "related" and len(path_parts) == 3 and path_parts[2].isdigit():
+            query_params = urllib.parse.parse_qs(parsed_path.query)
+            limit_str = query_params.get("limit", ["10"])[0]
+            limit = min(int(limit_str), 50) if limit_str.isdigit() and int(limit_str) > 0 else 10
+            result = db_manager.get_related(int(path_parts[2]), limit)
+            if result is None:
+                self.send_json_response({"error": "record not found"}, status=404)
+            else:
+                self.send_json_response(result)
         elif resource == "init-data":
             query_params = urllib.parse.parse_qs(parsed_path.query)
-            page_size_str = query_params.get("pageSize", ["6"])[0]
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
             total_count_data = db_manager.get_total_count(page_size)
             latest_page_data = db_manager.get_latest_record_page(page_size)
             self.send_json_response(
@@ -136,38 +287,104 @@ class RequestHandler(BaseHTTPRequestHandler):
         elif resource == "on-this-day":
             query_params = urllib.parse.parse_qs(parsed_path.query)
             keyword = query_params.get("keyword", [""])[0]
-            page_str = query_params.get("page", ["1"])[0]
-            page_size_str = query_params.get("pageSize", ["6"])[0]
-            page = int(page_str) if page_str and page_str != "undefined" else 1
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+            page = int_param(query_params.get("page", [""])[0], 1)
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
             self.send_json_response(db_manager.get_on_this_day(keyword, page, page_size))
         elif resource == "year-month" and len(path_parts) >= 4:
             year = path_parts[2]
             month = path_parts[3]
             query_params = urllib.parse.parse_qs(parsed_path.query)
-            page_size_str = query_params.get("pageSize", ["6"])[0]
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
             self.send_json_response(db_manager.get_year_month_page(year, month, page_size))
         elif resource == "channel" and len(path_parts) >= 3:
             channel = urllib.parse.unquote("/".join(path_parts[2:]))
             query_params = urllib.parse.parse_qs(parsed_path.query)
-            page_size_str = query_params.get("pageSize", ["6"])[0]
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
             self.send_json_response(db_manager.get_channel_page(channel, page_size))
         elif resource == "record" and len(path_parts) >= 3 and path_parts[2].isdigit():
             record_id = int(path_parts[2])
             query_params = urllib.parse.parse_qs(parsed_path.query)
-            page_size_str = query_params.get("pageSize", ["6"])[0]
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
             self.send_json_response(db_manager.get_record_page(record_id, page_size))
+        elif resource == "locate":
+            self.handle_locate_api(parsed_path)
         elif resource == "latest-page":
             query_params = urllib.parse.parse_qs(parsed_path.query)
-            page_size_str = query_params.get("pageSize", ["10"])[0]
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 10
+            page_size = page_size_param(query_params.get("pageSize", [""])[0], 10)
             self.send_json_response(db_manager.get_latest_record_page(page_size))
         else:
             self.send_error(404)
 
+    def handle_events_stream(self):
+        """Server-sent events: push merged record changes as they are committed.
+
+        Resumes from Last-Event-ID (or ?since=) so a reconnecting EventSource misses nothing.
+        A database swap sends a "reset" event; clients then reload instead of patching.
+        """
+        query_params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        since_str = self.headers.get("Last-Event-ID") or query_params.get("since", [""])[0]
+        feed = db_manager.change_feed
+        version, epoch = feed.version, feed.epoch
+        try:
+            with db_manager.reading():
+                since = int(since_str) if since_str.isdigit() else changefeed.latest_seq(db_manager.get_connection())
+            db_manager.release_connection()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.write_event("hello", {"latest": since, "epoch": epoch}, event_id=since)
+            while not feed.closed:
+                current = feed.wait(version, EVENTS_KEEPALIVE_SECONDS)
+                if current == version:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                version = current
+                with db_manager.reading():
+                    result = db_manager.get_changes(since)
+                db_manager.release_connection()
+                if feed.epoch != epoch or result["reset"]:
+                    epoch = feed.epoch
+                    self.write_event("reset", {"latest": result["latest"], "epoch": epoch}, event_id=result["latest"])
+                elif result["changes"] or result["latest"] != since:
+                    self.write_event("changes", result, event_id=result["latest"])
+                since = result["latest"]
+        except (ConnectionAbortedError, ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            db_manager.release_connection()
+
+    def write_event(self, event, data, event_id=None):
+        message = f"event: {event}\n"
+        if event_id is not None:
+            message += f"id: {event_id}\n"
+        message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        self.wfile.write(message.encode("utf-8"))
+        self.wfile.flush()
+
+    def handle_locate_api(self, parsed_path):
+        query_params = urllib.parse.parse_qs(parsed_path.query, keep_blank_values=True)
+        page_size = page_size_param(query_params.get("pageSize", [""])[0])
+        anchor = query_params.get("anchor", ["newest"])[0]
+        record_str = query_params.get("record", [""])[0]
+        if record_str:
+            if not record_str.isdigit():
+                self.send_json_response({"error": "invalid record id"}, status=400)
+                return
+            result = db_manager.locate(record_id=int(record_str), page_size=page_size)
+        elif "yearMonth" in query_params:
+            result = db_manager.locate(year_month=query_params["yearMonth"][0], page_size=page_size, anchor=anchor)
+        elif "channel" in query_params:
+            result = db_manager.locate(channel=query_params["channel"][0], page_size=page_size, anchor=anchor)
+        else:
+            self.send_json_response({"error": "record, yearMonth or channel is required"}, status=400)
+            return
+        if result is None:
+            self.send_json_response({"error": "not found"}, status=404)
+        else:
+            self.send_json_response(result)
+
     def handle_records_api(self, path_parts, parsed_path):
         if self.command == "GET":
             if len(path_parts) == 3 and path_parts[2].isdigit():
@@ -179,10 +396,8 @@ class RequestHandler(BaseHTTPRequestHandler):
                     self.send_error(404)
             else:
                 query_params = urllib.parse.parse_qs(parsed_path.query)
-                page_str = query_params.get("page", ["1"])[0]
-                page_size_str = query_params.get("pageSize", ["6"])[0]
-                page = int(page_str) if page_str and page_str != "undefined" else 1
-                page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+                page = int_param(query_params.get("page", [""])[0], 1)
+                page_size = page_size_param(query_params.get("pageSize", [""])[0])
                 search = query_params.get("search", [""])[0]
                 channel = query_params.get("channel", [""])[0]
                 year_month = query_params.get("yearMonth", [""])[0]
@@ -196,11 +411,13 @@ class RequestHandler(BaseHTTPRequestHandler):
             elif self.command == "DELETE":
                 self.send_json_response(db_manager.delete_record(record_id))
 
-    def handle_update_api(self, path_parts):
+    def handle_update_api(self, path_parts, parsed_path):
         if len(path_parts) < 3:
             self.send_error(404)
             return
         action = path_parts[2]
+        # Imported on first use so the updater stays off the startup path.
+        from backend.update_manager import update_manager
 
         if action == "config" and self.command == "GET":
             if not self.is_local_request():
@@ -215,7 +432,10 @@ class RequestHandler(BaseHTTPRequestHandler):
             return
 
         if action == "check" and self.command == "GET":
-            self.send_json_response(update_manager.check_update())
+            # Answers from the cached result; refresh=1 queues a background fetch of the manifest.
+            query_params = urllib.parse.parse_qs(parsed_path.query)
+            refresh = query_params.get("refresh", ["0"])[0] == "1"
+            self.send_json_response(update_manager.check_update(refresh=refresh))
         elif action == "start" and self.command == "POST":
             self.send_json_response(update_manager.start_update())
         elif action == "config" and self.command == "PUT":
@@ -229,7 +449,90 @@ class RequestHandler(BaseHTTPRequestHandler):
         else:
             self.send_error(404)
 
-    def handle_stats_api(self, path_parts):
+    def handle_jobs_api(self, path_parts):
+        if self.command == "GET" and len(path_parts) == 2:
+            self.send_json_response(scheduler.status())
+        elif self.command == "POST" and len(path_parts) == 4 and path_parts[3] == "cancel" and path_parts[2].isdigit():
+            if not self.require_update_auth():
+                return
+            cancelled = scheduler.cancel(int(path_parts[2]))
+            self.send_json_response({"success": cancelled}, status=200 if cancelled else 404)
+        else:
+            self.send_error(404)
+
+    def handle_snapshots_api(self, path_parts):
+        if self.command == "GET" and len(path_parts) == 2:
+            self.send_json_response({"snapshots": db_manager.list_snapshots()})
+            return
+        if self.command != "POST":
+            self.send_error(404)
+            return
+        if not self.require_update_auth():
+            return
+        if len(path_parts) == 2:
+            # Runs on the scheduler; poll /api/jobs for the result.
+            job = scheduler.submit("database snapshot", db_manager.create_snapshot)
+            self.send_json_response({"success": True, "job": job.to_dict()})
+        elif len(path_parts) == 4 and path_parts[3] == "restore":
+            result = db_manager.restore_snapshot(urllib.parse.unquote(path_parts[2]))
+            self.send_json_response(result, status=200 if result.get("success") else 400)
+        else:
+            self.send_error(404)
+
+    def handle_media_api(self, path_parts):
+        action = path_parts[2] if len(path_parts) >= 3 else ""
+        if action == "scan" and self.command == "POST":
+            # POST: a verified scan writes sizes and checksums back to JL_media.
+            data = self.parse_json_body()
+            self.send_json_response(db_manager.scan_media(verify=data.get("verify", True) is not False))
+        elif action == "index" and self.command == "POST":
+            # Runs on the scheduler; poll /api/jobs for the result.
+            job = scheduler.submit("media metadata", db_manager.index_media)
+            self.send_json_response({"success": True, "job": job.to_dict()})
+        elif action == "cleanup" and self.command == "POST":
+            # Moving files is destructive enough to need the same token as updates.
+            if not self.require_update_auth():
+                return
+            data = self.parse_json_body()
+            self.send_json_response(db_manager.cleanup_media(dry_run=data.get("dry_run", True) is not False))
+        else:
+            self.send_error(404)
+
+    def handle_entities_api(self, path_parts, parsed_path):
+        query_params = urllib.parse.parse_qs(parsed_path.query)
+        kind = query_params.get("kind", ["topic"])[0]
+        if kind not in entities.KINDS:
+            self.send_json_response({"error": f"unknown entity kind: {kind}"}, status=400)
+            return
+        if len(path_parts) == 2:
+            limit_str = query_params.get("limit", ["50"])[0]
+            limit = min(int(limit_str), 500) if limit_str.isdigit() and int(limit_str) > 0 else 50
+            since = query_params.get("since", [""])[0] or None
+            until = query_params.get("until", [""])[0] or None
+            self.send_json_response(db_manager.get_top_entities(kind, since, until, limit))
+        elif path_parts[2] == "records":
+            value = query_params.get("value", [""])[0]
+            page = int_param(query_params.get("page", [""])[0], 1)
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
+            self.send_json_response(db_manager.get_entity_records(kind, value, page, page_size))
+        else:
+            self.send_error(404)
+
+    def handle_duplicates_api(self, path_parts, parsed_path):
+        action = path_parts[2] if len(path_parts) >= 3 else ""
+        if not action and self.command == "GET":
+            query_params = urllib.parse.parse_qs(parsed_path.query)
+            page = int_param(query_params.get("page", [""])[0], 1)
+            page_size = page_size_param(query_params.get("pageSize", [""])[0], 20, maximum=100)
+            self.send_json_response(db_manager.get_duplicate_clusters(page, page_size))
+        elif action == "scan" and self.command == "POST":
+            # Runs on the scheduler; poll /api/jobs for the result.
+            job = scheduler.submit("duplicate detection", db_manager.detect_duplicates)
+            self.send_json_response({"success": True, "job": job.to_dict()})
+        else:
+            self.send_error(404)
+
+    def handle_stats_api(self, path_parts, parsed_path):
         if len(path_parts) >= 3:
             if path_parts[2] == "year-month":
                 self.send_json_response(db_manager.get_year_month_tree())
@@ -239,6 +542,29 @@ class RequestHandler(BaseHTTPRequestHandler):
                 self.send_json_response(db_manager.get_summary_stats())
             elif path_parts[2] == "combined":
                 self.send_json_response(db_manager.get_combined_stats())
+            elif path_parts[2] == "cache":
+                self.send_json_response(db_manager.cache_stats())
+            elif path_parts[2] == "timeseries":
+                query_params = urllib.parse.parse_qs(parsed_path.query)
+                year_str = query_params.get("year", [""])[0]
+                try:
+                    result = db_manager.get_timeseries(
+                        query_params.get("granularity", ["month"])[0],
+                        channel=query_params["channel"][0] if "channel" in query_params else None,
+                        year=int(year_str) if year_str.isdigit() else None,
+                        split=query_params.get("split", [""])[0] == "channel",
+                    )
+                except ValueError as e:
+                    self.send_json_response({"error": str(e)}, status=400)
+                    return
+                self.send_json_response(result)
+
+    def handle_metrics_api(self):
+        if self.command == "GET":
+            self.send_json_response(metrics.get_report())
+        elif self.command == "POST":
+            data = self.parse_json_body()
+            self.send_json_response({"success": True, "accepted": metrics.record_client(data.get("samples"))})
 
     def handle_progress_api(self):
         if self.command == "GET":
@@ -253,12 +579,13 @@ class RequestHandler(BaseHTTPRequestHandler):
         if self.command == "GET":
             query_params = urllib.parse.parse_qs(parsed_path.query)
             keyword = query_params.get("keyword", [""])[0]
-            page_str = query_params.get("page", ["1"])[0]
-            page_size_str = query_params.get("pageSize", ["6"])[0]
-            page = int(page_str) if page_str and page_str != "undefined" else 1
-            page_size = int(page_size_str) if page_size_str and page_size_str != "undefined" else 6
+            page = int_param(query_params.get("page", [""])[0], 1)
+            page_size = page_size_param(query_params.get("pageSize", [""])[0])
+            mode = query_params.get("mode", ["full"])[0]
+            # Letter-only keywords also match pinyin and pinyin initials unless the client opts out.
+            pinyin = query_params.get("pinyin", ["1"])[0] != "0"
             if keyword:
-                self.send_json_response(db_manager.search_records(keyword, page, page_size))
+                self.send_json_response(db_manager.search_records(keyword, page, page_size, mode, pinyin))
             else:
                 self.send_json_response(db_manager.get_search_history())
         elif self.command == "POST":
@@ -266,6 +593,20 @@ class RequestHandler(BaseHTTPRequestHandler):
             keyword = data.get("keyword")
             self.send_json_response(db_manager.add_search_history(keyword))
 
+    def handle_query_api(self, parsed_path):
+        query_params = urllib.parse.parse_qs(parsed_path.query)
+        text = query_params.get("q", [""])[0]
+        page = int_param(query_params.get("page", [""])[0], 1)
+        page_size = page_size_param(query_params.get("pageSize", [""])[0])
+        mode = query_params.get("mode", ["full"])[0]
+        explain = query_params.get("explain", ["0"])[0] == "1"
+        try:
+            result = db_manager.query_records(text, page, page_size, mode, explain)
+        except QuerySyntaxError as e:
+            self.send_json_response({"error": str(e)}, status=400)
+            return
+        self.send_json_response(result)
+
     def handle_search_history_api(self, path_parts):
         if self.command == "GET":
             self.send_json_response(db_manager.get_search_history())
@@ -374,18 +715,22 @@ class RequestHandler(BaseHTTPRequestHandler):
         new_file_name = f"{timestamp}_{record_id}_{file_index}{file_extension}"
         file_path = Path(MEDIA_DIR) / new_file_name
         try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
             with open(file_path, "wb") as f:
                 f.write(file_data)
             self.send_json_response({"success": True, "message": "saved", "path": f"media/{new_file_name}"})
         except Exception as e:
             self.send_json_response({"success": False, "error": str(e)})
 
-    def serve_file(self, file_path, content_type):
+    def serve_file(self, file_path, content_type, headers=None):
         try:
             with open(file_path, "rb") as f:
                 content = f.read()
             self.send_response(200)
             self.send_header("Content-type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
             self.end_headers()
             self.wfile.write(content)
         except FileNotFoundError:
@@ -393,18 +738,57 @@ class RequestHandler(BaseHTTPRequestHandler):
         except (ConnectionAbortedError, BrokenPipeError):
             pass
 
+    def etag_matches(self, etag):
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        return header.strip() == "*" or etag in {tag.strip() for tag in header.split(",")}
+
+    def send_not_modified(self, etag):
+        try:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+        except (ConnectionAbortedError, BrokenPipeError):
+            pass
+
     def send_json_response(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        etag = None
+        if self.command == "GET" and status == 200:
+            # Other GET responses get a content hash: a match still runs the query but skips the transfer.
+            etag = self.etag or f'W/"{hashlib.sha1(body).hexdigest()[:16]}"'
+            if self.etag_matches(etag):
+                self.send_not_modified(etag)
+                return
         try:
             self.send_response(status)
             self.send_header("Content-type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
             self.end_headers()
-            self.wfile.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            self.wfile.write(body)
         except (ConnectionAbortedError, BrokenPipeError):
             pass
 
 
+def _background_update_check(job):
+    from backend.update_manager import update_manager
+
+    return update_manager.check_update()
+
+
 def start_server():
     server_address = (SERVER_HOST, SERVER_PORT)
-    httpd = HTTPServer(server_address, RequestHandler)
+    # Threaded so a slow request or an open /api/events stream does not stall the UI.
+    httpd = ThreadingHTTPServer(server_address, RequestHandler)
+    scheduler.start()
+    maintenance.register_jobs(scheduler, db_manager)
+    # Keeps the cached update result fresh; check_update() only queues a fetch when it is stale.
+    scheduler.every("update check refresh", UPDATE_CHECK_MAX_AGE, _background_update_check, initial_delay=90)
+    startup.mark("server listening")
     print(f"server started at http://{SERVER_HOST}:{SERVER_PORT}")
     httpd.serve_forever()
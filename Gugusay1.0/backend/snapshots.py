@@ -0,0 +1,127 @@
+# 数据库快照模块：用 SQLite 在线备份接口分步复制，压缩后按数量轮换保存
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from backend.config import DATA_DIR, SNAPSHOT_KEEP, SNAPSHOT_PAGES_PER_STEP
+
+SNAPSHOT_DIR = str(Path(DATA_DIR) / 'snapshots')
+SNAPSHOT_RE = re.compile(r'^SR-\d{8}-\d{6}(?:-\d+)?\.db\.gz$')
+# 每一步之间让出的时间，让前台的读写有机会拿到锁
+STEP_PAUSE = 0.005
+# 其他连接持续写入时分步备份会不断从头开始，超过这个次数后改为一次性复制
+MAX_RESTARTS = 3
+
+
+class SnapshotCancelled(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _snapshot_name(directory):
+    base = f"SR-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    name = f'{base}.db.gz'
+    index = 1
+    while os.path.exists(os.path.join(directory, name)):
+        index += 1
+        name = f'{base}-{index}.db.gz'
+    return name
+
+
+def snapshot_path(name, directory=SNAPSHOT_DIR):
+    """只接受本模块生成的文件名，防止路径穿越"""
+    if not SNAPSHOT_RE.match(name or ''):
+        raise ValueError('invalid snapshot name')
+    return os.path.join(directory, name)
+
+
+def create_snapshot(source, directory=SNAPSHOT_DIR, pages=SNAPSHOT_PAGES_PER_STEP, keep=SNAPSHOT_KEEP, should_stop=None):
+    """把已打开的源连接备份为压缩快照，返回快照信息
+
+    每步只复制 pages 页，步与步之间释放源库的读锁，不会长时间阻塞其他连接；
+    期间其他连接写入时 SQLite 会自动从头重新复制，结果始终是一致的快照；
+    重新开始超过 MAX_RESTARTS 次时改为一次性复制，避免持续写入下永远完不成。
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = _snapshot_name(directory)
+    target = os.path.join(directory, name)
+    temp_db = target + '.tmp'
+    temp_gz = target + '.part'
+    started = time.perf_counter()
+
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if should_stop and should_stop():
+            raise SnapshotCancelled('snapshot cancelled')
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] >= MAX_RESTARTS:
+                raise _TooManyRestarts()
+        state['remaining'] = remaining
+        time.sleep(STEP_PAUSE)
+
+    try:
+        dest = sqlite3.connect(temp_db)
+        try:
+            try:
+                source.backup(dest, pages=pages, progress=progress)
+            except _TooManyRestarts:
+                source.backup(dest)
+        finally:
+            dest.close()
+        with open(temp_db, 'rb') as src, gzip.open(temp_gz, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(temp_gz, target)
+    finally:
+        for path in (temp_db, temp_gz):
+            if os.path.exists(path):
+                os.remove(path)
+    removed = rotate_snapshots(directory, keep)
+    return {
+        'name': name,
+        'size': os.path.getsize(target),
+        'seconds': round(time.perf_counter() - started, 3),
+        'restarts': state['restarts'],
+        'removed': removed,
+    }
+
+
+def list_snapshots(directory=SNAPSHOT_DIR):
+    """按时间从新到旧列出快照"""
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and SNAPSHOT_RE.match(entry.name):
+            stat = entry.stat()
+            snapshots.append({'name': entry.name, 'size': stat.st_size, 'created_at': stat.st_mtime})
+    snapshots.sort(key=lambda item: (item['created_at'], item['name']), reverse=True)
+    return snapshots
+
+
+def rotate_snapshots(directory=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """只保留最新的 keep 个快照，返回删除的文件名"""
+    removed = []
+    for snapshot in list_snapshots(directory)[keep:]:
+        os.remove(os.path.join(directory, snapshot['name']))
+        removed.append(snapshot['name'])
+    return removed
+
+
+def extract_snapshot(name, target, directory=SNAPSHOT_DIR):
+    """把快照解压为 target 数据库文件（用于恢复）"""
+    path = snapshot_path(name, directory)
+    if not os.path.exists(path):
+        raise FileNotFoundError(name)
+    with gzip.open(path, 'rb') as src, open(target, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    return target
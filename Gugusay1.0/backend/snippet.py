@@ -0,0 +1,47 @@
+# 搜索摘要模块：在查询中直接截取命中位置附近的片段，并计算高亮位置
+# SQLite 的 LIKE / lower() 只对 ASCII 大小写不敏感，这里保持同样的规则，保证位置一致
+
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def ascii_lower(text):
+    return (text or '').translate(_ASCII_LOWER)
+
+
+def snippet_select(radius, keyword, haystack='content'):
+    """返回 (SELECT 表达式, 参数)：命中位置、片段起点（从 1 开始）和片段本身
+
+    片段在 SQLite 内部用 substr 截取，整段 content 不会传回 Python。
+    内容里没有命中（只匹配了渠道）时从开头截取。
+    haystack 是用来定位命中的表达式，须与 content 逐字对应（如 JL_norm 中的简体正文）。
+    """
+    width = radius * 2 + len(keyword)
+    expression = f'''
+        length(content) AS content_length,
+        max(1, instr(lower({haystack}), lower(?)) - ?) AS snippet_start,
+        substr(content, max(1, instr(lower({haystack}), lower(?)) - ?), ?) AS snippet
+    '''
+    return expression, [keyword, radius, keyword, radius, width]
+
+
+def build_snippet(snippet, keyword, snippet_start, content_length, fold=None):
+    """计算片段内所有命中的高亮位置 [[起点, 长度], ...]（相对片段，按字符计）
+
+    fold 是查找前对片段做的逐字转换（不改变长度），须与定位命中时的 haystack 一致。
+    """
+    snippet = snippet or ''
+    highlights = []
+    if keyword:
+        haystack = ascii_lower(fold(snippet) if fold else snippet)
+        needle = ascii_lower(keyword)
+        index = haystack.find(needle)
+        while index != -1:
+            highlights.append([index, len(needle)])
+            index = haystack.find(needle, index + len(needle))
+    start = (snippet_start or 1) - 1
+    return {
+        'snippet': snippet,
+        'highlights': highlights,
+        'truncatedStart': start > 0,
+        'truncatedEnd': start + len(snippet) < (content_length or 0),
+    }
@@ -0,0 +1,27 @@
+import threading
+import time
+
+# Captured when the first backend module is imported, which main.py does before anything heavy.
+_STARTED_AT = time.perf_counter()
+_marks = []
+_lock = threading.Lock()
+
+
+def mark(name):
+    """Record that a startup phase finished, in milliseconds since process start."""
+    elapsed_ms = round((time.perf_counter() - _STARTED_AT) * 1000, 1)
+    with _lock:
+        _marks.append({"phase": name, "ms": elapsed_ms, "thread": threading.current_thread().name})
+    return elapsed_ms
+
+
+def get_report():
+    with _lock:
+        return {"phases": list(_marks)}
+
+
+def print_report():
+    report = get_report()
+    print("startup timing:")
+    for item in report["phases"]:
+        print(f"  {item['ms']:>8.1f} ms  {item['phase']} [{item['thread']}]")
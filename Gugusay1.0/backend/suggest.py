@@ -0,0 +1,190 @@
+# 搜索联想模块：内存中的前缀索引（有序词表 + 二分查找），首次使用时构建，记录写入时增量更新
+import bisect
+import heapq
+import re
+import threading
+from collections import Counter
+
+from backend.config import SUGGEST_MAX_TERMS
+
+# 拉丁字母/数字组成的词，以及连续的中日韩字符
+WORD_RE = re.compile(r'[0-9a-z][0-9a-z_\-\.]*[0-9a-z]|[\u3400-\u9fff\uf900-\ufaff]+')
+CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+# 中文没有分词，取 2~4 字的 n-gram 作为候选词
+NGRAM_SIZES = (2, 3, 4)
+MAX_WORD_LENGTH = 32
+# 构建索引时词表超过 max_terms 的这个倍数就先裁剪一次，峰值内存不随存档大小增长
+BUILD_SLACK = 2
+# 缓存结果的前缀数上限；命中范围大的前缀（如单个汉字）每次全范围排序较慢，结果缓存到下次写入
+TOP_CACHE_SIZE = 256
+# 字典序大于任何以前缀开头的词，用来二分出前缀范围的终点
+PREFIX_END = '\U0010ffff'
+
+
+def extract_terms(text):
+    """从一段文本中取出候选词集合（每条记录内去重，计数即包含该词的记录数）"""
+    terms = set()
+    if not text:
+        return terms
+    for token in WORD_RE.findall(text.lower()):
+        if CJK_RE.match(token):
+            for size in NGRAM_SIZES:
+                for start in range(len(token) - size + 1):
+                    terms.add(token[start:start + size])
+        elif len(token) <= MAX_WORD_LENGTH:
+            terms.add(token)
+    return terms
+
+
+class SuggestIndex:
+    """按前缀查找补全词及其命中条数
+
+    词表大小超过 max_terms 时淘汰命中最少的词，被淘汰的词之后再出现会从头计数，
+    因此命中条数是近似值（只用于排序和提示）。
+    """
+
+    def __init__(self, connect, max_terms=SUGGEST_MAX_TERMS, cache_threshold=5000):
+        self._connect = connect
+        self.max_terms = max_terms
+        self.cache_threshold = cache_threshold
+        self._lock = threading.Lock()
+        self._counts = Counter()     # 词 -> 包含该词的记录数
+        self._keys = []              # 有序词表，用于前缀二分查找
+        self._channels = Counter()   # 渠道 -> 记录数
+        self._top_cache = {}         # (前缀, 条数) -> 补全词，只缓存范围超过 cache_threshold 的前缀
+        self._built = False
+
+    def _build(self):
+        counts = Counter()
+        channels = Counter()
+        conn = self._connect()
+        try:
+            for content, channel in conn.execute('SELECT content, channel FROM JL'):
+                counts.update(extract_terms(content))
+                if channel:
+                    channels[channel] += 1
+                # 边扫描边裁剪：整个存档的 n-gram 一次性计数会有数百万个词
+                if len(counts) > self.max_terms * BUILD_SLACK:
+                    counts = self._most_common(counts)
+        finally:
+            conn.close()
+        self._counts = counts
+        self._channels = channels
+        self._prune()
+        self._keys = sorted(self._counts)
+        self._top_cache = {}
+        self._built = True
+
+    def _most_common(self, counts):
+        return Counter(dict(heapq.nlargest(self.max_terms, counts.items(), key=lambda item: item[1])))
+
+    def _prune(self):
+        # 超出上限 10% 后再裁剪，避免每次新增词都触发
+        if len(self._counts) <= self.max_terms * 1.1:
+            return False
+        self._counts = self._most_common(self._counts)
+        return True
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._build()
+
+    def apply_write(self, action, record_id, old, new):
+        """DatabaseManager 的写入监听：按新旧内容增量调整计数（索引尚未构建时忽略）"""
+        if not self._built:
+            return
+        with self._lock:
+            self._top_cache.clear()
+            removed = extract_terms(old.get('content')) if old else set()
+            added = extract_terms(new.get('content')) if new else set()
+            for term in removed - added:
+                count = self._counts.get(term, 0) - 1
+                if count > 0:
+                    self._counts[term] = count
+                elif term in self._counts:
+                    del self._counts[term]
+                    index = bisect.bisect_left(self._keys, term)
+                    if index < len(self._keys) and self._keys[index] == term:
+                        del self._keys[index]
+            for term in added - removed:
+                if term not in self._counts:
+                    bisect.insort(self._keys, term)
+                self._counts[term] += 1
+            old_channel = old.get('channel') if old else None
+            new_channel = new.get('channel') if new else None
+            if old_channel != new_channel:
+                if old_channel:
+                    self._channels[old_channel] -= 1
+                    if self._channels[old_channel] <= 0:
+                        del self._channels[old_channel]
+                if new_channel:
+                    self._channels[new_channel] += 1
+            if self._prune():
+                self._keys = sorted(self._counts)
+
+    def reset(self):
+        """丢弃索引（数据库被替换后调用），下次查询时重新构建"""
+        with self._lock:
+            self._counts = Counter()
+            self._keys = []
+            self._channels = Counter()
+            self._top_cache = {}
+            self._built = False
+
+    def _prefix_terms(self, prefix, limit):
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + PREFIX_END, start)
+        top = self._top_cache.get((prefix, limit))
+        if top is None:
+            counts = self._counts
+            top = heapq.nlargest(limit * 3, ((counts[term], term) for term in self._keys[start:end] if term != prefix))
+            if end - start > self.cache_threshold:
+                if len(self._top_cache) >= TOP_CACHE_SIZE:
+                    self._top_cache.clear()
+                self._top_cache[(prefix, limit)] = top
+        # n-gram 会产生“天天向”“天天向上”这类条数相同的截断词，只保留较长的那个
+        longer = {}
+        for count, term in top:
+            longer.setdefault(count, []).append(term)
+        return [
+            (count, term) for count, term in top
+            if not any(other != term and other.startswith(term) for other in longer[count])
+        ][:limit]
+
+    def suggest(self, query, limit=8, history=()):
+        """返回以 query 开头的补全：搜索历史优先，其次是渠道和内容中的词，按命中条数排序"""
+        prefix = (query or '').strip().lower()
+        if not prefix:
+            return []
+        self._ensure_built()
+        results = []
+        seen = set()
+
+        def add(text, count, kind):
+            if text.lower() not in seen and len(results) < limit:
+                seen.add(text.lower())
+                results.append({'text': text, 'count': count, 'kind': kind})
+
+        with self._lock:
+            for keyword in history:
+                if keyword.lower().startswith(prefix) and keyword.lower() != prefix:
+                    add(keyword, self._counts.get(keyword.lower()), 'history')
+            channels = heapq.nlargest(limit, (
+                (count, channel) for channel, count in self._channels.items()
+                if channel.lower().startswith(prefix)
+            ))
+            for count, channel in channels:
+                add(channel, count, 'channel')
+            for count, term in self._prefix_terms(prefix, limit):
+                add(term, count, 'term')
+        return results
+
+    def warm(self):
+        """提前构建索引（由后台调度器在空闲时调用）"""
+        self._ensure_built()
+        return self.stats()
+
+    def stats(self):
+        return {'built': self._built, 'terms': len(self._counts), 'channels': len(self._channels)}
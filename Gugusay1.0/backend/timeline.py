@@ -0,0 +1,201 @@
+# 时间线定位模块：利用 JL_count 按月计数表计算记录位置和分页，避免整表 COUNT(*) 与大 OFFSET
+# 时间线顺序统一为 datetime DESC, id DESC（可直接走 idx_jl_datetime 索引）
+
+RECORD_COLUMNS = ('id', 'datetime', 'content', 'channel', 'media_type', 'media_path')
+# 同一前缀下所有 datetime 文本都小于“前缀 + 最大码点”
+PREFIX_END = chr(0x10FFFF)
+
+
+def row_to_record(row):
+    return dict(zip(RECORD_COLUMNS, row))
+
+
+def month_key(datetime_val):
+    """记录所属的年月键（datetime 文本的前 7 个字符，与 JL_count 触发器一致）"""
+    return (datetime_val or '')[:7]
+
+
+def normalize_year_month(year_month):
+    """把 '2023-3'、'2023/03' 之类的输入统一成 '2023-03'"""
+    parts = str(year_month or '').replace('/', '-').split('-')
+    if len(parts) < 2 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    return f'{parts[0]}-{int(parts[1]):02d}'
+
+
+def month_counts(conn):
+    """按年月倒序返回 [(year_month, count), ...]，只读取计数表"""
+    return conn.execute('''
+        SELECT key, count FROM JL_count
+        WHERE dimension = 'month'
+        ORDER BY key DESC
+    ''').fetchall()
+
+
+def dimension_count(conn, dimension, key):
+    row = conn.execute(
+        'SELECT count FROM JL_count WHERE dimension = ? AND key = ?', (dimension, key)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def total_count(conn):
+    row = conn.execute("SELECT COALESCE(SUM(count), 0) FROM JL_count WHERE dimension = 'month'").fetchone()
+    return row[0]
+
+
+def timeline_position(conn, record_id, datetime_val):
+    """记录在整条时间线中的位置（从 1 开始）
+
+    更晚月份的条数直接从计数表求和，只在记录所在月份内做一次索引范围计数。
+    """
+    key = month_key(datetime_val)
+    later_months = conn.execute('''
+        SELECT COALESCE(SUM(count), 0) FROM JL_count
+        WHERE dimension = 'month' AND key > ?
+    ''', (key,)).fetchone()[0]
+    later_in_month = conn.execute(
+        'SELECT COUNT(*) FROM JL WHERE datetime > ? AND datetime < ?',
+        (datetime_val, key + PREFIX_END)
+    ).fetchone()[0]
+    same_time = conn.execute(
+        'SELECT COUNT(*) FROM JL WHERE datetime = ? AND id > ?', (datetime_val, record_id)
+    ).fetchone()[0]
+    return later_months + later_in_month + same_time + 1
+
+
+def timeline_page(conn, page, page_size):
+    """读取整条时间线的第 page 页
+
+    先用按月计数找到该页第一条所在的月份，再从该月开始做月内 OFFSET，
+    跳过的行数不超过一个月的记录数。
+    """
+    skip = (page - 1) * page_size
+    upper = None
+    for key, count in month_counts(conn):
+        if skip < count:
+            upper = key + PREFIX_END
+            break
+        skip -= count
+    if upper is None:
+        return []
+    rows = conn.execute('''
+        SELECT id, datetime, content, channel, media_type, media_path FROM JL
+        WHERE datetime < ?
+        ORDER BY datetime DESC, id DESC
+        LIMIT ? OFFSET ?
+    ''', (upper, page_size, skip)).fetchall()
+    return [row_to_record(row) for row in rows]
+
+
+def year_month_page(conn, year_month, page, page_size):
+    """读取某个月份内的第 page 页（datetime 范围查询，走 idx_jl_datetime）"""
+    rows = conn.execute('''
+        SELECT id, datetime, content, channel, media_type, media_path FROM JL
+        WHERE datetime >= ? AND datetime < ?
+        ORDER BY datetime DESC, id DESC
+        LIMIT ? OFFSET ?
+    ''', (year_month, year_month + PREFIX_END, page_size, (page - 1) * page_size)).fetchall()
+    return [row_to_record(row) for row in rows]
+
+
+def _channel_condition(channel):
+    if channel:
+        return 'channel = ?', [channel]
+    return "(channel IS NULL OR channel = '')", []
+
+
+def channel_page(conn, channel, page, page_size):
+    """读取某个渠道内的第 page 页（走 idx_jl_channel_datetime）"""
+    condition, params = _channel_condition(channel)
+    rows = conn.execute(f'''
+        SELECT id, datetime, content, channel, media_type, media_path FROM JL
+        WHERE {condition}
+        ORDER BY datetime DESC, id DESC
+        LIMIT ? OFFSET ?
+    ''', params + [page_size, (page - 1) * page_size]).fetchall()
+    return [row_to_record(row) for row in rows]
+
+
+def channel_edge(conn, channel, newest=True):
+    """渠道内最新（或最早）的一条记录的 (id, datetime)"""
+    condition, params = _channel_condition(channel)
+    order = 'DESC' if newest else 'ASC'
+    return conn.execute(f'''
+        SELECT id, datetime FROM JL
+        WHERE {condition}
+        ORDER BY datetime {order}, id {order}
+        LIMIT 1
+    ''', params).fetchone()
+
+
+def page_of(position, page_size):
+    return max(1, (position + page_size - 1) // page_size)
+
+
+def locate(conn, record_id=None, year_month=None, channel=None, page_size=6, anchor='newest'):
+    """一次计算目标的位置、所在页以及该页记录
+
+    - record_id：在整条时间线中定位该记录
+    - year_month / channel：在对应的筛选列表中定位最新（anchor='newest'）或最早（anchor='oldest'）的一条，
+      同时给出它在整条时间线中的位置 globalPosition
+    找不到目标时返回 None。
+    """
+    newest = anchor != 'oldest'
+    if record_id is not None:
+        row = conn.execute('SELECT datetime FROM JL WHERE id = ?', (record_id,)).fetchone()
+        if not row:
+            return None
+        position = timeline_position(conn, record_id, row[0])
+        total = total_count(conn)
+        page = page_of(position, page_size)
+        return {
+            'target': {'record': record_id},
+            'recordId': record_id,
+            'position': position,
+            'globalPosition': position,
+            'total': total,
+            'page': page,
+            'totalPages': page_of(total, page_size),
+            'pageSize': page_size,
+            'records': timeline_page(conn, page, page_size),
+        }
+
+    if year_month is not None:
+        key = normalize_year_month(year_month)
+        if key is None:
+            return None
+        total = dimension_count(conn, 'month', key)
+        later_months = conn.execute('''
+            SELECT COALESCE(SUM(count), 0) FROM JL_count
+            WHERE dimension = 'month' AND key > ?
+        ''', (key,)).fetchone()[0]
+        position = 1 if newest else total
+        global_position = later_months + position
+        page = page_of(position, page_size)
+        records = year_month_page(conn, key, page, page_size) if total else []
+        target = {'yearMonth': key}
+    else:
+        channel = channel or ''
+        total = dimension_count(conn, 'channel', channel)
+        edge = channel_edge(conn, channel, newest) if total else None
+        position = 1 if newest else total
+        global_position = timeline_position(conn, edge[0], edge[1]) if edge else 0
+        page = page_of(position, page_size)
+        records = channel_page(conn, channel, page, page_size) if total else []
+        target = {'channel': channel}
+
+    if not total:
+        return None
+    anchor_record = records[0] if newest else records[-1]
+    return {
+        'target': target,
+        'recordId': anchor_record['id'],
+        'position': position,
+        'globalPosition': global_position,
+        'total': total,
+        'page': page,
+        'totalPages': page_of(total, page_size),
+        'pageSize': page_size,
+        'records': records,
+    }
@@ -6,16 +6,21 @@ import re
 import shutil
 import subprocess
 import sys
+import threading
 import time
+import urllib.error
+import urllib.parse
 import urllib.request
 from pathlib import Path
 
-from backend.config import APP_ROOT, DATA_DIR, DB_PATH, MEDIA_DIR
+from backend.config import APP_ROOT, DATA_DIR, DB_PATH, MEDIA_DIR, UPDATE_CHECK_MAX_AGE
+from backend.scheduler import PRIORITY_NORMAL, scheduler
 
 CONFIG_PATH = Path(DATA_DIR) / "update_config.json"
 VERSION_PATH = Path(DATA_DIR) / "version.txt"
 TASK_PATH = Path(DATA_DIR) / "update_install_task.json"
 STAGING_ROOT = Path(DATA_DIR) / "update_staging"
+MANIFEST_CACHE_PATH = Path(DATA_DIR) / "update_manifest_cache.json"
 
 # Replace this with your real Ed25519 verify key (base64) before production use.
 PUBLIC_KEY_B64 = ""
@@ -25,10 +30,19 @@ REPO_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
 CHANNEL_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
 
 
+def _is_secure_url(url):
+    return urllib.parse.urlparse(url or "").scheme == "https"
+
+
 class UpdateManager:
     def __init__(self):
         self.config = self._load_config()
         self.manifest_info = None
+        self._lock = threading.Lock()
+        self._check_job = None
+        self._last_result = None
+        self._checked_at = None
+        self._manifest_cache = self._load_manifest_cache()
 
     def _load_config(self):
         default = {"owner": "your-org", "repo": "your-repo", "channel": "latest"}
@@ -57,6 +71,11 @@ class UpdateManager:
             return {"success": False, "error": "invalid channel"}
 
         self.config = {"owner": owner, "repo": repo, "channel": channel}
+        with self._lock:
+            # A different source makes the cached result and validators meaningless.
+            self.manifest_info = None
+            self._last_result = None
+            self._checked_at = None
         try:
             os.makedirs(DATA_DIR, exist_ok=True)
             with open(CONFIG_PATH, "w", encoding="utf-8") as f:
@@ -73,12 +92,55 @@ class UpdateManager:
             return f"https://github.com/{owner}/{repo}/releases/latest/download/version.json"
         return f"https://github.com/{owner}/{repo}/releases/download/{channel}/version.json"
 
+    def _load_manifest_cache(self):
+        if not MANIFEST_CACHE_PATH.exists():
+            return {}
+        try:
+            with open(MANIFEST_CACHE_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_manifest_cache(self, cache):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        temp_path = MANIFEST_CACHE_PATH.with_name(MANIFEST_CACHE_PATH.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temp_path, MANIFEST_CACHE_PATH)
+
     def _fetch_json(self, url):
-        if not url.startswith("https://"):
+        """Fetch the manifest with If-None-Match/If-Modified-Since; a 304 reuses the cached copy."""
+        if not _is_secure_url(url):
             raise ValueError("update source must use https")
-        req = urllib.request.Request(url, headers={"User-Agent": "Twitter-PyWebView-Updater/2.0"})
-        with urllib.request.urlopen(req, timeout=20) as response:
-            return json.loads(response.read().decode("utf-8"))
+        headers = {"User-Agent": "Twitter-PyWebView-Updater/2.0"}
+        cache = self._manifest_cache if self._manifest_cache.get("url") == url else {}
+        if cache.get("manifest") is not None:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+        req = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=20) as response:
+                manifest = json.loads(response.read().decode("utf-8"))
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not cache:
+                raise
+            return cache["manifest"], False
+        self._manifest_cache = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "manifest": manifest,
+        }
+        try:
+            self._save_manifest_cache(self._manifest_cache)
+        except Exception as e:
+            print(f"failed to save update manifest cache: {e}")
+        return manifest, True
 
     def _local_version(self):
         if VERSION_PATH.exists():
@@ -114,29 +176,60 @@ class UpdateManager:
         for asset in assets:
             if asset.get("kind") not in {"database", "media_pack", "media_file"}:
                 raise ValueError("invalid asset kind")
-            url = asset.get("url", "")
-            if not url.startswith("https://"):
+            if not _is_secure_url(asset.get("url")):
                 raise ValueError("asset url must use https")
             if not asset.get("sha256"):
                 raise ValueError("missing asset sha256")
 
-    def check_update(self):
+    def refresh(self, job=None):
+        """Fetch the manifest now (blocking) and remember the result; runs on the scheduler."""
         try:
-            manifest = self._fetch_json(self._manifest_url())
+            manifest, modified = self._fetch_json(self._manifest_url())
             self._validate_manifest(manifest)
-            self.manifest_info = manifest
             local_version = self._local_version()
             remote_version = manifest.get("version", "0.0.0")
-            return {
+            result = {
+                "success": True,
                 "has_update": remote_version != local_version,
                 "local_version": local_version,
                 "remote_version": remote_version,
                 "published_at": manifest.get("published_at", ""),
                 "notes": manifest.get("notes", ""),
                 "asset_count": len(manifest.get("assets", [])),
+                "not_modified": not modified,
             }
         except Exception as e:
-            return {"has_update": False, "error": str(e)}
+            manifest = None
+            result = {"success": False, "has_update": False, "error": str(e)}
+        with self._lock:
+            if manifest is not None:
+                self.manifest_info = manifest
+            self._last_result = result
+            self._checked_at = time.time()
+        return result
+
+    def _schedule_refresh(self):
+        # Caller holds self._lock; at most one check is queued or running at a time.
+        if self._check_job is not None and self._check_job.state in ("queued", "running"):
+            return
+        self._check_job = scheduler.submit("update check", self.refresh, priority=PRIORITY_NORMAL)
+
+    def check_update(self, refresh=False):
+        """Return the last known result immediately and refresh it in the background.
+
+        A refresh is queued when asked for or when the result is older than
+        UPDATE_CHECK_MAX_AGE; "checking" tells the caller to poll again.
+        """
+        with self._lock:
+            age = None if self._checked_at is None else time.time() - self._checked_at
+            if refresh or age is None or age > UPDATE_CHECK_MAX_AGE:
+                self._schedule_refresh()
+            checking = self._check_job is not None and self._check_job.state in ("queued", "running")
+            result = dict(self._last_result) if self._last_result else {"success": False, "has_update": False, "error": "update check in progress"}
+        result["checked_at"] = self._checked_at
+        result["age"] = None if age is None else round(age, 1)
+        result["checking"] = checking
+        return result
 
     def _download_file(self, url, target):
         req = urllib.request.Request(url, headers={"User-Agent": "Twitter-PyWebView-Updater/2.0"})
@@ -151,10 +244,35 @@ class UpdateManager:
                 h.update(chunk)
         return h.hexdigest()
 
+    def _apply_live(self, task):
+        """Install the staged update in this process, swapping the database without a restart."""
+        from backend import updater_client
+        from backend.database import db_manager
+
+        started = time.perf_counter()
+        updater_client.apply_update(task, replace_database=db_manager.swap_database)
+        try:
+            TASK_PATH.unlink()
+        except OSError:
+            pass
+        with self._lock:
+            # The local version changed, so the cached check result is stale.
+            self.manifest_info = None
+            self._last_result = None
+            self._checked_at = None
+        return {
+            "success": True,
+            "message": "update applied",
+            "should_exit": False,
+            "applied_live": True,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
     def start_update(self):
+        staging_dir = None
         try:
             if not self.manifest_info:
-                check = self.check_update()
+                check = self.refresh()
                 if check.get("error"):
                     return {"success": False, "error": check["error"]}
                 if not check.get("has_update"):
@@ -204,10 +322,20 @@ class UpdateManager:
             with open(TASK_PATH, "w", encoding="utf-8") as f:
                 json.dump(task, f, ensure_ascii=False, indent=2)
 
+            # Assets are data only, so they can normally be installed with the window still open.
+            if not manifest.get("requires_restart"):
+                try:
+                    return self._apply_live(task)
+                except Exception as e:
+                    print(f"live update failed, falling back to restart: {e}")
+
             cmd = [sys.executable, "--run-updater", str(TASK_PATH), str(os.getpid())]
             subprocess.Popen(cmd, cwd=APP_ROOT)
             return {"success": True, "message": "update downloaded, installer launched", "should_exit": True}
         except Exception as e:
+            # A failed or partial download never reaches the database; drop what was staged.
+            if staging_dir is not None:
+                shutil.rmtree(staging_dir, ignore_errors=True)
             return {"success": False, "error": str(e)}
 
 
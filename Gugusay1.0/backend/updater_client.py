@@ -1,6 +1,7 @@
 import json
 import os
 import shutil
+import sqlite3
 import subprocess
 import sys
 import time
@@ -65,7 +66,19 @@ def _extract_zip_safe(zip_path, target_dir):
                 shutil.copyfileobj(src, dst)
 
 
-def _apply_update(task):
+def _backup_database(db_path, backup):
+    # The SQLite backup API yields a consistent copy even if another process still has the file open.
+    src = sqlite3.connect(str(db_path))
+    dst = sqlite3.connect(str(backup))
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def apply_update(task, replace_database=None):
+    """Install staged assets. replace_database(src, backup) swaps the DB in a running app instead of copying it."""
     db_path = Path(task["db_path"])
     media_dir = Path(task["media_dir"])
     version_file = Path(task["version_file"])
@@ -75,13 +88,17 @@ def _apply_update(task):
     db_asset = next((a for a in task.get("assets", []) if a.get("kind") == "database"), None)
     if db_asset:
         src_db = Path(db_asset["path"])
-        if src_db.exists():
+        if src_db.exists() and replace_database:
+            result = replace_database(str(src_db), str(db_path) + ".backup")
+            if not result.get("success"):
+                raise RuntimeError(f"database swap failed: {result.get('error')}")
+        elif src_db.exists():
             db_path.parent.mkdir(parents=True, exist_ok=True)
             if db_path.exists():
                 backup = Path(str(db_path) + ".backup")
                 if backup.exists():
                     backup.unlink()
-                shutil.copy2(db_path, backup)
+                _backup_database(db_path, backup)
             temp_target = Path(str(db_path) + ".new")
             shutil.copy2(src_db, temp_target)
             os.replace(temp_target, db_path)
@@ -119,7 +136,7 @@ def run_task(task_path, parent_pid):
         task = json.load(f)
 
     _wait_parent_exit(parent_pid)
-    _apply_update(task)
+    apply_update(task)
     _restart_app(task)
 
     try:
@@ -1,26 +1,46 @@
 import atexit
+import multiprocessing
 import os
 import sys
 import ctypes
 from threading import Thread
 
-import webview
-
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from backend import startup
+
+# Process-pool workers of the frozen build re-run this executable; hand them over before anything else loads.
+multiprocessing.freeze_support()
+
 # Reuse the same executable for update worker mode.
 if len(sys.argv) > 1 and sys.argv[1] == "--run-updater":
     from backend.updater_client import main as updater_main
 
     raise SystemExit(updater_main())
 
+import webview
+
+from backend.bridge import DataApi
 from backend.config import WINDOW_HEIGHT, WINDOW_MIN_SIZE, WINDOW_TITLE, WINDOW_WIDTH
 from backend.database import db_manager
+from backend.scheduler import scheduler
 from backend.server import start_server
 
+startup.mark("imports done")
+
 window_ref = None
 
 
+def warm_up():
+    # Seed/migrate the database while the window is loading; requests arriving
+    # earlier simply wait for the same one-time initialization.
+    try:
+        db_manager.ensure_ready()
+    except Exception as exc:
+        print(f"database initialization failed: {exc}")
+    startup.print_report()
+
+
 def on_closing():
     if window_ref:
         try:
@@ -29,7 +49,9 @@ def on_closing():
             pass
 
 
-class Api:
+class Api(DataApi):
+    """js_api of the window: the read-only data calls of DataApi plus saving reading progress."""
+
     def save_progress(self, last_viewed_id, last_viewed_datetime):
         try:
             db_manager.update_reading_progress(last_viewed_id, last_viewed_datetime)
@@ -41,6 +63,7 @@ class Api:
 if __name__ == "__main__":
     server_thread = Thread(target=start_server, daemon=True)
     server_thread.start()
+    Thread(target=warm_up, name="db-warm-up", daemon=True).start()
 
     debug_mode = os.getenv("GUGUSAY_DEBUG", "0") == "1"
     # Architecture-level slim build: only support WebView2 (edgechromium).
@@ -55,7 +78,10 @@ if __name__ == "__main__":
         height=WINDOW_HEIGHT,
         min_size=WINDOW_MIN_SIZE,
     )
+    startup.mark("window created")
 
+    atexit.register(db_manager.flush_pending_writes)
+    atexit.register(scheduler.shutdown)
     atexit.register(on_closing)
     try:
         webview.start(debug=debug_mode, gui=preferred_gui)
@@ -71,3 +97,5 @@ if __name__ == "__main__":
             print(msg)
         raise
     on_closing()
+    scheduler.shutdown()
+    db_manager.flush_pending_writes()
@@ -4,8 +4,9 @@
  * 点击结果可跳转到对应页面
  */
 
-import { loadPage } from './pageLoader.js';
+import { loadPage } from './pageLoaderSimple.js';
 import { frontendCache } from './globalState.js';
+import { requestJSON, cancelRequest, isAbortError } from '../utils/api.js';
 
 // 侧边栏元素
 const sidebar = document.getElementById('advanced-search-sidebar');
@@ -24,6 +25,13 @@ let currentSearchPage = 1;
 let totalSearchResults = 0;
 // 当前搜索关键词
 let currentSearchKeyword = '';
+// 查询语言语法，例如 channel:微博 after:2014-01 before:2015-06 has:video -关键词
+const QUERY_SYNTAX_RE = /(^|\s)(-\S|(channel|ch|after|since|before|until|on|date|has|type):)/i;
+// 搜索联想：输入停顿后再请求，新的输入会取消尚未返回的请求
+const SUGGEST_DELAY = 150;
+let suggestTimer = null;
+let suggestionList = null;
+let activeSuggestion = -1;
 
 /**
  * 打开高级搜索侧边栏
@@ -40,6 +48,128 @@ export function closeAdvancedSearch() {
     sidebar.classList.add('hidden');
     searchInput.value = '';
     resultsList.innerHTML = '';
+    hideSuggestions();
+}
+
+/**
+ * 输入变化时延迟请求联想词
+ */
+function scheduleSuggestions() {
+    clearTimeout(suggestTimer);
+    const query = searchInput.value.trim();
+    if (!query) {
+        hideSuggestions();
+        return;
+    }
+    suggestTimer = setTimeout(() => fetchSuggestions(query), SUGGEST_DELAY);
+}
+
+/**
+ * 请求联想词（同一槽位的新请求会取消上一次未完成的请求）
+ * @param {string} query - 当前输入
+ */
+async function fetchSuggestions(query) {
+    try {
+        const data = await requestJSON(`/api/suggest?q=${encodeURIComponent(query)}`, { slot: 'suggest' });
+        // 请求返回时输入已经变化则丢弃
+        if (searchInput.value.trim() !== query) {
+            return;
+        }
+        renderSuggestions(data.suggestions || []);
+    } catch (error) {
+        if (!isAbortError(error)) {
+            console.error('获取搜索联想失败:', error);
+        }
+    }
+}
+
+/**
+ * 渲染联想列表
+ * @param {Array} suggestions - [{ text, count, kind }]
+ */
+function renderSuggestions(suggestions) {
+    if (!suggestionList) {
+        suggestionList = document.createElement('ul');
+        suggestionList.className = 'search-suggestions hidden';
+        suggestionList.setAttribute('role', 'listbox');
+        searchInput.parentElement.appendChild(suggestionList);
+        // mousedown 先于输入框失焦触发
+        suggestionList.addEventListener('mousedown', (e) => {
+            const item = e.target.closest('.search-suggestion-item');
+            if (item) {
+                e.preventDefault();
+                applySuggestion(item.dataset.text);
+            }
+        });
+    }
+    activeSuggestion = -1;
+    suggestionList.innerHTML = '';
+    if (suggestions.length === 0) {
+        hideSuggestions();
+        return;
+    }
+    const fragment = document.createDocumentFragment();
+    suggestions.forEach(suggestion => {
+        const item = document.createElement('li');
+        item.className = `search-suggestion-item suggestion-${suggestion.kind}`;
+        item.setAttribute('role', 'option');
+        item.dataset.text = suggestion.text;
+
+        const text = document.createElement('span');
+        text.className = 'suggestion-text';
+        text.textContent = suggestion.text;
+        item.appendChild(text);
+
+        if (suggestion.count) {
+            const count = document.createElement('span');
+            count.className = 'suggestion-count';
+            count.textContent = suggestion.count;
+            item.appendChild(count);
+        }
+        fragment.appendChild(item);
+    });
+    suggestionList.appendChild(fragment);
+    suggestionList.classList.remove('hidden');
+}
+
+/**
+ * 隐藏联想列表并取消待发的请求
+ */
+function hideSuggestions() {
+    clearTimeout(suggestTimer);
+    cancelRequest('suggest');
+    activeSuggestion = -1;
+    if (suggestionList) {
+        suggestionList.classList.add('hidden');
+    }
+}
+
+/**
+ * 选中联想词并立即搜索
+ * @param {string} text - 联想词
+ */
+function applySuggestion(text) {
+    searchInput.value = text;
+    hideSuggestions();
+    performAdvancedSearch(1);
+}
+
+/**
+ * 上下方向键在联想列表中移动
+ * @param {number} step - 1 或 -1
+ */
+function moveSuggestion(step) {
+    if (!suggestionList || suggestionList.classList.contains('hidden')) {
+        return;
+    }
+    const items = suggestionList.querySelectorAll('.search-suggestion-item');
+    if (items.length === 0) {
+        return;
+    }
+    activeSuggestion = (activeSuggestion + step + items.length) % items.length;
+    items.forEach((item, index) => {
+        item.classList.toggle('active', index === activeSuggestion);
+    });
 }
 
 /**
@@ -81,8 +211,13 @@ export async function performAdvancedSearch(page = 1) {
         // 直接渲染搜索结果（后端已计算页码）
         renderSearchResults(searchResult.records, searchResult.total, page);
     } catch (error) {
+        if (isAbortError(error)) {
+            // 已被更新的搜索或翻页取代
+            return;
+        }
         console.error('高级搜索失败:', error);
-        resultsList.innerHTML = '<div class="search-error">搜索失败，请重试</div>';
+        resultsList.innerHTML = '<div class="search-error"></div>';
+        resultsList.firstChild.textContent = error.message ? `搜索失败：${error.message}` : '搜索失败，请重试';
     }
 }
 
@@ -94,15 +229,18 @@ export async function performAdvancedSearch(page = 1) {
  */
 async function searchRecords(keyword, page) {
     // 检查缓存
-    const cacheKey = `search_${keyword}_page_${page}`;
+    const cacheKey = `search_snippet_${keyword}_page_${page}`;
     const cached = frontendCache.get(cacheKey);
     if (cached) {
         return cached;
     }
 
-    // 获取分页记录
-    const response = await fetch(`/api/search?keyword=${encodeURIComponent(keyword)}&page=${page}&pageSize=${SEARCH_PAGE_SIZE}`);
-    const data = await response.json();
+    // 获取分页记录（摘要模式：只返回命中附近的片段和高亮位置，打开结果时再加载完整记录）
+    // 含 channel:、after:、has: 或 -排除词 等语法时使用查询语言接口
+    const endpoint = QUERY_SYNTAX_RE.test(keyword)
+        ? `/api/query?q=${encodeURIComponent(keyword)}`
+        : `/api/search?keyword=${encodeURIComponent(keyword)}`;
+    const data = await requestJSON(`${endpoint}&page=${page}&pageSize=${SEARCH_PAGE_SIZE}&mode=snippet`, { slot: 'advanced-search' });
 
     if (!data.records) {
         return { records: [], total: 0 };
@@ -113,7 +251,7 @@ async function searchRecords(keyword, page) {
         total: data.total || 0
     };
 
-    // 缓存结果（5分钟）
+    // 缓存结果
     frontendCache.set(cacheKey, result);
 
     return result;
@@ -156,16 +294,14 @@ function renderSearchResults(results, totalResults, currentPage) {
             minute: '2-digit'
         });
 
-        // 处理内容显示（CSS已限制为2行）
-        const contentPreview = result.content || '（无内容）';
-
         resultItem.innerHTML = `
             <div class="result-header">
                 <span class="result-page">第 ${result.page} 页</span>
                 <span class="result-date">${formattedDate}</span>
             </div>
-            <div class="result-content">${contentPreview}</div>
         `;
+        // 处理内容显示（CSS已限制为2行）
+        resultItem.appendChild(renderSnippet(result));
 
         // 点击事件：跳转到对应页面
         resultItem.addEventListener('click', () => {
@@ -179,6 +315,42 @@ function renderSearchResults(results, totalResults, currentPage) {
     addPaginationControls(totalResults, currentPage);
 }
 
+/**
+ * 渲染搜索摘要，命中部分用 <mark> 高亮（文本节点拼接，不解析 HTML）
+ * @param {Object} result - 含 snippet、highlights、truncatedStart、truncatedEnd 的搜索结果
+ * @returns {HTMLElement} 摘要元素
+ */
+function renderSnippet(result) {
+    const content = document.createElement('div');
+    content.className = 'result-content';
+
+    const text = result.snippet !== undefined ? result.snippet : result.content;
+    if (!text) {
+        content.textContent = '（无内容）';
+        return content;
+    }
+
+    if (result.truncatedStart) {
+        content.appendChild(document.createTextNode('…'));
+    }
+    // 后端按字符（码点）计算位置，这里同样按码点切分，避免表情等字符造成偏移
+    const chars = Array.from(text);
+    let cursor = 0;
+    (result.highlights || []).forEach(([start, length]) => {
+        if (start < cursor) return;
+        content.appendChild(document.createTextNode(chars.slice(cursor, start).join('')));
+        const mark = document.createElement('mark');
+        mark.textContent = chars.slice(start, start + length).join('');
+        content.appendChild(mark);
+        cursor = start + length;
+    });
+    content.appendChild(document.createTextNode(chars.slice(cursor).join('')));
+    if (result.truncatedEnd) {
+        content.appendChild(document.createTextNode('…'));
+    }
+    return content;
+}
+
 /**
  * 截取内容（最多指定行数）
  * @param {string} content - 原始内容
@@ -317,13 +489,29 @@ export function initAdvancedSearch() {
     // 搜索按钮点击事件
     searchBtn.addEventListener('click', () => performAdvancedSearch(1));
 
-    // 搜索输入框回车事件
+    // 搜索输入框回车事件（选中了联想词时使用联想词）
     searchInput.addEventListener('keypress', (e) => {
         if (e.key === 'Enter') {
+            const active = suggestionList && suggestionList.querySelector('.search-suggestion-item.active');
+            if (active) {
+                applySuggestion(active.dataset.text);
+                return;
+            }
+            hideSuggestions();
             performAdvancedSearch(1);
         }
     });
 
+    // 输入时显示搜索联想
+    searchInput.addEventListener('input', scheduleSuggestions);
+    searchInput.addEventListener('keydown', (e) => {
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            moveSuggestion(e.key === 'ArrowDown' ? 1 : -1);
+        }
+    });
+    searchInput.addEventListener('blur', hideSuggestions);
+
     // 关闭按钮点击事件
     closeBtn.addEventListener('click', closeAdvancedSearch);
 
@@ -334,9 +522,13 @@ export function initAdvancedSearch() {
         }
     });
 
-    // ESC键关闭侧边栏
+    // ESC键先收起联想列表，再关闭侧边栏
     document.addEventListener('keydown', (e) => {
         if (e.key === 'Escape' && !sidebar.classList.contains('hidden')) {
+            if (suggestionList && !suggestionList.classList.contains('hidden')) {
+                hideSuggestions();
+                return;
+            }
             closeAdvancedSearch();
         }
     });
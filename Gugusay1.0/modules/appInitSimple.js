@@ -6,6 +6,8 @@ import { initTheme } from './themeManager.js';
 import { bindEventListeners } from './eventHandlersSimple.js';
 import { loadNavigationTree } from './yearMonthTree.js';
 import { updatePaginationInfo, renderTweets } from './tweetRendererSimple.js';
+import { initChangeFeed } from './changeFeed.js';
+import { requestJSON } from '../utils/api.js';
 
 function appendDebug(message) {
     void message;
@@ -15,8 +17,7 @@ function appendDebug(message) {
 export async function getTotalRecordsCount() {
     try {
         appendDebug('getTotalRecordsCount start');
-        const response = await fetch(`/api/total-count?pageSize=${globalState.pageSize}`);
-        const data = await response.json();
+        const data = await requestJSON(`/api/total-count?pageSize=${globalState.pageSize}`);
         globalState.totalRecords = data.count;
         globalState.totalPages = data.totalPages || Math.ceil(globalState.totalRecords / globalState.pageSize);
         console.log(`鎬昏褰曟暟: ${globalState.totalRecords}, 鎬婚〉鏁? ${globalState.totalPages}`);
@@ -49,8 +50,7 @@ export async function loadLatestRecordPage() {
             await getTotalRecordsCount();
         }
         
-        const response = await fetch(`/api/latest-page?pageSize=${globalState.pageSize}`);
-        const pageData = await response.json();
+        const pageData = await requestJSON(`/api/latest-page?pageSize=${globalState.pageSize}`);
         
         console.log('API杩斿洖鐨勬渶鏂伴〉闈㈡暟鎹?', pageData);
         
@@ -91,6 +91,9 @@ export async function initApp() {
         appendDebug(`initApp error: ${error.message}`);
     }
 
+    // 订阅服务器推送的变更，页面缓存随之修补而不是定时过期
+    initChangeFeed();
+
     if ('requestIdleCallback' in window) {
         requestIdleCallback(() => {
             loadNavigationTree();
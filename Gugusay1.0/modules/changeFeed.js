@@ -0,0 +1,113 @@
+// 变更推送模块：订阅 /api/events，按服务器推送的增量修补页面缓存、当前页面和计数
+import { globalState, frontendCache } from './globalState.js';
+import { loadPage } from './pageLoaderSimple.js';
+import { updatePaginationInfo, hasRecord } from './tweetRendererSimple.js';
+
+const listeners = new Set();
+let source = null;
+
+/**
+ * 订阅变更：listener 收到 /api/changes 格式的结果（changes、counts），数据库被整体替换时收到 { reset: true }
+ */
+export function onChanges(listener) {
+    listeners.add(listener);
+    return () => listeners.delete(listener);
+}
+
+function notify(result) {
+    listeners.forEach((listener) => {
+        try {
+            listener(result);
+        } catch (error) {
+            console.error('处理变更失败:', error);
+        }
+    });
+}
+
+/**
+ * 在缓存页中原地替换被修改的记录；新增、删除或时间/渠道变化会改变分页，返回 true 表示缓存需整体作废
+ */
+function patchCachedPages(changes) {
+    if (changes.some((change) => change.action !== 'update')) {
+        return true;
+    }
+    const updated = new Map(changes.map((change) => [change.id, change.record]));
+    let moved = false;
+    frontendCache.data.forEach((item, key) => {
+        const records = item.value && item.value.records;
+        if (!Array.isArray(records)) return;
+        records.forEach((record, index) => {
+            const fresh = updated.get(record.id);
+            if (!fresh) return;
+            if ('snippet' in record) {
+                // 搜索摘要无法在前端重算，丢弃该缓存页
+                frontendCache.data.delete(key);
+                return;
+            }
+            if (fresh.datetime !== record.datetime || fresh.channel !== record.channel) {
+                moved = true;
+            }
+            records[index] = { ...record, ...fresh, page: record.page };
+        });
+    });
+    return moved;
+}
+
+function applyChanges(result) {
+    const changes = result.changes || [];
+    const structural = patchCachedPages(changes);
+    if (structural) {
+        frontendCache.clear();
+    }
+
+    const counts = result.counts || {};
+    const unfiltered = !globalState.currentSearch && globalState.currentChannel === null && globalState.currentYearMonth === null;
+    if (unfiltered && counts.total !== undefined) {
+        globalState.totalRecords = counts.total;
+        globalState.totalPages = Math.max(1, Math.ceil(counts.total / globalState.pageSize));
+        updatePaginationInfo();
+    }
+
+    // 只有当前页受影响时才重新渲染：页面上的记录被修改/删除，或在最新一页时有新记录
+    const touchesPage = changes.some((change) => hasRecord(change.id))
+        || (unfiltered && globalState.currentPage === 1 && changes.some((change) => change.action === 'insert'));
+    if (touchesPage) {
+        const scrollY = window.scrollY;
+        loadPage(globalState.currentPage);
+        window.scrollTo(0, scrollY);
+    }
+    notify(result);
+}
+
+function resetAll() {
+    frontendCache.clear();
+    loadPage(globalState.currentPage);
+    notify({ reset: true });
+}
+
+/**
+ * 建立事件流；浏览器断线后会带着 Last-Event-ID 自动重连，服务器从断点继续推送
+ */
+export function initChangeFeed() {
+    if (source || typeof EventSource === 'undefined') return;
+    source = new EventSource('/api/events');
+    source.addEventListener('open', () => {
+        // 有推送时缓存只会因变更失效，可以直接使用
+        frontendCache.live = true;
+    });
+    source.addEventListener('error', () => {
+        // 断线期间的变更收不到，改为每次向服务器验证 ETag
+        frontendCache.live = false;
+    });
+    source.addEventListener('changes', (event) => {
+        applyChanges(JSON.parse(event.data));
+    });
+    source.addEventListener('reset', () => {
+        resetAll();
+    });
+}
+
+export default {
+    initChangeFeed,
+    onChanges
+};
@@ -1,4 +1,5 @@
 // 右键菜单和复制功能模块
+import { showRelatedRecords } from './relatedPosts.js';
 
 // 显示自定义右键菜单
 export function showCustomContextMenu(event, tweetElement) {
@@ -12,6 +13,7 @@ export function showCustomContextMenu(event, tweetElement) {
     contextMenu.innerHTML = `
         <div class="context-menu-item" data-action="copy">复制推文内容</div>
         <div class="context-menu-item" data-action="copyWithDate">复制推文内容和时间</div>
+        <div class="context-menu-item" data-action="related">查看相关推文</div>
     `;
     
     // 设置菜单位置
@@ -71,6 +73,14 @@ function executeContextMenuAction(action, tweetElement) {
             
             textToCopy = `${timeText}${channelText}\n${contentText}`;
             break;
+
+        case 'related':
+            showRelatedRecords(tweetElement.dataset.id).then(message => {
+                if (message) {
+                    showNotification(message);
+                }
+            });
+            break;
     }
     
     // 执行复制操作
@@ -31,8 +31,10 @@ export function openEditModal(id) {
                     
                     // 显示当前图片预览
                     if (record.media_path) {
-                        // 如果有多个图片，media_path 可能包含多个路径，用逗号分隔
-                        const paths = record.media_path.split(',').filter(path => path.trim());
+                        // 优先使用服务器返回的结构化 media 数组
+                        const paths = Array.isArray(record.media)
+                            ? record.media.map(item => item.path)
+                            : record.media_path.split(',').filter(path => path.trim());
                         if (paths.length > 0) {
                             let imagesHtml = '<div style="margin-top: 10px;"><p>当前图片:</p>';
                             paths.forEach(path => {
@@ -51,31 +51,30 @@ if (typeof window !== 'undefined') {
     });
 }
 
-// 前端缓存
+// 前端页面缓存：按条目数限制的 LRU（Map 按插入顺序，命中时移到末尾）
+// 变更推送连接时直接使用；推送断开时只返回刚写入的条目（如定位时顺带取回的页），
+// 其余返回 null，由 utils/api.js 用 ETag 向服务器重新验证
 export const frontendCache = {
     data: new Map(),
-    ttl: 5 * 60 * 1000, // 5分钟缓存时间
+    maxEntries: 50,
+    freshMs: 2000,
+    live: false, // 由 changeFeed.js 在事件流连接/断开时设置
     
     set: function(key, value) {
-        const item = {
-            value: value,
-            timestamp: Date.now()
-        };
-        this.data.set(key, item);
+        this.data.delete(key);
+        this.data.set(key, { value: value, timestamp: Date.now() });
+        while (this.data.size > this.maxEntries) {
+            this.data.delete(this.data.keys().next().value);
+        }
     },
     
     get: function(key) {
         const item = this.data.get(key);
-        if (!item) {
+        if (!item || (!this.live && Date.now() - item.timestamp > this.freshMs)) {
             return null;
         }
-        
-        // 检查是否过期
-        if (Date.now() - item.timestamp > this.ttl) {
-            this.data.delete(key);
-            return null;
-        }
-        
+        this.data.delete(key);
+        this.data.set(key, item);
         return item.value;
     },
     
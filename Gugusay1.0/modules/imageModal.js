@@ -7,7 +7,8 @@ export function openImageModal(imgElement) {
     const captionText = document.getElementById('image-modal-caption');
     
     modal.style.display = 'block';
-    modalImg.src = imgElement.src;
+    // 懒加载的图片在进入视口前只有 data-src
+    modalImg.src = imgElement.src || imgElement.dataset.src;
     
     const imageIndex = parseInt(imgElement.dataset.imageIndex) + 1;
     const imageCount = parseInt(imgElement.dataset.imageCount);
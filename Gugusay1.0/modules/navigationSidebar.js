@@ -1,6 +1,8 @@
 ﻿import { loadPage } from './pageLoaderSimple.js';
 import { globalState } from './globalState.js';
 import { changeFontSize, changeTheme } from './themeManager.js';
+import { onChanges } from './changeFeed.js';
+import { requestJSON } from '../utils/api.js';
 
 const sidebar = document.getElementById('navigation-sidebar');
 const closeBtn = document.getElementById('navigation-close');
@@ -35,6 +37,17 @@ function updateHeaders() {
     };
 }
 
+async function fetchUpdateCheck() {
+    let response = await fetch('/api/update/check?refresh=1', { headers: { ...updateHeaders() } });
+    let data = await response.json();
+    for (let attempt = 0; data.checking && attempt < 60; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 500));
+        response = await fetch('/api/update/check', { headers: { ...updateHeaders() } });
+        data = await response.json();
+    }
+    return data;
+}
+
 export function openNavigationSidebar() {
     if (!sidebar) return;
     sidebar.classList.remove('hidden');
@@ -51,13 +64,14 @@ export function closeNavigationSidebar() {
 
 async function loadNavigationData() {
     try {
-        const [yearMonthsResponse, channelsResponse] = await Promise.all([
-            fetch('/api/year-months'),
-            fetch('/api/channels')
+        // 与时光机树共用同一请求和 ETag 缓存
+        const [yearMonths, channels] = await Promise.all([
+            requestJSON('/api/year-months'),
+            requestJSON('/api/channels')
         ]);
 
-        yearMonthData = (await yearMonthsResponse.json()).yearMonths || [];
-        channelData = (await channelsResponse.json()).channels || [];
+        yearMonthData = yearMonths.yearMonths || [];
+        channelData = channels.channels || [];
 
         loadFavorites();
         renderNavigationContent();
@@ -535,6 +549,44 @@ export function initNavigationSidebar() {
             closeNavigationSidebar();
         }
     });
+
+    onChanges(applyCountChanges);
+}
+
+// 按推送的计数修补时间线和频道的条数；出现新的月份/频道或某项归零时重新加载
+function applyCountChanges(result) {
+    if (!isNavigationLoaded) return;
+    if (result.reset) {
+        loadNavigationData();
+        return;
+    }
+    const counts = result.counts || {};
+    let rebuild = false;
+    Object.entries(counts.month || {}).forEach(([key, count]) => {
+        const [year, month] = key.split('-');
+        const item = yearMonthData.find((entry) => entry.year === year && entry.month === month);
+        if (!item || !count) {
+            rebuild = true;
+            return;
+        }
+        item.count = count;
+        const stats = sidebar.querySelector(`.timeline-item[data-year="${year}"][data-month="${month}"] .timeline-stats`);
+        if (stats) stats.textContent = `${count} 条`;
+    });
+    Object.entries(counts.channel || {}).forEach(([channel, count]) => {
+        if (!channel) return;
+        const item = channelData.find((entry) => entry.channel === channel);
+        if (!item || !count) {
+            rebuild = true;
+            return;
+        }
+        item.count = count;
+        const label = sidebar.querySelector(`.channel-tag[data-channel="${CSS.escape(channel)}"] .channel-count`);
+        if (label) label.textContent = `(${count})`;
+    });
+    if (rebuild) {
+        loadNavigationData();
+    }
 }
 
 async function checkUpdateNav() {
@@ -547,8 +599,7 @@ async function checkUpdateNav() {
     checkBtn.textContent = '检查中...';
 
     try {
-        const response = await fetch('/api/update/check', { headers: { ...updateHeaders() } });
-        const data = await response.json();
+        const data = await fetchUpdateCheck();
 
         if (data.success && data.has_update) {
             infoDiv.innerHTML = `
@@ -602,6 +653,12 @@ async function startUpdateNav() {
         progressFill.style.width = '100%';
         progressText.textContent = result.message || '下载完成';
 
+        if (result.applied_live) {
+            progressText.textContent = '更新已完成，正在刷新...';
+            setTimeout(() => window.location.reload(), 800);
+            return;
+        }
+
         const restartConfirm = confirm(
             '更新包已下载完成。\n\n' +
             '下次启动将自动应用更新。\n\n' +
@@ -1,9 +1,10 @@
 // 页面加载模块 - 简化版本
 import { globalState, frontendCache } from './globalState.js';
-import { renderTweets, updatePaginationInfo, hideLoadingIndicator, showLoadingIndicator } from './tweetRendererSimple.js';
+import { renderTweets, updatePaginationInfo, hideLoadingIndicator, showLoadingIndicator, scrollToRecord } from './tweetRendererSimple.js';
 import { applyFontSize } from './themeManager.js';
 import { clearFrontendCache } from './globalState.js';
 import { getTotalRecordsCount } from './appInitSimple.js';
+import { requestJSON, isAbortError } from '../utils/api.js';
 
 // 加载指定页面的数据
 export function loadPage(page, targetRecordId = null) {
@@ -95,9 +96,8 @@ export function loadPage(page, targetRecordId = null) {
     
     console.log(`加载页面: ${globalState.currentPage}, 渠道: ${globalState.currentChannel}, 年月: ${globalState.currentYearMonth}, 搜索: ${globalState.currentSearch}, URL: ${url}`);
     
-    // 发送请求
-    fetch(url)
-        .then(response => response.json())
+    // 发送请求（快速翻页时只保留最后一页的请求，相同请求合并）
+    requestJSON(url, { slot: 'page' })
         .then(data => {
             console.log('API响应数据:', data);
             
@@ -144,24 +144,13 @@ export function loadPage(page, targetRecordId = null) {
             // 隐藏加载指示器
             hideLoadingIndicator();
             
-            // 如果指定了目标记录ID，滚动到该记录
+            // 如果指定了目标记录ID，滚动到该记录并高亮（推文是虚拟渲染的，不一定已在 DOM 中）
             if (targetRecordId) {
                 setTimeout(() => {
-                    const targetElement = document.querySelector(`[data-id="${targetRecordId}"]`);
-                    if (targetElement) {
-                        targetElement.scrollIntoView({
-                            behavior: 'smooth',
-                            block: 'center'
-                        });
-                        // 高亮显示目标记录
-                        targetElement.classList.add('highlighted-record');
-                        setTimeout(() => {
-                            targetElement.classList.remove('highlighted-record');
-                        }, 3000);
-                    } else {
+                    if (!scrollToRecord(targetRecordId)) {
                         console.warn(`未找到ID为 ${targetRecordId} 的记录`);
                     }
-                }, 500); // 增加延迟时间，确保DOM完全渲染
+                }, 100);
             }
             
             // 更新window对象上的变量
@@ -172,6 +161,10 @@ export function loadPage(page, targetRecordId = null) {
             }
         })
         .catch(error => {
+            if (isAbortError(error)) {
+                // 已被更新的翻页取代，由新的请求负责渲染
+                return;
+            }
             console.error('加载数据失败:', error);
             // 隐藏加载指示器
             hideLoadingIndicator();
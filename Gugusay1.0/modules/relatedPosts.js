@@ -0,0 +1,44 @@
+// 相关推文模块：用服务器的 TF-IDF 索引列出与某条推文内容相近的推文
+import { globalState } from './globalState.js';
+import { renderTweets, updatePaginationInfo, showLoadingIndicator, hideLoadingIndicator } from './tweetRendererSimple.js';
+import { applyFontSize } from './themeManager.js';
+import { requestJSON, isAbortError } from '../utils/api.js';
+
+const RELATED_LIMIT = 20;
+
+/**
+ * 显示与某条推文相关的推文（按相似度排序，单页）
+ * @param {string|number} recordId - 推文 ID
+ * @returns {Promise<string|null>} 需要提示给用户的消息，没有时为 null
+ */
+export function showRelatedRecords(recordId) {
+    showLoadingIndicator();
+    return requestJSON(`/api/related/${encodeURIComponent(recordId)}?limit=${RELATED_LIMIT}`, { slot: 'page' })
+        .then(data => {
+            if (data.building) {
+                // 索引建好之前保留当前时间线
+                hideLoadingIndicator();
+                return '相关推文索引正在建立，请稍后再试';
+            }
+            globalState.currentSearch = '';
+            globalState.currentYearMonth = null;
+            globalState.currentChannel = null;
+            globalState.currentPage = 1;
+            globalState.totalRecords = data.records.length;
+            globalState.totalPages = 1;
+            renderTweets(data.records);
+            updatePaginationInfo();
+            applyFontSize();
+            return data.records.length ? null : '没有找到相关推文';
+        })
+        .catch(error => {
+            if (isAbortError(error)) return null;
+            console.error('加载相关推文失败:', error);
+            hideLoadingIndicator();
+            return '加载相关推文失败';
+        });
+}
+
+export default {
+    showRelatedRecords
+};
@@ -1,8 +1,9 @@
 // 搜索功能模块
 import { globalState } from './globalState.js';
-import { loadPage } from './pageLoader.js';
-import { renderTweets, updatePaginationInfo, hideLoadingIndicator } from './tweetRenderer.js';
+import { loadPage } from './pageLoaderSimple.js';
+import { renderTweets, updatePaginationInfo, hideLoadingIndicator } from './tweetRendererSimple.js';
 import { applyFontSize } from './themeManager.js';
+import { requestJSON, isAbortError } from '../utils/api.js';
 
 // 执行搜索
 export async function performSearch() {
@@ -83,8 +84,7 @@ export function searchOnThisDay(keyword) {
     globalState.currentPage = 1;
     
     const url = `/api/on-this-day?keyword=${encodeURIComponent(keyword)}&page=${globalState.currentPage}&pageSize=${globalState.pageSize}`;
-    fetch(url)
-        .then(response => response.json())
+    requestJSON(url, { slot: 'page' })
         .then(data => {
             // 确保 records 数组存在
             const records = data.records || (data.results && data.results.records) || [];
@@ -100,6 +100,7 @@ export function searchOnThisDay(keyword) {
             applyFontSize();
         })
         .catch(error => {
+            if (isAbortError(error)) return;
             console.error('加载数据失败:', error);
             hideLoadingIndicator();
         });
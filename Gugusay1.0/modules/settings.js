@@ -24,6 +24,17 @@ function updateHeaders() {
     };
 }
 
+async function fetchUpdateCheck() {
+    let response = await fetch('/api/update/check?refresh=1', { headers: { ...updateHeaders() } });
+    let data = await response.json();
+    for (let attempt = 0; data.checking && attempt < 60; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 500));
+        response = await fetch('/api/update/check', { headers: { ...updateHeaders() } });
+        data = await response.json();
+    }
+    return data;
+}
+
 export function showSettingsPanel() {
     closeSettingsPanel();
     const modal = document.createElement('div');
@@ -168,8 +179,7 @@ async function checkUpdate() {
     checkBtn.disabled = true;
     checkBtn.textContent = '检查中...';
     try {
-        const response = await fetch('/api/update/check', { headers: { ...updateHeaders() } });
-        const data = await response.json();
+        const data = await fetchUpdateCheck();
         if (data.error) {
             infoDiv.innerHTML = `<p style="color:#e02020;margin:5px 0;font-size:14px;">检查更新失败: ${data.error}</p>`;
         } else if (data.has_update) {
@@ -212,8 +222,13 @@ async function startUpdate() {
             throw new Error(result.error || result.message || '更新失败');
         }
         progressFill.style.width = '100%';
-        progressText.textContent = '更新器已启动，应用将退出并重启';
-        setTimeout(() => window.close(), 800);
+        if (result.should_exit) {
+            progressText.textContent = '更新器已启动，应用将退出并重启';
+            setTimeout(() => window.close(), 800);
+        } else {
+            progressText.textContent = '更新已完成，正在刷新...';
+            setTimeout(() => window.location.reload(), 800);
+        }
     } catch (error) {
         progressText.textContent = '更新失败: ' + error.message;
         progressFill.style.backgroundColor = '#e02020';
@@ -1,4 +1,8 @@
 // 统计功能模块
+import { requestJSON, isAbortError } from '../utils/api.js';
+
+const WEEKDAY_LABELS = ['周一', '周二', '周三', '周四', '周五', '周六', '周日'];
+const DAY_MS = 24 * 60 * 60 * 1000;
 
 /**
  * 显示统计弹窗
@@ -8,6 +12,13 @@ export function showStatsModal() {
     if (modal) {
         modal.classList.remove('hidden');
         loadCombinedStats();
+
+        const select = document.getElementById('stats-granularity');
+        if (select) {
+            select.removeEventListener('change', handleGranularityChange);
+            select.addEventListener('change', handleGranularityChange);
+            loadTimeseries(select.value);
+        }
         
         // 添加关闭事件监听器
         const closeBtn = modal.querySelector('.close');
@@ -58,6 +69,86 @@ function loadCombinedStats() {
         });
 }
 
+/**
+ * 切换分布统计的时间粒度
+ */
+function handleGranularityChange(e) {
+    loadTimeseries(e.target.value);
+}
+
+/**
+ * 加载分布统计（服务器用列式快照聚合，切换粒度时取消上一次请求）
+ */
+function loadTimeseries(granularity) {
+    requestJSON(`/api/stats/timeseries?granularity=${encodeURIComponent(granularity)}`, { slot: 'stats' })
+        .then(data => {
+            renderTimeseries(data);
+        })
+        .catch(error => {
+            if (!isAbortError(error)) {
+                console.error('加载分布统计失败:', error);
+            }
+        });
+}
+
+function bucketLabel(granularity, key) {
+    if (granularity === 'weekday') return WEEKDAY_LABELS[key];
+    if (granularity === 'hour') return `${key}时`;
+    return key;
+}
+
+/**
+ * 渲染分布统计：日粒度为最近一年的日历热力图，其他粒度为柱状图
+ */
+function renderTimeseries(data) {
+    const chart = document.getElementById('stats-chart');
+    if (!chart) return;
+
+    chart.replaceChildren();
+    chart.dataset.granularity = data.granularity;
+    if (data.granularity === 'day') {
+        renderHeatmap(chart, data.buckets);
+        return;
+    }
+
+    const max = Math.max(1, ...data.buckets.map(bucket => bucket.count));
+    data.buckets.forEach(bucket => {
+        const bar = document.createElement('div');
+        bar.className = 'stats-bar';
+        bar.style.height = `${bucket.count / max * 100}%`;
+        bar.title = `${bucketLabel(data.granularity, bucket.key)}：${bucket.count} 条，${bucket.char_count} 字`;
+        chart.appendChild(bar);
+    });
+}
+
+function renderHeatmap(chart, buckets) {
+    if (!buckets.length) return;
+
+    const byDay = new Map(buckets.map(bucket => [bucket.key, bucket]));
+    const end = Date.parse(`${buckets[buckets.length - 1].key}T00:00:00Z`);
+    let start = end - 364 * DAY_MS;
+    // 每列一周，从周一开始
+    start -= ((new Date(start).getUTCDay() + 6) % 7) * DAY_MS;
+
+    const days = [];
+    for (let time = start; time <= end; time += DAY_MS) {
+        const key = new Date(time).toISOString().slice(0, 10);
+        days.push({ key, count: byDay.has(key) ? byDay.get(key).count : 0 });
+    }
+    const max = Math.max(1, ...days.map(day => day.count));
+
+    const grid = document.createElement('div');
+    grid.className = 'stats-heatmap';
+    days.forEach(day => {
+        const cell = document.createElement('div');
+        cell.className = 'stats-heat-cell';
+        cell.dataset.level = day.count ? Math.ceil(day.count / max * 4) : 0;
+        cell.title = `${day.key}：${day.count} 条`;
+        grid.appendChild(cell);
+    });
+    chart.appendChild(grid);
+}
+
 /**
  * 渲染综合统计
  */
@@ -153,45 +153,53 @@ function escapeHtml(text) {
 
 // 创建媒体内容
 function createMediaContent(record) {
-    if ((record.media_type !== 'image' && record.media_type !== 'video') || !record.media_path) {
+    const mediaItems = getMediaItems(record);
+    if ((record.media_type !== 'image' && record.media_type !== 'video') || mediaItems.length === 0) {
         return '';
     }
     
-    // 支持多个媒体文件
-    const paths = record.media_path.split(',');
-    // 根据图片数量确定使用的CSS类
+    // 根据媒体数量确定使用的CSS类
     let containerClass = 'media-container';
-    if (paths.length === 1) {
+    if (mediaItems.length === 1) {
         containerClass += ' single-image';
-    } else if (paths.length === 2) {
+    } else if (mediaItems.length === 2) {
         containerClass += ' two-images';
     }
     
     let mediaHtml = `<div class="tweet-media" role="region" aria-label="媒体内容"><div class="${containerClass}">`;
-    paths.forEach((path, index) => {
-        if (path.trim()) {
-            const fullPath = path.trim();
-            // 确保路径是相对于网站根目录的
-            const normalizedPath = fullPath.startsWith('/') ? fullPath : '/' + fullPath;
-            const fileExtension = fullPath.split('.').pop().toLowerCase();
-            
-            // 判断是否为视频文件
-            const videoExtensions = ['mp4', 'webm', 'ogg'];
-            if (videoExtensions.includes(fileExtension)) {
-                // 视频播放器
-                mediaHtml += `<div class="media-item"><video src="${normalizedPath}" controls class="tweet-video" aria-label="推文视频"></video></div>`;
-            } else {
-                // 图片显示
-                const currentPath = path.trim();
-                const currentNormalizedPath = currentPath.startsWith('/') ? currentPath : '/' + currentPath;
-                mediaHtml += `<div class="media-item"><img src="${currentNormalizedPath}" class="tweet-image" data-tweet-id="${record.id}" data-image-index="${index}" data-image-count="${paths.length}" loading="lazy" decoding="async" alt="推文图片" /></div>`;
-            }
+    mediaItems.forEach((item, index) => {
+        // 确保路径是相对于网站根目录的
+        const normalizedPath = item.path.startsWith('/') ? item.path : '/' + item.path;
+        // 服务器已知尺寸时预留布局空间，避免图片加载后页面跳动
+        const sizeAttrs = item.width && item.height ? ` width="${item.width}" height="${item.height}"` : '';
+        if (item.kind === 'video') {
+            mediaHtml += `<div class="media-item"><video src="${normalizedPath}"${sizeAttrs} controls preload="metadata" class="tweet-video" aria-label="推文视频"></video></div>`;
+        } else {
+            mediaHtml += `<div class="media-item"><img src="${normalizedPath}"${sizeAttrs} class="tweet-image" data-tweet-id="${record.id}" data-image-index="${index}" data-image-count="${mediaItems.length}" loading="lazy" decoding="async" alt="推文图片" /></div>`;
         }
     });
     mediaHtml += '</div></div>';
     return mediaHtml;
 }
 
+// 获取结构化媒体列表（服务器返回 media 数组；兼容只有 media_path 的旧数据）
+function getMediaItems(record) {
+    if (Array.isArray(record.media)) {
+        return record.media;
+    }
+    if (!record.media_path) {
+        return [];
+    }
+    const videoExtensions = ['mp4', 'webm', 'ogg', 'mov', 'm4v'];
+    return record.media_path.split(',')
+        .map(path => path.trim())
+        .filter(path => path)
+        .map(path => ({
+            path: path,
+            kind: videoExtensions.includes(path.split('.').pop().toLowerCase()) ? 'video' : 'image'
+        }));
+}
+
 // 选择推文中的全部文本
 function selectTweetText(tweetElement) {
     const range = document.createRange();
@@ -2,6 +2,7 @@
 import { globalState } from './globalState.js';
 import { applyFontSize } from './themeManager.js';
 import { openImageModal } from './imageModal.js';
+import { createVirtualTimeline } from './virtualTimeline.js';
 
 // 显示加载指示器
 export function showLoadingIndicator() {
@@ -30,6 +31,9 @@ export function showSkeletonScreens() {
     const container = document.getElementById('tweets-container');
     if (!container) return;
     
+    if (timeline) {
+        timeline.clear();
+    }
     container.innerHTML = '';
     
     for (let i = 0; i < globalState.pageSize; i++) {
@@ -48,7 +52,63 @@ export function showSkeletonScreens() {
     hideLoadingIndicator();
 }
 
-// 渲染推文列表
+// 各字号下正文的像素大小，与 styles.css 中 .tweet-content.font-* 一致，用于估算未渲染推文的高度
+const FONT_PIXELS = { small: 12, medium: 18, large: 24 };
+// 尺寸未知的媒体先按 4:3 占位，加载后换成真实比例
+const UNSIZED_RATIO = 0.75;
+
+let timeline = null;
+let highlightRecordId = null;
+// 被折叠的转发记录 id -> 代替它显示的记录 id
+let collapsedTo = new Map();
+// 占位图字符串 -> data URL
+const placeholderUrls = new Map();
+
+// 媒体进入视口（含提前量）时才设置 src
+const mediaObserver = typeof IntersectionObserver !== 'undefined'
+    ? new IntersectionObserver((entries) => {
+        entries.forEach((entry) => {
+            if (entry.isIntersecting) {
+                loadMedia(entry.target);
+            }
+        });
+    }, { rootMargin: '400px 0px' })
+    : null;
+
+function loadMedia(element) {
+    if (mediaObserver) {
+        mediaObserver.unobserve(element);
+    }
+    if (element.dataset.src) {
+        element.src = element.dataset.src;
+        element.removeAttribute('data-src');
+    }
+}
+
+function getTimeline(container) {
+    if (!timeline) {
+        timeline = createVirtualTimeline(container, {
+            createNode: createTweetNode,
+            fillNode: fillTweetNode,
+            releaseNode: releaseTweetNode,
+            estimateHeight: estimateTweetHeight
+        });
+        // 媒体加载后去掉模糊占位图，未知尺寸的去掉占位比例（load 事件不冒泡，在捕获阶段处理）
+        const clearPlaceholder = (e) => {
+            if (!e.target.dataset) return;
+            e.target.style.backgroundImage = '';
+            if ('unsized' in e.target.dataset) {
+                e.target.style.aspectRatio = '';
+                delete e.target.dataset.unsized;
+            }
+        };
+        container.addEventListener('load', clearPlaceholder, true);
+        container.addEventListener('loadedmetadata', clearPlaceholder, true);
+    }
+    return timeline;
+}
+
+// 渲染推文列表（虚拟化：只有视口附近的推文进入 DOM）
 export function renderTweets(records) {
     console.log(`开始渲染推文，记录数: ${records ? records.length : 0}`);
     const container = document.getElementById('tweets-container');
@@ -57,40 +117,100 @@ export function renderTweets(records) {
         return;
     }
     
-    container.innerHTML = '';
     container.classList.remove('masonry-layout', 'grid-layout');
+    // 先显示容器，排版时才能读到宽度
+    hideLoadingIndicator();
     
     if (!records || records.length === 0) {
         console.log('没有记录可显示');
+        getTimeline(container).clear();
         container.innerHTML = '<p class="no-records">没有找到相关记录</p>';
-        hideLoadingIndicator();
         return;
     }
     
     console.log(`准备渲染 ${records.length} 条记录`);
-    const fragment = document.createDocumentFragment();
-    records.forEach((record, index) => {
-        console.log(`渲染第 ${index + 1} 条记录，ID: ${record.id}`);
-        const tweetElement = createTweetElement(record);
-        fragment.appendChild(tweetElement);
-    });
-    
-    container.appendChild(fragment);
+    getTimeline(container).setRecords(collapseDuplicates(records));
     console.log('推文渲染完成');
-    hideLoadingIndicator();
 }
 
-// 创建单条推文元素 - 简化版本，不显示操作按钮
-function createTweetElement(record) {
+// 同一内容转发到多个渠道时（服务器标记了 duplicate_of），本页中只显示最早发布的一条，
+// 其他渠道列在它的标题栏里；缓存中的记录对象不修改
+function collapseDuplicates(records) {
+    collapsedTo = new Map();
+    const ids = new Set(records.map(record => String(record.id)));
+    const copies = new Map();
+    records.forEach(record => {
+        const primaryId = record.duplicate_of == null ? null : String(record.duplicate_of);
+        if (primaryId && primaryId !== String(record.id) && ids.has(primaryId)) {
+            collapsedTo.set(String(record.id), primaryId);
+            if (!copies.has(primaryId)) {
+                copies.set(primaryId, []);
+            }
+            copies.get(primaryId).push(record);
+        }
+    });
+    return records
+        .filter(record => !collapsedTo.has(String(record.id)))
+        .map(record => copies.has(String(record.id)) ? { ...record, crossPosts: copies.get(String(record.id)) } : record);
+}
+
+function resolveRecordId(recordId) {
+    return collapsedTo.get(String(recordId)) || String(recordId);
+}
+
+// 当前页是否包含该记录（包括尚未进入视口、不在 DOM 中的推文，以及被折叠的转发）
+export function hasRecord(recordId) {
+    return !!timeline && timeline.indexOf(resolveRecordId(recordId)) >= 0;
+}
+
+// 滚动到指定记录并高亮 3 秒；返回是否在当前页找到
+export function scrollToRecord(recordId) {
+    recordId = resolveRecordId(recordId);
+    const index = timeline ? timeline.indexOf(recordId) : -1;
+    if (index < 0) {
+        return false;
+    }
+    highlightRecordId = recordId;
+    timeline.scrollToIndex(index, 'smooth');
+    const node = timeline.getNode(index);
+    if (node) {
+        highlightNode(node);
+    }
+    return true;
+}
+
+function highlightNode(node) {
+    highlightRecordId = null;
+    node.classList.add('highlighted-record');
+    setTimeout(() => {
+        node.classList.remove('highlighted-record');
+    }, 3000);
+}
+
+// 创建可复用的推文节点 - 简化版本，不显示操作按钮
+function createTweetNode() {
     const tweetDiv = document.createElement('div');
-    tweetDiv.className = 'tweet selectable';
-    tweetDiv.dataset.id = record.id;
+    tweetDiv.className = 'tweet selectable masonry-item';
     tweetDiv.setAttribute('role', 'article');
-    tweetDiv.setAttribute('aria-label', `推文，发布于 ${formatDate(record.datetime)}`);
     tweetDiv.setAttribute('tabindex', '0');
-    tweetDiv.classList.add('masonry-item');
     
+    tweetDiv.addEventListener('keydown', function(e) {
+        if (e.ctrlKey && e.key === 'a') {
+            selectTweetText(this);
+            e.preventDefault();
+        }
+    });
+    
+    return tweetDiv;
+}
+
+// 用一条记录填充推文节点（新建或从节点池取出的）
+function fillTweetNode(tweetDiv, record) {
     const formattedDate = formatDate(record.datetime);
+    tweetDiv.dataset.id = record.id;
+    tweetDiv.dataset.datetime = record.datetime || '';
+    tweetDiv.setAttribute('aria-label', `推文，发布于 ${formattedDate}`);
+    
     const content = highlightKeywords(record.content.trim(), globalState.currentSearch);
     const mediaContent = createMediaContent(record);
     
@@ -98,55 +218,145 @@ function createTweetElement(record) {
     tweetDiv.innerHTML = `<div class="tweet-header">` +
             `<span class="tweet-time" aria-label="发布时间">${formattedDate}</span>` +
             (record.channel ? `<span class="tweet-channel" aria-label="发布渠道">${record.channel}</span>` : '') +
+            (record.crossPosts ? createCrossPostsLabel(record.crossPosts) : '') +
         `</div>` +
-        `<div class="tweet-content" aria-label="推文内容">${content}</div>` +
+        `<div class="tweet-content font-${globalState.currentFontSize}" aria-label="推文内容">${content}</div>` +
         mediaContent;
     
-    tweetDiv.addEventListener('keydown', function(e) {
-        if (e.ctrlKey && e.key === 'a') {
-            selectTweetText(this);
-            e.preventDefault();
+    tweetDiv.querySelectorAll('[data-src]').forEach((element) => {
+        if (mediaObserver) {
+            mediaObserver.observe(element);
+        } else {
+            loadMedia(element);
         }
     });
+    if (highlightRecordId === String(record.id)) {
+        highlightNode(tweetDiv);
+    }
+}
+
+// 被折叠的转发：列出其他渠道，悬停显示各自的发布时间
+function createCrossPostsLabel(crossPosts) {
+    const channels = [...new Set(crossPosts.map(record => record.channel).filter(Boolean))];
+    const label = channels.length ? `同时发布于 ${channels.join('、')}` : `另有 ${crossPosts.length} 条相同内容`;
+    const title = crossPosts.map(record => `${record.channel || '无渠道'} ${formatDate(record.datetime)}`).join('\n');
+    return `<span class="tweet-crossposts" title="${title}">${label}</span>`;
+}
+
+// 节点离开视口：停止观察尚未加载的媒体
+function releaseTweetNode(tweetDiv) {
+    if (mediaObserver) {
+        tweetDiv.querySelectorAll('[data-src]').forEach((element) => mediaObserver.unobserve(element));
+    }
+    tweetDiv.classList.remove('highlighted-record');
+}
+
+function mediaRatio(item) {
+    return item.width && item.height ? item.height / item.width : UNSIZED_RATIO;
+}
+
+// 估算推文高度：正文按字号折行，媒体按服务器给出的宽高比（与 styles.css 的媒体布局一致）
+function estimateTweetHeight(record, width) {
+    const fontSize = FONT_PIXELS[globalState.currentFontSize] || 15;
+    const innerWidth = Math.max(width - 20, 100);
+    const charsPerLine = Math.max(1, Math.floor(innerWidth / fontSize));
+    const lines = (record.content || '').trim().split('\n')
+        .reduce((sum, line) => sum + Math.max(1, Math.ceil(line.length / charsPerLine)), 0);
+    let height = 20 + 24 + lines * fontSize * 1.4;
     
-    return tweetDiv;
+    const mediaItems = (record.media_type === 'image' || record.media_type === 'video') ? getMediaItems(record) : [];
+    if (mediaItems.length === 1) {
+        height += 10 + Math.min(innerWidth, 500) * mediaRatio(mediaItems[0]);
+    } else if (mediaItems.length === 2) {
+        height += 10 + (innerWidth - 10) / 2 * Math.max(...mediaItems.map(mediaRatio));
+    } else if (mediaItems.length > 2) {
+        const perRow = Math.max(1, Math.floor((innerWidth + 10) / 230));
+        const rows = Math.ceil(mediaItems.length / perRow);
+        height += 10 + rows * (220 * Math.max(...mediaItems.map(mediaRatio)) + 10);
+    }
+    return Math.round(height);
+}
+
+// 把服务器生成的占位图（"4x3:" 加每个色块的 RRGGBB）画成几个像素的小图，由浏览器放大成模糊的色块
+function placeholderUrl(placeholder) {
+    let url = placeholderUrls.get(placeholder);
+    if (url !== undefined) {
+        return url;
+    }
+    url = '';
+    const match = /^(\d+)x(\d+):([0-9a-f]+)$/.exec(placeholder);
+    if (match && match[3].length === Number(match[1]) * Number(match[2]) * 6) {
+        const canvas = document.createElement('canvas');
+        canvas.width = Number(match[1]);
+        canvas.height = Number(match[2]);
+        const context = canvas.getContext('2d');
+        const image = context.createImageData(canvas.width, canvas.height);
+        for (let i = 0; i < canvas.width * canvas.height; i++) {
+            image.data[i * 4] = parseInt(match[3].substr(i * 6, 2), 16);
+            image.data[i * 4 + 1] = parseInt(match[3].substr(i * 6 + 2, 2), 16);
+            image.data[i * 4 + 2] = parseInt(match[3].substr(i * 6 + 4, 2), 16);
+            image.data[i * 4 + 3] = 255;
+        }
+        context.putImageData(image, 0, 0);
+        url = canvas.toDataURL();
+    }
+    placeholderUrls.set(placeholder, url);
+    return url;
 }
 
-// 创建媒体内容
+// 创建媒体内容（src 放在 data-src 中，进入视口时再加载）
 function createMediaContent(record) {
-    if ((record.media_type !== 'image' && record.media_type !== 'video') || !record.media_path) {
+    const mediaItems = getMediaItems(record);
+    if ((record.media_type !== 'image' && record.media_type !== 'video') || mediaItems.length === 0) {
         return '';
     }
     
-    const paths = record.media_path.split(',');
+    // 根据媒体数量确定使用的CSS类
     let containerClass = 'media-container';
-    if (paths.length === 1) {
+    if (mediaItems.length === 1) {
         containerClass += ' single-image';
-    } else if (paths.length === 2) {
+    } else if (mediaItems.length === 2) {
         containerClass += ' two-images';
     }
     
     let mediaHtml = `<div class="tweet-media" role="region" aria-label="媒体内容"><div class="${containerClass}">`;
-    paths.forEach((path, index) => {
-        if (path.trim()) {
-            const fullPath = path.trim();
-            const normalizedPath = fullPath.startsWith('/') ? fullPath : '/' + fullPath;
-            const fileExtension = fullPath.split('.').pop().toLowerCase();
-            
-            const videoExtensions = ['mp4', 'webm', 'ogg'];
-            if (videoExtensions.includes(fileExtension)) {
-                mediaHtml += `<div class="media-item"><video src="${normalizedPath}" controls class="tweet-video" aria-label="推文视频"></video></div>`;
-            } else {
-                const currentPath = path.trim();
-                const currentNormalizedPath = currentPath.startsWith('/') ? currentPath : '/' + currentPath;
-                mediaHtml += `<div class="media-item"><img src="${currentNormalizedPath}" class="tweet-image" data-tweet-id="${record.id}" data-image-index="${index}" data-image-count="${paths.length}" loading="lazy" decoding="async" alt="推文图片" /></div>`;
-            }
+    mediaItems.forEach((item, index) => {
+        // 确保路径是相对于网站根目录的
+        const normalizedPath = item.path.startsWith('/') ? item.path : '/' + item.path;
+        // 按服务器给出的尺寸预留布局空间，媒体加载前后推文高度不变；尺寸未知时先按 4:3 占位
+        const placeholder = item.placeholder ? placeholderUrl(item.placeholder) : '';
+        const background = placeholder ? ` background-image: url(${placeholder}); background-size: 100% 100%;` : '';
+        const sizeAttrs = item.width && item.height
+            ? ` width="${item.width}" height="${item.height}" style="aspect-ratio: ${item.width} / ${item.height};${background}"`
+            : ` style="aspect-ratio: 4 / 3;${background}" data-unsized`;
+        if (item.kind === 'video') {
+            mediaHtml += `<div class="media-item"><video data-src="${normalizedPath}"${sizeAttrs} controls preload="metadata" class="tweet-video" aria-label="推文视频"></video></div>`;
+        } else {
+            mediaHtml += `<div class="media-item"><img data-src="${normalizedPath}"${sizeAttrs} class="tweet-image" data-tweet-id="${record.id}" data-image-index="${index}" data-image-count="${mediaItems.length}" decoding="async" alt="推文图片" /></div>`;
         }
     });
     mediaHtml += '</div></div>';
     return mediaHtml;
 }
 
+// 获取结构化媒体列表（服务器返回 media 数组；兼容只有 media_path 的旧数据）
+function getMediaItems(record) {
+    if (Array.isArray(record.media)) {
+        return record.media;
+    }
+    if (!record.media_path) {
+        return [];
+    }
+    const videoExtensions = ['mp4', 'webm', 'ogg', 'mov', 'm4v'];
+    return record.media_path.split(',')
+        .map(path => path.trim())
+        .filter(path => path)
+        .map(path => ({
+            path: path,
+            kind: videoExtensions.includes(path.split('.').pop().toLowerCase()) ? 'video' : 'image'
+        }));
+}
+
 // 选择推文中的全部文本
 function selectTweetText(tweetElement) {
     const range = document.createRange();
@@ -220,6 +430,8 @@ export default {
     hideLoadingIndicator,
     showSkeletonScreens,
     renderTweets,
+    hasRecord,
+    scrollToRecord,
     updatePaginationInfo,
     formatDate,
     highlightKeywords
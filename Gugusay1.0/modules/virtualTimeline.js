@@ -0,0 +1,232 @@
+// 虚拟化时间线模块：推文按 CSS 多列的顺序（先排满一列再排下一列）绝对定位，
+// 只有视口附近的推文留在 DOM 中，离开视口的节点放回节点池，由新进入视口的推文复用
+
+// 视口上下额外渲染的距离（像素），快速滚动时不露出空白
+const OVERSCAN = 800;
+// 节点池最多保留的空闲节点
+const POOL_LIMIT = 30;
+
+/**
+ * 创建虚拟化列表，容器的列数和间距取自 CSS 变量 --timeline-columns、--timeline-gap
+ * @param {HTMLElement} container - 列表容器（页面由 window 滚动）
+ * @param {object} hooks - { createNode(), fillNode(node, record), releaseNode(node), estimateHeight(record, width) }
+ * @returns {object} { setRecords, clear, indexOf, getNode, scrollToIndex }
+ */
+export function createVirtualTimeline(container, hooks) {
+    let records = [];
+    let heights = [];      // 每条记录的高度：测量值，未渲染过的为估算值
+    let tops = [];
+    let columnOf = [];
+    let columns = [];      // 每列的记录下标，top 递增，用于二分查找可见范围
+    const rendered = new Map();   // 记录下标 -> 节点
+    const indexOfNode = new WeakMap();
+    const pool = [];
+    const metrics = { columns: 1, gap: 0, width: 0, paddingTop: 0, paddingLeft: 0, paddingBottom: 0, borderBox: false };
+    let containerWidth = 0;
+    let frame = 0;
+
+    const resizeObserver = new ResizeObserver((entries) => {
+        let changed = false;
+        entries.forEach((entry) => {
+            if (entry.target === container) {
+                // 容器高度由本模块设置，只关心宽度变化（窗口缩放、侧栏展开、从隐藏变为可见）
+                if (container.clientWidth !== containerWidth) {
+                    readMetrics(true);
+                    changed = true;
+                }
+                return;
+            }
+            const index = indexOfNode.get(entry.target);
+            if (index === undefined || rendered.get(index) !== entry.target) return;
+            const height = entry.target.offsetHeight;
+            if (height && height !== heights[index]) {
+                heights[index] = height;
+                changed = true;
+            }
+        });
+        if (changed) {
+            relayoutKeepingAnchor();
+        }
+    });
+    resizeObserver.observe(container);
+    window.addEventListener('scroll', schedule, { passive: true });
+
+    function readMetrics(reestimate) {
+        const style = getComputedStyle(container);
+        metrics.columns = Math.max(1, parseInt(style.getPropertyValue('--timeline-columns'), 10) || 1);
+        metrics.gap = parseFloat(style.getPropertyValue('--timeline-gap')) || 0;
+        metrics.paddingTop = parseFloat(style.paddingTop) || 0;
+        metrics.paddingLeft = parseFloat(style.paddingLeft) || 0;
+        metrics.paddingBottom = parseFloat(style.paddingBottom) || 0;
+        metrics.borderBox = style.boxSizing === 'border-box';
+        containerWidth = container.clientWidth;
+        const inner = containerWidth - metrics.paddingLeft - (parseFloat(style.paddingRight) || 0);
+        metrics.width = Math.max(0, (inner - metrics.gap * (metrics.columns - 1)) / metrics.columns);
+        if (reestimate) {
+            // 宽度变化后旧的测量值失效，已渲染的节点会被 ResizeObserver 重新测量
+            heights = records.map((record) => hooks.estimateHeight(record, metrics.width));
+        }
+    }
+
+    function layout() {
+        const { columns: count, gap } = metrics;
+        const total = heights.reduce((sum, height) => sum + height + gap, 0);
+        const target = total / count || 1;
+        const bottoms = new Array(count).fill(0);
+        columns = Array.from({ length: count }, () => []);
+        let column = 0;
+        let cumulative = 0;
+        records.forEach((record, index) => {
+            const height = heights[index] + gap;
+            // 按累计高度的中点分列，与浏览器平衡多列的效果一致，且列号只增不减
+            column = Math.max(column, Math.min(count - 1, Math.floor((cumulative + height / 2) / target)));
+            tops[index] = bottoms[column];
+            columnOf[index] = column;
+            columns[column].push(index);
+            bottoms[column] += height;
+            cumulative += height;
+        });
+        const contentHeight = Math.max(0, Math.max(...bottoms) - gap);
+        const padding = metrics.borderBox ? metrics.paddingTop + metrics.paddingBottom : 0;
+        container.style.height = `${contentHeight + padding}px`;
+        rendered.forEach((node, index) => place(node, index));
+    }
+
+    function place(node, index) {
+        node.style.top = `${metrics.paddingTop + tops[index]}px`;
+        node.style.left = `${metrics.paddingLeft + columnOf[index] * (metrics.width + metrics.gap)}px`;
+        node.style.width = `${metrics.width}px`;
+    }
+
+    function viewport() {
+        const top = -container.getBoundingClientRect().top - metrics.paddingTop;
+        return { top, bottom: top + window.innerHeight };
+    }
+
+    function update() {
+        const view = viewport();
+        const from = view.top - OVERSCAN;
+        const to = view.bottom + OVERSCAN;
+        const wanted = new Set();
+        columns.forEach((indices) => {
+            let low = 0;
+            let high = indices.length;
+            while (low < high) {
+                const mid = (low + high) >> 1;
+                const index = indices[mid];
+                if (tops[index] + heights[index] < from) {
+                    low = mid + 1;
+                } else {
+                    high = mid;
+                }
+            }
+            for (let k = low; k < indices.length && tops[indices[k]] <= to; k++) {
+                wanted.add(indices[k]);
+            }
+        });
+
+        rendered.forEach((node, index) => {
+            if (!wanted.has(index)) {
+                recycle(index, node);
+            }
+        });
+        [...wanted].filter((index) => !rendered.has(index)).sort((a, b) => a - b).forEach((index) => {
+            const node = pool.pop() || hooks.createNode();
+            hooks.fillNode(node, records[index]);
+            indexOfNode.set(node, index);
+            place(node, index);
+            // 按记录顺序插入，保持 Tab 键顺序和读屏顺序与时间线一致
+            let next = null;
+            rendered.forEach((other, otherIndex) => {
+                if (otherIndex > index && (!next || otherIndex < indexOfNode.get(next))) {
+                    next = other;
+                }
+            });
+            container.insertBefore(node, next);
+            rendered.set(index, node);
+            resizeObserver.observe(node);
+        });
+    }
+
+    function recycle(index, node) {
+        resizeObserver.unobserve(node);
+        hooks.releaseNode(node);
+        node.remove();
+        rendered.delete(index);
+        if (pool.length < POOL_LIMIT) {
+            pool.push(node);
+        }
+    }
+
+    function schedule() {
+        if (!frame && records.length) {
+            frame = requestAnimationFrame(() => {
+                frame = 0;
+                update();
+            });
+        }
+    }
+
+    /**
+     * 高度变化后重新排版；视口顶部的推文保持在原来的屏幕位置，上方推文变高时页面不跳动
+     */
+    function relayoutKeepingAnchor() {
+        const view = viewport();
+        let anchor = -1;
+        if (view.top > 0) {
+            rendered.forEach((node, index) => {
+                if (tops[index] + heights[index] > view.top && (anchor < 0 || tops[index] < tops[anchor])) {
+                    anchor = index;
+                }
+            });
+        }
+        const before = anchor >= 0 ? { top: tops[anchor], column: columnOf[anchor] } : null;
+        layout();
+        if (before && columnOf[anchor] === before.column && tops[anchor] !== before.top) {
+            window.scrollBy(0, tops[anchor] - before.top);
+        }
+        update();
+    }
+
+    function setRecords(list) {
+        clear();
+        records = list.slice();
+        container.classList.add('virtual-timeline');
+        readMetrics(true);
+        layout();
+        update();
+    }
+
+    function clear() {
+        rendered.forEach((node, index) => recycle(index, node));
+        records = [];
+        heights = [];
+        tops = [];
+        columnOf = [];
+        columns = [];
+        container.classList.remove('virtual-timeline');
+        container.style.height = '';
+        // 清掉骨架屏、空结果提示等非列表内容
+        container.replaceChildren();
+    }
+
+    function scrollToIndex(index, behavior = 'auto') {
+        if (index < 0 || index >= records.length) return;
+        const rect = container.getBoundingClientRect();
+        const top = window.scrollY + rect.top + metrics.paddingTop + tops[index] - (window.innerHeight - heights[index]) / 2;
+        window.scrollTo({ top: Math.max(0, top), behavior });
+        schedule();
+    }
+
+    return {
+        setRecords,
+        clear,
+        indexOf: (recordId) => records.findIndex((record) => String(record.id) === String(recordId)),
+        getNode: (index) => rendered.get(index) || null,
+        scrollToIndex
+    };
+}
+
+export default {
+    createVirtualTimeline
+};
@@ -1,6 +1,7 @@
 // 导航树模块
-import { loadPage } from './pageLoader.js';
-import { globalState } from './globalState.js';
+import { loadPage } from './pageLoaderSimple.js';
+import { globalState, frontendCache } from './globalState.js';
+import { requestJSON, isAbortError } from '../utils/api.js';
 
 let yearMonthData = []; // 存储年月数据
 let channelData = []; // 存储渠道数据
@@ -22,13 +23,7 @@ export function loadNavigationTree() {
     // 使用setTimeout延迟加载，不阻塞页面显示
     setTimeout(() => {
         // 并行加载年月数据和渠道数据
-        const yearMonthsPromise = fetch('/api/year-months')
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
-                }
-                return response.json();
-            })
+        const yearMonthsPromise = requestJSON('/api/year-months')
             .then(data => {
                 // 确保yearMonths存在且为数组
                 yearMonthData = (data && data.yearMonths) || [];
@@ -41,13 +36,7 @@ export function loadNavigationTree() {
                 renderYearMonthTree();
             });
         
-        const channelsPromise = fetch('/api/channels')
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
-                }
-                return response.json();
-            })
+        const channelsPromise = requestJSON('/api/channels')
             .then(data => {
                 // 确保channels存在且为数组
                 channelData = (data && data.channels) || [];
@@ -184,7 +173,51 @@ function getMonthName(month) {
 }
 
 /**
- * 导航到指定年月
+ * 通过 /api/locate 一次取得目标页码和该页记录，写入页面缓存后直接渲染，无需再请求一次
+ */
+function locateAndLoad(params) {
+    const size = globalState.pageSize || pageSize;
+    const query = new URLSearchParams({ ...params, pageSize: String(size), anchor: 'oldest' });
+    // 与翻页共用槽位：连续点击不同年月时只保留最后一次定位
+    return requestJSON(`/api/locate?${query.toString()}`, { slot: 'page' })
+        .catch(error => {
+            if (error.status === 404 || isAbortError(error)) {
+                return null;
+            }
+            throw error;
+        })
+        .then(data => {
+            if (!data) {
+                return null;
+            }
+            // 与 loadPage 使用相同的缓存键，loadPage 会直接命中缓存
+            const cacheKey = `page_${data.page}_search_${globalState.currentSearch}_channel_${globalState.currentChannel || 'null'}_yearmonth_${globalState.currentYearMonth || 'null'}`;
+            frontendCache.set(cacheKey, {
+                records: data.records,
+                totalRecords: data.total,
+                totalPages: data.totalPages
+            });
+            loadPage(data.page);
+            return data;
+        });
+}
+
+/**
+ * 隐藏时光机
+ */
+function collapseNavigationTree() {
+    const tree = document.getElementById('navigation-tree');
+    if (tree) {
+        tree.classList.add('collapsed');
+        const toggleBtn = document.getElementById('toggle-tree');
+        if (toggleBtn) {
+            toggleBtn.innerHTML = '时光机';
+        }
+    }
+}
+
+/**
+ * 导航到指定年月（定位到该月最早推文所在的页面）
  */
 function navigateToYearMonth(year, month) {
     // 设置当前年月、渠道和搜索状态
@@ -199,22 +232,10 @@ function navigateToYearMonth(year, month) {
         window.currentSearch = globalState.currentSearch;
     }
     
-    fetch(`/api/year-month/${year}/${month}/page?pageSize=${pageSize}`)
-        .then(response => response.json())
+    locateAndLoad({ yearMonth: `${year}-${month}` })
         .then(data => {
-            if (data.page) {
-                // 使用导入的loadPage函数加载页面
-                loadPage(data.page);
-                
-                // 隐藏时光机
-                const tree = document.getElementById('navigation-tree');
-                if (tree) {
-                    tree.classList.add('collapsed');
-                    const toggleBtn = document.getElementById('toggle-tree');
-                    if (toggleBtn) {
-                        toggleBtn.innerHTML = '时光机';
-                    }
-                }
+            if (data) {
+                collapseNavigationTree();
             }
         })
         .catch(error => {
@@ -228,49 +249,25 @@ function navigateToYearMonth(year, month) {
 function navigateToChannel(channel) {
     console.log('navigateToChannel被调用, 渠道:', channel);
     
-    // 使用和年月导航相同的页面跳转方式，定位到该渠道的最早推文页面
-    const channelParam = channel || '';
-    const apiUrl = `/api/channel/${encodeURIComponent(channelParam)}/page?pageSize=${pageSize}`;
-    console.log('请求渠道页码API:', apiUrl);
+    // 设置当前渠道、年月和搜索状态
+    globalState.currentChannel = channel || null;
+    globalState.currentYearMonth = null;
+    globalState.currentSearch = '';
     
-    fetch(apiUrl)
-        .then(response => {
-            console.log('渠道页码API响应状态:', response.status);
-            return response.json();
-        })
+    // 同步到window对象
+    if (typeof window !== 'undefined') {
+        window.currentChannel = globalState.currentChannel;
+        window.currentYearMonth = globalState.currentYearMonth;
+        window.currentSearch = globalState.currentSearch;
+    }
+    
+    // 和年月导航相同，定位到该渠道最早推文所在的页面
+    locateAndLoad({ channel: channel || '' })
         .then(data => {
-            console.log('渠道页码API返回:', data);
-            if (data.page) {
-                console.log('准备调用loadPage, 页码:', data.page);
-                
-                // 设置当前渠道、年月和搜索状态
-                globalState.currentChannel = channel || null;
-                globalState.currentYearMonth = null;
-                globalState.currentSearch = '';
-                
-                // 同步到window对象
-                if (typeof window !== 'undefined') {
-                    window.currentChannel = globalState.currentChannel;
-                    window.currentYearMonth = globalState.currentYearMonth;
-                    window.currentSearch = globalState.currentSearch;
-                }
-                
-                console.log('设置globalState.currentChannel为:', globalState.currentChannel);
-                
-                // 使用导入的loadPage函数加载页面
-                loadPage(data.page);
-                
-                // 隐藏时光机
-                const tree = document.getElementById('navigation-tree');
-                if (tree) {
-                    tree.classList.add('collapsed');
-                    const toggleBtn = document.getElementById('toggle-tree');
-                    if (toggleBtn) {
-                        toggleBtn.innerHTML = '时光机';
-                    }
-                }
+            if (data) {
+                collapseNavigationTree();
             } else {
-                console.error('渠道页码API返回的数据中没有page字段:', data);
+                console.error('渠道没有可定位的记录:', channel);
             }
         })
         .catch(error => {
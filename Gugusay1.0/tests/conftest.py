@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# 测试以应用目录为根导入 backend 包，与 main.py 相同
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from backend import migrations
+from backend.database import DatabaseManager
+
+
+def pytest_addoption(parser):
+    parser.addoption('--benchmark', action='store_true', help='也运行标记为 benchmark 的耗时对比测试')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: 墙钟耗时对比，结果受机器负载影响，只在 --benchmark 时运行')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='benchmark：加 --benchmark 运行')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+# 测试记录未给出的列取这些值；记录也可以直接写成正文字符串
+RECORD_DEFAULTS = {'datetime': '2020-01-01 00:00:00', 'content': '', 'channel': '', 'media_type': 'text', 'media_path': ''}
+
+
+def insert_records(conn, records):
+    records = [record if isinstance(record, dict) else {'content': record} for record in records]
+    if not records:
+        return
+    columns = (['id'] if 'id' in records[0] else []) + list(RECORD_DEFAULTS)
+    conn.executemany(
+        f'INSERT INTO JL ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+        [tuple({**RECORD_DEFAULTS, **record}[column] for column in columns) for record in records],
+    )
+
+
+@pytest.fixture(scope='session')
+def make_db(tmp_path_factory):
+    """建库工厂：在临时目录里建一个执行完全部迁移的 SR.db，写入 records 后返回路径
+
+    setup(conn) 在回填之前执行，用于写入 JL 以外的表；backfill=False 时保留迁移登记的回填不执行。
+    """
+    def make(records, name='db', setup=None, backfill=True):
+        path = str(tmp_path_factory.mktemp(name) / 'SR.db')
+        conn = sqlite3.connect(path)
+        try:
+            migrations.apply_migrations(conn)
+            insert_records(conn, records)
+            if setup:
+                setup(conn)
+            conn.commit()
+            if backfill:
+                # 回填提前完成，管理器初始化时不再排队后台任务
+                migrations.run_backfills(conn, pause=0)
+        finally:
+            conn.close()
+        return path
+    return make
+
+
+@pytest.fixture(scope='session')
+def make_manager(make_db):
+    """在 make_db 建好的库上创建 DatabaseManager，参数与 make_db 相同"""
+    managers = []
+
+    def make(records, **kwargs):
+        manager = DatabaseManager(db_path=make_db(records, **kwargs))
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.close_connection()
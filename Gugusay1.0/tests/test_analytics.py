@@ -0,0 +1,63 @@
+# 统计快照：NumPy 和逐行两种聚合对同一份数据给出相同的结果；无法解析的日期跳过，缺少时间部分的不计入小时统计
+import pytest
+
+from backend import analytics
+
+CHANNELS = ('微博', '饭否', '')
+
+
+def _records():
+    records = []
+    for index in range(600):
+        year = 2012 + index % 5
+        month = 1 + index * 7 % 12
+        day = 1 + index * 11 % 28
+        # 每 10 条有一条只有日期，没有时间部分
+        time_part = '' if index % 10 == 0 else f' {index % 24:02d}:{index % 60:02d}:00'
+        records.append({
+            'datetime': f'{year}-{month:02d}-{day:02d}{time_part}',
+            'content': '字' * (index % 37),
+            'channel': CHANNELS[index % 3],
+        })
+    records.append({'datetime': '不是日期', 'content': '跳过'})
+    records.append({'datetime': '2019-02-30 08:00:00', 'content': '跳过'})
+    return records
+
+
+@pytest.fixture(scope='module')
+def db(make_manager):
+    return make_manager(_records(), name='analytics')
+
+
+@pytest.fixture(scope='module')
+def snapshot(db):
+    return db.analytics.snapshot()
+
+
+def test_snapshot_skips_unparseable_dates(snapshot):
+    assert len(snapshot) == 600 and snapshot.skipped == 2
+
+
+@pytest.mark.parametrize('granularity', analytics.GRANULARITIES)
+@pytest.mark.parametrize('channel, year, split', [
+    (None, None, False),
+    (None, None, True),
+    ('饭否', None, False),
+    ('', 2014, True),
+    (None, 2013, True),
+    ('不存在', None, False),
+])
+def test_numpy_matches_python(snapshot, granularity, channel, year, split):
+    numpy = pytest.importorskip('numpy')
+    assert snapshot._aggregate_numpy(numpy, granularity, channel, year, split) == \
+        snapshot._aggregate_python(granularity, channel, year, split)
+
+
+def test_timeseries_fills_fixed_buckets(db):
+    result = db.get_timeseries('hour')
+    assert [bucket['key'] for bucket in result['buckets']] == list(range(24))
+    # 只有日期的 60 条不计入任何小时
+    assert sum(bucket['count'] for bucket in result['buckets']) == 540
+    years = db.get_timeseries('year', split=True)['buckets']
+    assert [bucket['key'] for bucket in years] == ['2012', '2013', '2014', '2015', '2016']
+    assert sum(sum(bucket['channels'].values()) for bucket in years) == 600
@@ -0,0 +1,82 @@
+# 变更流水：增量按记录合并，since 不在保留范围内、来自另一份数据库或变化太多时返回 reset
+import pytest
+
+from backend import changefeed
+
+RECORDS = [
+    {'datetime': '2020-01-01 00:00:00', 'content': '一', 'channel': '微博'},
+    {'datetime': '2020-02-01 00:00:00', 'content': '二', 'channel': '饭否'},
+]
+
+
+@pytest.fixture
+def db(make_manager):
+    return make_manager(RECORDS, name='changefeed')
+
+
+def _latest(db):
+    return changefeed.latest_seq(db.get_connection())
+
+
+def test_up_to_date_client_gets_no_changes(db):
+    result = db.get_changes(_latest(db))
+    assert not result['reset'] and result['changes'] == [] and result['counts'] == {}
+
+
+def test_changes_are_merged_per_record(db):
+    since = _latest(db)
+    # JL 的 id 自增：新记录依次为 3、4
+    new_id, gone_id = len(RECORDS) + 1, len(RECORDS) + 2
+    db.add_record('2020-03-01 00:00:00', '三', '微博')
+    db.update_record(new_id, '2020-03-02 00:00:00', '三（改）', '微博')
+    db.update_record(1, '2020-01-01 00:00:00', '一', '豆瓣')
+    db.delete_record(2)
+    # 插入后又删除的记录客户端从未见过，不出现在增量里
+    db.add_record('2020-04-01 00:00:00', '四', '')
+    db.delete_record(gone_id)
+
+    result = db.get_changes(since)
+    assert not result['reset']
+    changes = {change['id']: change for change in result['changes']}
+    assert {record_id: change['action'] for record_id, change in changes.items()} == {
+        new_id: 'insert', 1: 'update', 2: 'delete',
+    }
+    assert changes[new_id]['record']['content'] == '三（改）'
+    assert changes[2]['record'] is None
+    assert result['counts']['total'] == 2
+    assert result['counts']['channel'] == {'': 0, '微博': 1, '豆瓣': 1, '饭否': 0}
+    assert result['counts']['month']['2020-02'] == 0
+
+
+def test_seq_from_another_database_resets(db):
+    result = db.get_changes(_latest(db) + 100)
+    assert result['reset'] and result['changes'] == []
+
+
+def test_pruned_seq_resets(db):
+    since = _latest(db) - len(RECORDS)
+    for index in range(5):
+        db.add_record('2020-05-01 00:00:00', f'新{index}', '')
+    conn = db.get_connection()
+    changefeed.prune(conn, keep=2)
+    assert db.get_changes(since)['reset']
+    # 仍在保留范围内的客户端照常拿到增量
+    assert [change['action'] for change in db.get_changes(_latest(db) - 1)['changes']] == ['insert']
+
+
+def test_too_many_changes_resets(db):
+    since = _latest(db)
+    for index in range(3):
+        db.add_record('2020-05-01 00:00:00', f'新{index}', '')
+    conn = db.get_connection()
+    assert changefeed.changes_since(conn, since, limit=2)['reset']
+    assert len(changefeed.changes_since(conn, since, limit=3)['changes']) == 3
+
+
+def test_swap_starts_a_new_epoch():
+    feed = changefeed.ChangeFeed()
+    feed.apply_write('insert', 1, None, {})
+    assert (feed.epoch, feed.version) == (0, 1)
+    feed.apply_write('swap', None, None, None)
+    assert (feed.epoch, feed.version) == (1, 2)
+    assert feed.wait(2, timeout=0.01) == 2
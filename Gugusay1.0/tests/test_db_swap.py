@@ -0,0 +1,55 @@
+# 热替换与后台任务：回填整段运行期间都持有闸门读锁，替换等待时必须在批次之间让路，不能等到超时
+import sqlite3
+import threading
+import time
+
+from backend import migrations
+from backend.database import DatabaseManager
+
+RECORD_COUNT = 20000
+
+
+class RunningJob:
+    cancelled = False
+
+    def should_stop(self):
+        return False
+
+
+def _make_db(path, contents):
+    conn = sqlite3.connect(path)
+    migrations.apply_migrations(conn)
+    conn.executemany(
+        "INSERT INTO JL (datetime, content, channel) VALUES ('2020-01-01 00:00:00', ?, '')",
+        [(content,) for content in contents],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_swap_while_backfill_is_running(tmp_path):
+    db_path, new_path = str(tmp_path / 'SR.db'), str(tmp_path / 'release.db')
+    # 迁移登记的回填保持未执行，几万行要分几十批
+    _make_db(db_path, [f'第{index}条记录' for index in range(RECORD_COUNT)])
+    _make_db(new_path, ['new'])
+    manager = DatabaseManager(db_path=db_path)
+    manager.ensure_ready()
+    results = []
+    backfill = threading.Thread(target=lambda: results.append(manager._run_backfills(RunningJob())))
+    backfill.start()
+    deadline = time.monotonic() + 5
+    while not manager._gate._readers and backfill.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert manager._gate._readers, 'backfill never opened its connection'
+
+    started = time.perf_counter()
+    result = manager.swap_database(new_path, timeout=5.0)
+    backfill.join(5)
+
+    assert result['success'], result
+    assert time.perf_counter() - started < 2
+    assert not backfill.is_alive()
+    # 回填让路后还有剩余批次，稍后在新数据库上重新排队
+    assert results[0]['remaining']
+    assert manager.get_total_count(6)['count'] == 1
+    manager.close_connection()
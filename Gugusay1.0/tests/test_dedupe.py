@@ -0,0 +1,68 @@
+# 近似重复分组的删除维护：主记录被删时其余成员改指向新的主记录，只剩一条的组移除，
+# 分页总数与分页查询使用同样的条件
+import sqlite3
+
+import pytest
+
+from backend import dedupe
+
+# id 越小发布越早
+RECORDS = [{'id': record_id, 'datetime': f'2020-01-{record_id:02d} 00:00:00', 'content': '转发的内容'}
+           for record_id in range(1, 10)]
+# 三个组：1 为主记录的三人组、4 为主记录的两人组、6 为主记录的三人组；9 不在任何组里
+CLUSTERS = {1: 1, 2: 1, 3: 1, 4: 4, 5: 4, 6: 6, 7: 6, 8: 6}
+
+
+def _add_clusters(conn):
+    conn.executemany('INSERT INTO JL_duplicate (record_id, cluster_id) VALUES (?, ?)', CLUSTERS.items())
+
+
+@pytest.fixture
+def conn(make_db):
+    conn = sqlite3.connect(make_db(RECORDS, name='dedupe', setup=_add_clusters))
+    yield conn
+    conn.close()
+
+
+def _clusters(conn):
+    return dict(conn.execute('SELECT record_id, cluster_id FROM JL_duplicate ORDER BY record_id'))
+
+
+def test_deleting_primary_repoints_members(conn):
+    conn.execute('DELETE FROM JL WHERE id = 1')
+    conn.commit()
+    assert _clusters(conn) == {2: 2, 3: 2, 4: 4, 5: 4, 6: 6, 7: 6, 8: 6}
+
+
+def test_deleting_member_of_pair_drops_cluster(conn):
+    conn.execute('DELETE FROM JL WHERE id = 5')
+    conn.commit()
+    assert _clusters(conn) == {1: 1, 2: 1, 3: 1, 6: 6, 7: 6, 8: 6}
+    conn.execute('DELETE FROM JL WHERE id = 4')
+    conn.commit()
+    assert 4 not in _clusters(conn)
+
+
+def test_deleting_other_member_keeps_primary(conn):
+    conn.execute('DELETE FROM JL WHERE id = 7')
+    conn.commit()
+    assert _clusters(conn) == {1: 1, 2: 1, 3: 1, 4: 4, 5: 4, 6: 6, 8: 6}
+
+
+def test_cluster_page_total_matches_listed_clusters(conn):
+    for record_id in (1, 5, 8):
+        conn.execute('DELETE FROM JL WHERE id = ?', (record_id,))
+    conn.commit()
+    page = dedupe.cluster_page(conn, 1, 20)
+    assert page['total'] == len(page['clusters']) == 2
+    assert {cluster['id']: [record['id'] for record in cluster['records']] for cluster in page['clusters']} == {
+        2: [2, 3], 6: [6, 7],
+    }
+
+
+def test_delete_record_refreshes_cached_members(make_manager):
+    manager = make_manager(RECORDS, name='dedupe', setup=_add_clusters)
+    assert manager.get_record(3)['duplicate_of'] == 1
+    manager.delete_record(1)
+    record = manager.get_record(3)
+    assert (record['duplicate_of'], record['duplicate_count']) == (2, 2)
@@ -0,0 +1,48 @@
+# 实体提取：微博 #话题# 与推特 #hashtag 并存，HTML 实体、邮箱和链接里的 # @ 不算话题或提及；
+# 记录写入后 JL_entity 随之更新
+import pytest
+
+from backend import entities
+
+
+@pytest.mark.parametrize('text, expected', [
+    # 成对的 #话题# 可以含中文和空格；不含中文时空格表示这是两个 #hashtag
+    ('今天 #周末计划# 和 #Python and #tips', {('topic', '周末计划'), ('topic', 'python'), ('topic', 'tips')}),
+    ('#中 文 话题# 与 #no space#', {('topic', '中 文 话题'), ('topic', 'no')}),
+    ('#话题#后面 #Tag', {('topic', '话题'), ('topic', 'tag')}),
+    # HTML 实体、纯数字和 ## 都不是话题
+    ('&#35;话题&#35; &#x23;abc &#123; #1 ##double', set()),
+    # 邮箱不是提及，提及统一为小写
+    ('邮件 me@example.com 给 @张三 和 @Bob_1', {('mention', '张三'), ('mention', 'bob_1')}),
+    ('a@b.cn @@x', set()),
+    # 链接去掉末尾标点，遇到全角标点结束，链接里的 #锚点 不是话题
+    ('看 https://example.com/a#frag?x=1. 和 http://t.cn/abc）好',
+     {('url', 'https://example.com/a#frag?x=1'), ('url', 'http://t.cn/abc')}),
+    ('', set()),
+])
+def test_extract_entities(text, expected):
+    assert entities.extract_entities(text) == expected
+
+
+def test_normalize_value_matches_extraction():
+    assert entities.normalize_value('topic', ' #周末计划# ') == '周末计划'
+    assert entities.normalize_value('mention', '@Bob_1') == 'bob_1'
+    assert entities.normalize_value('url', 'https://Example.com/A ') == 'https://Example.com/A'
+
+
+def test_writes_update_entity_index(make_manager):
+    manager = make_manager([
+        {'datetime': '2021-03-01 08:00:00', 'content': '#周末计划# 去爬山 @张三'},
+        {'datetime': '2021-04-01 08:00:00', 'content': '#周末计划# 下雨了'},
+    ], name='entities')
+    top = manager.get_top_entities('topic')['entities']
+    assert [(item['value'], item['count']) for item in top] == [('周末计划', 2)]
+    assert manager.get_top_entities('topic', since='2021-04')['entities'][0]['count'] == 1
+
+    manager.update_record(2, '2021-04-01 08:00:00', '#读书# 下雨了')
+    page = manager.get_entity_records('topic', '#周末计划#', 1, 6)
+    assert [record['id'] for record in page['records']] == [1]
+    assert manager.get_entity_records('topic', '读书', 1, 6)['records'][0]['id'] == 2
+
+    manager.delete_record(1)
+    assert manager.get_top_entities('mention')['entities'] == []
@@ -0,0 +1,50 @@
+# ETag 重新验证：数据没变时带 If-None-Match 的 GET 返回 304，任何写入之后返回新数据和新的 ETag
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from backend import server
+
+
+@pytest.fixture
+def api(make_manager, monkeypatch):
+    manager = make_manager(['一', '二'], name='etag')
+    monkeypatch.setattr(server, 'db_manager', manager)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), server.RequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{httpd.server_address[1]}'
+
+    def get(url, etag=None):
+        request = urllib.request.Request(base + url, headers={'If-None-Match': etag} if etag else {})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, response.headers.get('ETag'), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('ETag'), e.read()
+
+    yield manager, get
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_unchanged_data_is_not_modified(api):
+    _, get = api
+    status, etag, body = get('/api/total-count?pageSize=6')
+    assert status == 200 and etag and b'"count": 2' in body
+    assert get('/api/total-count?pageSize=6', etag)[:2] == (304, etag)
+    # ETag 只跟数据版本有关，同一版本下其他接口也能用它重新验证
+    assert get('/api/channels', etag)[0] == 304
+
+
+def test_write_invalidates_etag(api):
+    manager, get = api
+    _, etag, _ = get('/api/total-count?pageSize=6')
+    manager.add_record('2021-01-01 00:00:00', '三')
+    status, new_etag, body = get('/api/total-count?pageSize=6', etag)
+    assert status == 200 and new_etag != etag and b'"count": 3' in body
+    assert get('/api/total-count?pageSize=6', new_etag)[0] == 304
+
@@ -0,0 +1,61 @@
+# 跳转定位：位置与时间线（datetime 倒序，同一时间 id 倒序）逐条数出来的一致，所在页包含目标记录
+import pytest
+
+PAGE_SIZE = 3
+# 同一时间的记录、跨年月和不同渠道混在一起
+RECORDS = [
+    {'datetime': datetime, 'content': f'第{index}条', 'channel': channel}
+    for index, (datetime, channel) in enumerate([
+        ('2020-01-05 08:00:00', '微博'),
+        ('2020-01-05 08:00:00', '饭否'),
+        ('2020-02-01 09:00:00', '微博'),
+        ('2019-12-31 23:59:59', '豆瓣'),
+        ('2020-02-01 09:00:00', '饭否'),
+        ('2020-03-15 12:00:00', '微博'),
+        ('2020-01-20 10:00:00', '微博'),
+        ('2019-11-11 11:11:11', '饭否'),
+    ])
+]
+
+
+@pytest.fixture(scope='module')
+def db(make_manager):
+    return make_manager(RECORDS, name='locate')
+
+
+@pytest.fixture(scope='module')
+def timeline_ids():
+    ordered = sorted(enumerate(RECORDS, start=1), key=lambda item: (item[1]['datetime'], item[0]), reverse=True)
+    return [record_id for record_id, _ in ordered]
+
+
+def test_record_position_matches_timeline(db, timeline_ids):
+    for position, record_id in enumerate(timeline_ids, start=1):
+        result = db.locate(record_id=record_id, page_size=PAGE_SIZE)
+        assert result['position'] == position
+        assert result['page'] == (position - 1) // PAGE_SIZE + 1
+        assert record_id in [record['id'] for record in result['records']]
+        assert result['total'] == len(RECORDS)
+
+
+@pytest.mark.parametrize('anchor', ['newest', 'oldest'])
+def test_year_month_jumps_to_edge_of_month(db, timeline_ids, anchor):
+    month_ids = [record_id for record_id in timeline_ids if RECORDS[record_id - 1]['datetime'].startswith('2020-01')]
+    result = db.locate(year_month='2020-01', page_size=PAGE_SIZE, anchor=anchor)
+    expected = month_ids[0] if anchor == 'newest' else month_ids[-1]
+    assert result['recordId'] == expected
+    assert result['total'] == len(month_ids)
+    assert result['globalPosition'] == timeline_ids.index(expected) + 1
+
+
+def test_channel_jumps_to_newest_record(db, timeline_ids):
+    channel_ids = [record_id for record_id in timeline_ids if RECORDS[record_id - 1]['channel'] == '饭否']
+    result = db.locate(channel='饭否', page_size=PAGE_SIZE)
+    assert result['recordId'] == channel_ids[0]
+    assert result['globalPosition'] == timeline_ids.index(channel_ids[0]) + 1
+
+
+def test_missing_targets_return_none(db):
+    assert db.locate(record_id=999) is None
+    assert db.locate(year_month='2001-01') is None
+    assert db.locate(channel='不存在') is None
@@ -0,0 +1,64 @@
+# 增量 VACUUM：每批释放 VACUUM_BATCH_PAGES 页，批次之间可以让出；未开启 INCREMENTAL 的数据库不做整体转换
+import sqlite3
+
+import pytest
+
+from backend import maintenance
+
+
+class StopAfter:
+    """前 batches 次返回 False，之后返回 True"""
+
+    def __init__(self, batches):
+        self.batches = batches
+
+    def __call__(self):
+        self.batches -= 1
+        return self.batches < 0
+
+
+def _fragmented(path, auto_vacuum):
+    conn = sqlite3.connect(path)
+    conn.execute(f'PRAGMA auto_vacuum = {auto_vacuum}')
+    conn.execute('CREATE TABLE JL (id INTEGER PRIMARY KEY, content TEXT)')
+    conn.executemany('INSERT INTO JL (content) VALUES (?)', [('x' * 2000,)] * 3000)
+    conn.commit()
+    conn.execute('DELETE FROM JL')
+    conn.commit()
+    return conn
+
+
+def _freelist(conn):
+    return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = _fragmented(str(tmp_path / 'SR.db'), 'INCREMENTAL')
+    yield conn
+    conn.close()
+
+
+def test_one_batch_frees_batch_size_pages(conn):
+    before = _freelist(conn)
+    assert before > 2 * maintenance.VACUUM_BATCH_PAGES
+    result = maintenance.incremental_vacuum(conn, StopAfter(1))
+    assert result == {'freed_pages': maintenance.VACUUM_BATCH_PAGES}
+    assert _freelist(conn) == before - maintenance.VACUUM_BATCH_PAGES
+
+
+def test_runs_until_freelist_is_empty(conn):
+    before = _freelist(conn)
+    assert maintenance.incremental_vacuum(conn, StopAfter(1000)) == {'freed_pages': before}
+    assert _freelist(conn) == 0
+
+
+def test_does_not_convert_without_request(tmp_path):
+    conn = _fragmented(str(tmp_path / 'SR.db'), 'NONE')
+    before = _freelist(conn)
+    assert maintenance.incremental_vacuum(conn, StopAfter(1000))['freed_pages'] == 0
+    assert _freelist(conn) == before
+    assert maintenance.convert_to_incremental(conn, StopAfter(0)) == {'converted': True, 'freed_pages': before}
+    assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == maintenance.AUTO_VACUUM_INCREMENTAL
+    assert _freelist(conn) == 0
+    conn.close()
@@ -0,0 +1,105 @@
+# 媒体文件头解析：用手工拼出的最小文件头检查各格式的宽高、EXIF 方向、视频时长和旋转，
+# 以及损坏文件只记录大小
+import struct
+
+import pytest
+
+from backend import media_meta
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _png(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sIIBBBBB', 13, b'IHDR', width, height, 8, 2, 0, 0, 0) + b'\x00' * 4
+
+
+def _gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00' * 24
+
+
+def _webp(chunk, payload):
+    body = b'WEBP' + chunk + struct.pack('<I', len(payload)) + payload
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def _jpeg(width, height, orientation=None):
+    data = b'\xff\xd8'
+    if orientation is not None:
+        exif = (b'Exif\x00\x00II' + struct.pack('<HIH', 42, 8, 1)
+                + struct.pack('<HHIHH', 0x0112, 3, 1, orientation, 0) + struct.pack('<I', 0))
+        data += b'\xff\xe1' + struct.pack('>H', len(exif) + 2) + exif
+    data += b'\xff\xdb' + struct.pack('>H', 4) + b'\x00\x00'
+    data += b'\xff\xc0' + struct.pack('>HBHHB', 17, 8, height, width, 3) + b'\x00' * 9
+    return data + b'\xff\xda' + b'\x00' * 16
+
+
+def _box(kind, payload):
+    return struct.pack('>I4s', len(payload) + 8, kind) + payload
+
+
+def _mp4(width, height, seconds, rotated=False):
+    mvhd = _box(b'mvhd', b'\x00' * 12 + struct.pack('>II', 1000, int(seconds * 1000)) + b'\x00' * 80)
+    a, b = (0, 0x10000) if rotated else (0x10000, 0)
+    tkhd = _box(b'tkhd', b'\x00' * 40 + struct.pack('>ii', a, b) + b'\x00' * 28
+                + struct.pack('>II', width << 16, height << 16))
+    hdlr = _box(b'hdlr', b'\x00' * 8 + b'vide' + b'\x00' * 12)
+    moov = _box(b'moov', mvhd + _box(b'trak', tkhd + _box(b'mdia', hdlr)))
+    # moov 放在 mdat 之后，解析时要按 box 头跳过去
+    return _box(b'ftyp', b'isom\x00\x00\x02\x00') + _box(b'mdat', b'\x00' * 4096) + moov
+
+
+@pytest.mark.parametrize('name, data, size', [
+    ('a.png', _png(640, 480), (640, 480)),
+    ('a.gif', _gif(320, 200), (320, 200)),
+    ('lossy.webp', _webp(b'VP8 ', b'\x00\x00\x00\x9d\x01\x2a' + struct.pack('<HH', 800, 600) + b'\x00' * 4), (800, 600)),
+    ('lossless.webp', _webp(b'VP8L', b'\x2f' + struct.pack('<I', (1023 - 1) | ((767 - 1) << 14)) + b'\x00' * 8),
+     (1023, 767)),
+    ('extended.webp', _webp(b'VP8X', b'\x00' * 4 + (1919).to_bytes(3, 'little') + (1079).to_bytes(3, 'little')),
+     (1920, 1080)),
+    ('a.jpg', _jpeg(1024, 768), (1024, 768)),
+    # EXIF 方向 6（顺时针旋转 90 度）：显示尺寸宽高互换
+    ('rotated.jpg', _jpeg(1024, 768, orientation=6), (768, 1024)),
+    ('upright.jpg', _jpeg(1024, 768, orientation=3), (1024, 768)),
+])
+def test_image_dimensions(tmp_path, name, data, size):
+    meta = media_meta.probe_file(_write(tmp_path, name, data))
+    assert (meta['width'], meta['height']) == size
+    assert meta['size'] == len(data) and meta['duration'] is None
+
+
+@pytest.mark.parametrize('rotated, size', [(False, (1280, 720)), (True, (720, 1280))])
+def test_video_dimensions_and_duration(tmp_path, rotated, size):
+    meta = media_meta.probe_file(_write(tmp_path, 'a.mp4', _mp4(1280, 720, 12.5, rotated)))
+    assert (meta['width'], meta['height'], meta['duration']) == size + (12.5,)
+    assert meta['placeholder'] is None
+
+
+@pytest.mark.parametrize('name, data', [
+    ('truncated.jpg', _jpeg(1024, 768)[:12]),
+    ('truncated.png', _png(640, 480)[:20]),
+    ('unknown.png', b'not an image at all'),
+])
+def test_damaged_files_keep_only_size(tmp_path, name, data):
+    meta = media_meta.probe_file(_write(tmp_path, name, data))
+    assert meta == dict.fromkeys(media_meta.META_FIELDS) | {'size': len(data)}
+
+
+def test_missing_file_returns_none(tmp_path):
+    assert media_meta.probe_file(str(tmp_path / 'missing.jpg')) is None
+
+
+def test_placeholder_grid_follows_orientation(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    path = str(tmp_path / 'tall.png')
+    # 上半红下半蓝的竖图：3x4 网格，首行偏红、末行偏蓝
+    image = Image.new('RGB', (30, 40), (255, 0, 0))
+    image.paste((0, 0, 255), (0, 20, 30, 40))
+    image.save(path)
+    placeholder = media_meta.probe_file(path)['placeholder']
+    grid, colors = placeholder.split(':')
+    assert grid == '3x4' and len(colors) == 3 * 4 * 6
+    assert colors[:6] == 'ff0000' and colors[-6:] == '0000ff'
@@ -0,0 +1,113 @@
+# 媒体完整性检查：缺失、孤立和与清单不符的文件；校验通过的文件大小写回 JL_media，
+# 写回后记录缓存和 ETag 随之失效
+import functools
+import hashlib
+import json
+import sqlite3
+import struct
+
+import pytest
+
+from backend import media_meta, media_scanner
+from backend.database import DatabaseManager
+
+RECORDS = [
+    {'content': '两张图', 'media_type': 'image', 'media_path': 'media/a.png,/media/sub/b.png'},
+    {'content': '一张丢了', 'media_type': 'image', 'media_path': 'media/missing.png'},
+]
+
+
+@pytest.fixture
+def library(make_db, tmp_path):
+    media_dir = tmp_path / 'media'
+    (media_dir / 'sub').mkdir(parents=True)
+    files = {'a.png': b'aaaa', 'sub/b.png': b'bbbbbb', 'orphan.png': b'o', 'listed-orphan.png': b'l'}
+    for name, data in files.items():
+        (media_dir / name).write_bytes(data)
+    manifest = tmp_path / 'media-manifest.json'
+    manifest.write_text(json.dumps({'files': [
+        {'path': 'media/a.png', 'size': 4, 'sha256': hashlib.sha256(b'aaaa').hexdigest()},
+        # 大小对但校验值不对
+        {'path': 'sub/b.png', 'size': 6, 'sha256': hashlib.sha256(b'other!').hexdigest()},
+        {'path': 'listed-orphan.png', 'size': 1},
+    ]}), encoding='utf-8')
+    return make_db(RECORDS, name='media-scan'), str(media_dir), str(manifest)
+
+
+def _scan(library, **kwargs):
+    path, media_dir, manifest = library
+    conn = sqlite3.connect(path)
+    try:
+        return media_scanner.scan_media(conn, media_dir, manifest, **kwargs)
+    finally:
+        conn.close()
+
+
+def test_scan_reports_missing_orphaned_and_corrupted(library):
+    report = _scan(library)
+    assert report['missing'] == [{'path': 'missing.png', 'record_ids': [2]}]
+    assert [(item['path'], item['in_manifest']) for item in report['orphaned']] == [
+        ('listed-orphan.png', True), ('orphan.png', False),
+    ]
+    assert [(item['path'], item['reason']) for item in report['corrupted']] == [('sub/b.png', 'sha256')]
+    assert report['hashed_count'] == 3
+    # 只有校验通过且被引用的 a.png 写回；再次检查没有变化
+    assert report['updated'] == 1
+    assert _scan(library)['updated'] == 0
+
+
+def test_size_only_scan_writes_nothing(library):
+    report = _scan(library, verify=False)
+    assert report['hashed_count'] == 0 and report['updated'] == 0 and report['corrupted'] == []
+
+
+def test_cleanup_keeps_files_listed_in_manifest(library, monkeypatch, tmp_path):
+    path, media_dir, manifest = library
+    monkeypatch.setattr(media_scanner, 'QUARANTINE_DIR', tmp_path / 'quarantine')
+    conn = sqlite3.connect(path)
+    try:
+        assert media_scanner.cleanup_orphans(conn, media_dir, manifest)['candidates'] == ['orphan.png']
+        result = media_scanner.cleanup_orphans(conn, media_dir, manifest, dry_run=False)
+    finally:
+        conn.close()
+    assert result['moved'] == ['orphan.png']
+    assert (tmp_path / 'media' / 'listed-orphan.png').exists()
+    assert not (tmp_path / 'media' / 'orphan.png').exists()
+
+
+def test_scan_refreshes_cached_records(library, monkeypatch):
+    path, media_dir, manifest = library
+    manager = DatabaseManager(db_path=path)
+    monkeypatch.setattr(media_scanner, 'scan_media',
+                        functools.partial(media_scanner.scan_media, media_dir=media_dir, manifest_path=manifest))
+    try:
+        assert manager.get_record(1)['media'][0]['size'] is None
+        version = manager.change_feed.version
+        assert manager.scan_media()['updated'] == 1
+        assert manager.change_feed.version == version + 1
+        assert manager.get_record(1)['media'][0]['size'] == 4
+    finally:
+        manager.close_connection()
+
+
+def test_backfilled_rows_are_filled_by_index_job(make_db, monkeypatch, tmp_path):
+    media_dir = tmp_path / 'media'
+    media_dir.mkdir()
+    (media_dir / 'a.png').write_bytes(
+        b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sIIBBBBB', 13, b'IHDR', 640, 480, 8, 2, 0, 0, 0) + b'\x00' * 4)
+
+    # jl_media 回填在写事务内执行，不能解析文件头
+    def fail(conn, paths, media_dir):
+        raise AssertionError(f'backfill probed {paths}')
+
+    monkeypatch.setattr(media_meta, 'lookup_or_probe', fail)
+    path = make_db([{'media_type': 'image', 'media_path': 'media/a.png'}], name='media-backfill')
+    monkeypatch.undo()
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('SELECT kind, size, width FROM JL_media').fetchall() == [('image', None, None)]
+        media_scanner.index_media_metadata(conn, str(media_dir))
+        assert conn.execute('SELECT width, height FROM JL_media').fetchall() == [(640, 480)]
+    finally:
+        conn.close()
@@ -0,0 +1,46 @@
+# 拼音搜索：全拼按音节存储，关键词只在音节边界上匹配，不会从音节中间命中（hang 不命中 zhang）
+import pytest
+
+from backend import normalize
+
+CONTENTS = ['张三来了', '航班延误', '臺灣的朋友', '西安很远', '先生你好', '中国，古老']
+
+
+@pytest.fixture(scope='module')
+def db(make_manager):
+    return make_manager(CONTENTS, name='normalize')
+
+
+def _search(db, keyword):
+    result = db.search_records(keyword, 1, 20)
+    return sorted(record['content'] for record in result['records'])
+
+
+def test_romanize_keeps_syllable_boundaries():
+    assert normalize.romanize('臺灣 iPhone 用户') == (' tai wan / yong hu ', 'tw yh')
+    assert normalize.romanize('iPhone') == ('', '')
+
+
+def test_segment_pinyin():
+    assert normalize.segment_pinyin('taiwan') == [['tai', 'wan']]
+    assert normalize.segment_pinyin('xian') == [['xian'], ['xi', 'an']]
+    assert normalize.segment_pinyin('iphone') == []
+
+
+@pytest.mark.parametrize('keyword, expected', [
+    ('hang', ['航班延误']),
+    ('zhang', ['张三来了']),
+    ('taiwan', ['臺灣的朋友']),
+    ('xian', ['先生你好', '西安很远']),
+    ('zs', ['张三来了']),
+    # 逗号隔开的两段不连成一个词
+    ('guogu', []),
+    ('台湾', ['臺灣的朋友']),
+])
+def test_pinyin_matches_on_syllable_boundaries(db, keyword, expected):
+    assert _search(db, keyword) == expected
+
+
+def test_pinyin_can_be_turned_off(db):
+    assert db.search_records('zhang', 1, 20, pinyin=False)['total'] == 0
+
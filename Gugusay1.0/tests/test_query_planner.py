@@ -0,0 +1,71 @@
+# 查询语言的执行计划：驱动索引用 INDEXED BY 指定，其余索引列加一元 + 排除，
+# 这里用 EXPLAIN QUERY PLAN 确认 SQLite 实际按规划器选定的索引执行
+import pytest
+
+RECORD_COUNT = 3000
+RARE_CHANNEL = '小众渠道'
+RARE_WORD = '蓝鲸搁浅事件'
+
+
+@pytest.fixture(scope='module')
+def db(make_manager):
+    records = []
+    for index in range(RECORD_COUNT):
+        year = 2010 + index // 12 % 10
+        month = 1 + index % 12
+        # 小众渠道和稀有词都只占 1%，日期按年月均匀分布
+        records.append({
+            'datetime': f'{year}-{month:02d}-{1 + index % 28:02d} 12:00:00',
+            'content': f'第{index}条 {RARE_WORD}' if index % 100 == 1 else f'第{index}条 日常记录',
+            'channel': RARE_CHANNEL if index % 100 == 0 else ('微博', '饭否', '豆瓣')[index % 3],
+        })
+    # 回填完成后全文索引就绪
+    return make_manager(records, name='planner')
+
+
+def _explain(db, text):
+    result = db.query_records(text, 1, 6, explain=True)
+    return result['plan']['driver'], ' | '.join(result['explain']), result['total']
+
+
+def test_date_range_uses_datetime_index(db):
+    driver, plan, total = _explain(db, 'after:2014-03 before:2014-05 日常')
+    assert driver == 'datetime'
+    assert 'idx_jl_datetime (datetime>? AND datetime<?)' in plan
+    assert total > 0
+
+
+def test_channel_uses_channel_index(db):
+    driver, plan, total = _explain(db, f'channel:{RARE_CHANNEL}')
+    assert driver == 'channel'
+    assert 'idx_jl_channel_datetime (channel=?)' in plan
+    assert total == RECORD_COUNT // 100
+
+
+def test_channel_driver_excludes_datetime_index(db):
+    # 渠道比日期区间更精确：日期条件加 +，不能被 SQLite 拿来当索引
+    driver, plan, total = _explain(db, f'channel:{RARE_CHANNEL} after:2011 before:2019')
+    assert driver == 'channel'
+    assert total > 0
+    assert 'idx_jl_channel_datetime (channel=?)' in plan
+    assert 'idx_jl_datetime' not in plan
+
+
+def test_negated_channel_does_not_drive(db):
+    driver, plan, _ = _explain(db, f'-channel:{RARE_CHANNEL}')
+    assert driver == 'scan'
+    assert 'idx_jl_channel_datetime' not in plan
+
+
+def test_keyword_uses_fulltext_index(db):
+    driver, plan, total = _explain(db, RARE_WORD)
+    assert driver == 'fulltext'
+    assert 'VIRTUAL TABLE INDEX' in plan and 'JL_fts' in plan
+    assert 'SCAN JL' not in plan.replace('SCAN JL_fts', '')
+    assert total == RECORD_COUNT // 100
+
+
+def test_short_keyword_falls_back_to_scan(db):
+    driver, plan, _ = _explain(db, '日常')
+    assert driver == 'scan'
+    assert 'JL_fts' not in plan
@@ -0,0 +1,48 @@
+# 记录缓存：按内存占用淘汰最久未用的记录，写入时丢弃受影响的记录和全部计数，读取期间发生写入时结果不入缓存
+from backend import record_cache
+
+
+def test_lru_evicts_by_weight():
+    cache = record_cache.LRUCache(10, weigher=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    assert cache.get('a') == 'xxxx'
+    cache.put('c', 'xxxx')
+    # b 最久未用，被淘汰；超过上限的单个值不放入
+    assert cache.get('b') is None
+    cache.put('d', 'x' * 11)
+    assert cache.get('d') is None
+    stats = cache.stats()
+    assert (stats['entries'], stats['weight'], stats['evictions']) == (2, 8, 1)
+
+
+def test_cached_records_are_copies():
+    cache = record_cache.RecordCache()
+    cache.put_record({'id': 1, 'content': '一', 'media': []}, cache.version)
+    cache.get_record(1)['content'] = '改了'
+    assert cache.get_record(1)['content'] == '一'
+
+
+def test_read_racing_a_write_is_not_cached():
+    cache = record_cache.RecordCache()
+    version = cache.version
+    cache.apply_write('update', 1, None, None)
+    cache.put_record({'id': 1, 'content': '旧'}, version)
+    assert cache.get_record(1) is None
+
+
+def test_writes_invalidate_records_and_counts(make_manager):
+    manager = make_manager(['一', '二'], name='record-cache')
+    assert manager.get_record(1)['content'] == '一'
+    assert manager.get_total_count(6)['count'] == 2
+    assert manager.get_record(1)['content'] == '一'
+    stats = manager.cache_stats()
+    assert stats['records']['hits'] == 1
+
+    manager.update_record(1, '2020-01-01 00:00:00', '一（改）')
+    manager.add_record('2020-01-02 00:00:00', '三')
+    assert manager.get_record(1)['content'] == '一（改）'
+    assert manager.get_total_count(6)['count'] == 3
+    manager.delete_record(2)
+    assert manager.get_record(2) is None
+    assert manager.get_total_count(6)['count'] == 2
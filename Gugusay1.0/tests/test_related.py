@@ -0,0 +1,47 @@
+# 相关推文索引：df 上限把所有共有二元组都过滤掉时放开上限，索引为空时在 stats() 中报告
+import sqlite3
+
+import pytest
+
+from backend import related
+
+
+@pytest.fixture
+def built(make_db):
+    opened = []
+
+    def build(contents):
+        path = make_db(contents, name='related')
+        index = related.RelatedIndex(path + '.related', lambda: sqlite3.connect(path))
+        conn = sqlite3.connect(path)
+        opened.append((index, conn))
+        return index, conn, index.rebuild()
+
+    yield build
+    for index, conn in opened:
+        index.close()
+        conn.close()
+
+
+def test_templated_corpus_relaxes_max_df(built):
+    # 300 条相同的正文（如模板化的签到）：每个共有二元组的 df 都超过 max(100, 5%)
+    index, conn, stats = built(['今天天气不错出去走走'] * 300)
+    assert stats['relaxed'] and stats['max_df'] == 300
+    assert stats['postings'] > 0
+    assert not index.stats()['empty']
+    assert len(index.related(conn, 1, limit=5)) == 5
+
+
+def test_regular_corpus_keeps_cutoff(built):
+    contents = [f'第{n}号公告 内容{n % 7}' for n in range(300)] + ['今天天气不错'] * 3
+    index, conn, stats = built(contents)
+    assert not stats['relaxed'] and stats['max_df'] == related.MIN_MAX_DF
+    assert index.stats()['last_build']['postings'] == stats['postings'] > 0
+    assert [other_id for other_id, _ in index.related(conn, 301, limit=2)] and not index.stats()['empty']
+
+
+def test_index_without_shared_terms_reports_empty(built):
+    index, conn, stats = built(['甲乙', '丙丁', '戊己'])
+    assert stats['postings'] == 0 and not stats['relaxed']
+    assert index.stats()['ready'] and index.stats()['empty']
+    assert index.related(conn, 1) == []
@@ -0,0 +1,40 @@
+# 调度器：空闲任务因界面忙碌中途停下时，恢复空闲后很快重试；只有完整跑完的任务才等一个完整周期
+import threading
+
+import pytest
+
+from backend.scheduler import Scheduler
+
+INTERVAL = 3600
+IDLE_AFTER = 0.05
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler(workers=1, idle_after=IDLE_AFTER)
+    scheduler.start()
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_interrupted_idle_job_retries_after_idle(scheduler):
+    runs = []
+    finished = threading.Event()
+
+    def task(job):
+        if not runs:
+            # 第一次运行时界面来了请求，任务在批次之间看到后停下
+            scheduler.request_started()
+            runs.append(job.should_stop())
+            scheduler.request_finished()
+        else:
+            runs.append(job.should_stop())
+            finished.set()
+
+    job = scheduler.every('daily', INTERVAL, task, initial_delay=0)
+    assert finished.wait(5), 'interrupted job was not retried'
+    assert runs == [True, False]
+    with scheduler._cond:
+        assert job.state == 'queued' and not job.interrupted
+        # 完整跑完后才等待一个完整周期
+        assert job.to_dict()['next_run_in'] > INTERVAL - 60
@@ -0,0 +1,52 @@
+# 搜索历史写缓冲：记录只改内存，flush 时批量落盘；删除一条后用较早的历史补足，重新加载后顺序不变
+import pytest
+
+from backend.search_history import SearchHistoryBuffer
+
+
+@pytest.fixture
+def db(make_manager):
+    return make_manager([], name='search-history')
+
+
+def _stored(db):
+    conn = db.get_connection()
+    return [row[0] for row in conn.execute('SELECT keyword FROM search_history ORDER BY search_datetime DESC, id DESC')]
+
+
+def _keywords(history):
+    return [item['keyword'] for item in history.get()]
+
+
+def test_writes_are_buffered_until_flush(db):
+    history = SearchHistoryBuffer(db._open_connection, limit=3)
+    for keyword in ('甲', '乙', '甲'):
+        history.record(keyword)
+    assert _keywords(history) == ['甲', '乙']
+    assert _stored(db) == []
+    assert history.flush() == 2
+    assert _stored(db) == ['甲', '乙']
+    assert history.flush() == 0
+
+
+def test_delete_backfills_from_older_history(db):
+    history = SearchHistoryBuffer(db._open_connection, limit=3)
+    for keyword in ('一', '二', '三', '四', '五'):
+        history.record(keyword)
+    assert _keywords(history) == ['五', '四', '三']
+    history.delete('四')
+    assert _keywords(history) == ['五', '三', '二']
+    history.flush()
+    assert '四' not in _stored(db)
+
+    # 重新从磁盘加载后顺序一致
+    history.reset()
+    assert _keywords(history) == ['五', '三', '二']
+
+
+def test_disk_is_trimmed_to_keep(db):
+    history = SearchHistoryBuffer(db._open_connection, limit=2)
+    for index in range(10):
+        history.record(f'关键词{index}')
+    history.flush()
+    assert _stored(db) == [f'关键词{index}' for index in range(9, 5, -1)]
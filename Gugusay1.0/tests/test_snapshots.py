@@ -0,0 +1,121 @@
+# 在线快照：写入进行中时备份，快照必须能打开且是某一时刻的一致状态
+import gzip
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from backend import snapshots
+
+
+def _open(path):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    path = str(tmp_path / 'SR.db')
+    conn = _open(path)
+    # 每个写事务同时插入一行并给计数加一：一致的快照中两者必然相等
+    conn.execute('CREATE TABLE JL (id INTEGER PRIMARY KEY, content TEXT)')
+    conn.execute('CREATE TABLE meta (count INTEGER)')
+    conn.execute('INSERT INTO meta VALUES (0)')
+    conn.executemany('INSERT INTO JL (content) VALUES (?)', [('x' * 500,)] * 2000)
+    conn.execute('UPDATE meta SET count = 2000')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _writer(path, stop, written):
+    conn = _open(path)
+    try:
+        while not stop.is_set():
+            conn.execute('INSERT INTO JL (content) VALUES (?)', ('y' * 500,))
+            conn.execute('UPDATE meta SET count = count + 1')
+            conn.commit()
+            written.append(1)
+    finally:
+        conn.close()
+
+
+def _check_snapshot(directory, name, target):
+    snapshots.extract_snapshot(name, target, directory)
+    conn = sqlite3.connect(target)
+    try:
+        assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        rows = conn.execute('SELECT COUNT(*) FROM JL').fetchone()[0]
+        count = conn.execute('SELECT count FROM meta').fetchone()[0]
+    finally:
+        conn.close()
+    assert rows == count
+    return rows
+
+
+def test_snapshot_during_writes_is_consistent(source_db, tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    stop = threading.Event()
+    written = []
+    writer = threading.Thread(target=_writer, args=(source_db, stop, written))
+    writer.start()
+    source = _open(source_db)
+    try:
+        # 每步只复制 1 页，保证备份跨越多次写入
+        info = snapshots.create_snapshot(source, directory=directory, pages=1)
+    finally:
+        stop.set()
+        writer.join()
+        source.close()
+
+    assert written, 'writer made no progress during the snapshot'
+    assert os.path.exists(os.path.join(directory, info['name']))
+    with gzip.open(os.path.join(directory, info['name'])) as f:
+        assert f.read(16) == b'SQLite format 3\x00'
+    rows = _check_snapshot(directory, info['name'], str(tmp_path / 'restored.db'))
+    assert 2000 <= rows <= 2000 + len(written)
+    # 只留下压缩后的快照，没有临时文件
+    assert os.listdir(directory) == [info['name']]
+
+
+def test_cancelled_snapshot_leaves_no_files(source_db, tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    source = _open(source_db)
+    try:
+        with pytest.raises(snapshots.SnapshotCancelled):
+            snapshots.create_snapshot(source, directory=directory, pages=1, should_stop=lambda: True)
+    finally:
+        source.close()
+    assert os.listdir(directory) == []
+
+
+def test_rotation_keeps_newest(source_db, tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    source = _open(source_db)
+    try:
+        names = [snapshots.create_snapshot(source, directory=directory, keep=2)['name'] for _ in range(3)]
+    finally:
+        source.close()
+    remaining = [item['name'] for item in snapshots.list_snapshots(directory)]
+    assert len(remaining) == 2
+    assert names[-1] in remaining
+
+
+def test_restore_round_trip_on_migrated_database(make_manager, tmp_path):
+    # 完整迁移过的数据库：快照之后的写入在恢复后消失，恢复后的库仍可正常查询
+    manager = make_manager(['一', '二'], name='snapshot')
+    directory = str(tmp_path / 'snapshots')
+    source = manager._open_connection()
+    try:
+        info = snapshots.create_snapshot(source, directory=directory)
+    finally:
+        source.close()
+    manager.add_record('2021-01-01 00:00:00', '快照之后')
+    assert manager.get_total_count(6)['count'] == 3
+
+    restored = snapshots.extract_snapshot(info['name'], str(tmp_path / 'restored.db'), directory)
+    assert manager.swap_database(restored)['success']
+    assert manager.get_total_count(6)['count'] == 2
+    assert [record['content'] for record in manager.search_records('二', 1, 6)['records']] == ['二']
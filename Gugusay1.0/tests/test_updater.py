@@ -0,0 +1,237 @@
+# 更新流程：本地 http.server 充当发布源，覆盖清单的条件请求、下载后热替换数据库，
+# 以及下载损坏或中断时旧数据库保持不变
+import hashlib
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend import database, migrations, update_manager as um, updater_client
+
+
+def _make_db(path, contents):
+    conn = sqlite3.connect(path)
+    migrations.apply_migrations(conn)
+    conn.executemany(
+        "INSERT INTO JL (datetime, content, channel) VALUES (?, ?, '')",
+        [(f"2020-01-{index + 1:02d} 00:00:00", content) for index, content in enumerate(contents)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _contents(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT content FROM JL ORDER BY id")]
+    finally:
+        conn.close()
+
+
+class ReleaseServer:
+    """提供 version.json 和资源文件；mode 用于故意损坏数据库的下载"""
+
+    def __init__(self):
+        self.files = {}
+        self.mode = "ok"
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                body = server.files.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                if self.path.endswith(".db") and server.mode == "corrupt":
+                    body = body[:-1] + bytes([body[-1] ^ 0xFF])
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                if self.path.endswith(".db") and server.mode == "truncated":
+                    # 声明完整长度，只发一半就断开连接
+                    self.wfile.write(body[: len(body) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def publish(self, version, db_bytes):
+        self.files["/SR.db"] = db_bytes
+        self.files["/version.json"] = json.dumps({
+            "manifest_version": 2,
+            "version": version,
+            "assets": [{
+                "kind": "database",
+                "name": "SR.db",
+                "url": self.url + "/SR.db",
+                "sha256": hashlib.sha256(db_bytes).hexdigest(),
+            }],
+        }).encode("utf-8")
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def release():
+    server = ReleaseServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch, release):
+    """指向临时数据目录和本地发布源的 UpdateManager 与 DatabaseManager"""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    db_path = str(data_dir / "SR.db")
+    _make_db(db_path, ["old"])
+    for name, value in {
+        "DATA_DIR": str(data_dir),
+        "DB_PATH": db_path,
+        "MEDIA_DIR": str(tmp_path / "media"),
+        "CONFIG_PATH": data_dir / "update_config.json",
+        "VERSION_PATH": data_dir / "version.txt",
+        "TASK_PATH": data_dir / "update_install_task.json",
+        "STAGING_ROOT": data_dir / "update_staging",
+        "MANIFEST_CACHE_PATH": data_dir / "update_manifest_cache.json",
+    }.items():
+        monkeypatch.setattr(um, name, value)
+    manager = database.DatabaseManager(db_path=db_path)
+    monkeypatch.setattr(database, "db_manager", manager)
+    # 本地发布源只有 http：只在测试里放行它，生产代码仍然只接受 https
+    monkeypatch.setattr(um, "_is_secure_url", lambda url: (url or "").startswith(release.url + "/"))
+    updates = um.UpdateManager()
+    monkeypatch.setattr(updates, "_manifest_url", lambda: release.url + "/version.json")
+
+    new_db = str(tmp_path / "release.db")
+    _make_db(new_db, ["new 1", "new 2"])
+    with open(new_db, "rb") as f:
+        release.publish("2.0.0", f.read())
+    yield updates, manager, data_dir
+    manager.close_connection()
+
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1:8000/version.json", "http://localhost/SR.db", "ftp://example.com/SR.db", ""])
+def test_only_https_sources_are_accepted(url):
+    assert not um._is_secure_url(url)
+    assert um._is_secure_url("https://github.com/owner/repo/releases/latest/download/version.json")
+
+
+def test_manifest_refresh_uses_conditional_request(env, release):
+    updates, _, _ = env
+    first = updates.refresh()
+    assert first["success"] and first["has_update"] and not first["not_modified"]
+    second = updates.refresh()
+    assert second["success"] and second["not_modified"]
+    assert second["remote_version"] == "2.0.0"
+    etags = [etag for path, etag in release.requests if path == "/version.json"]
+    assert etags[0] is None and etags[1]
+
+
+def test_start_update_swaps_database_live(env):
+    updates, manager, data_dir = env
+    assert manager.get_total_count(6)["count"] == 1
+
+    result = updates.start_update()
+
+    assert result["success"] and result["applied_live"], result
+    assert _contents(manager.db_path) == ["new 1", "new 2"]
+    assert manager.get_total_count(6)["count"] == 2
+    assert _contents(manager.db_path + ".backup") == ["old"]
+    assert (data_dir / "version.txt").read_text(encoding="utf-8") == "2.0.0"
+    assert not (data_dir / "update_install_task.json").exists()
+    assert not list((data_dir / "update_staging").iterdir())
+
+
+@pytest.mark.parametrize("mode", ["corrupt", "truncated"])
+def test_bad_download_keeps_old_database(env, release, mode):
+    updates, manager, data_dir = env
+    release.mode = mode
+
+    result = updates.start_update()
+
+    assert not result["success"]
+    assert _contents(manager.db_path) == ["old"]
+    assert manager.get_total_count(6)["count"] == 1
+    assert not (data_dir / "version.txt").exists()
+    assert not (data_dir / "update_install_task.json").exists()
+    assert not list((data_dir / "update_staging").iterdir())
+
+
+def _task(tmp_path, db_path, source):
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    return {
+        "version": "3.0.0",
+        "staging_dir": str(staging),
+        "assets": [{"kind": "database", "name": "SR.db", "path": source}],
+        "db_path": db_path,
+        "media_dir": str(tmp_path / "media"),
+        "version_file": str(tmp_path / "version.txt"),
+    }
+
+
+def test_apply_update_copies_database_with_backup(tmp_path):
+    db_path, source = str(tmp_path / "SR.db"), str(tmp_path / "release.db")
+    _make_db(db_path, ["old"])
+    _make_db(source, ["new"])
+    task = _task(tmp_path, db_path, source)
+
+    updater_client.apply_update(task)
+
+    assert _contents(db_path) == ["new"]
+    assert _contents(db_path + ".backup") == ["old"]
+    assert (tmp_path / "version.txt").read_text(encoding="utf-8") == "3.0.0"
+    assert not (tmp_path / "staging").exists()
+
+
+def test_apply_update_calls_replace_database_hook(tmp_path):
+    db_path, source = str(tmp_path / "SR.db"), str(tmp_path / "release.db")
+    _make_db(db_path, ["old"])
+    _make_db(source, ["new"])
+    calls = []
+
+    def replace_database(src, backup):
+        calls.append((src, backup))
+        return {"success": True}
+
+    updater_client.apply_update(_task(tmp_path, db_path, source), replace_database=replace_database)
+
+    # 替换由钩子负责，apply_update 自己不能再复制文件
+    assert calls == [(source, db_path + ".backup")]
+    assert _contents(db_path) == ["old"]
+    assert (tmp_path / "version.txt").read_text(encoding="utf-8") == "3.0.0"
+
+
+def test_apply_update_stops_when_hook_fails(tmp_path):
+    db_path, source = str(tmp_path / "SR.db"), str(tmp_path / "release.db")
+    _make_db(db_path, ["old"])
+    _make_db(source, ["new"])
+
+    with pytest.raises(RuntimeError, match="database swap failed"):
+        updater_client.apply_update(
+            _task(tmp_path, db_path, source),
+            replace_database=lambda src, backup: {"success": False, "error": "busy"},
+        )
+
+    assert _contents(db_path) == ["old"]
+    assert not (tmp_path / "version.txt").exists()
@@ -6,14 +6,271 @@ import { globalState } from '../modules/globalState.js';
  */
 const API_BASE = '/api';
 
+// 响应缓存最多保留的 URL 数，超出时淘汰最久未用的
+const RESPONSE_CACHE_SIZE = 100;
+// 耗时样本攒够这么多条或每隔 METRICS_FLUSH_INTERVAL 毫秒上报一次
+const METRICS_BATCH_SIZE = 20;
+const METRICS_FLUSH_INTERVAL = 30 * 1000;
+
+// 进行中的 GET 请求：key -> { promise, controller, owners }，相同 key 的调用共享同一个请求
+const inflight = new Map();
+// 请求槽：slot -> key，同一槽位发起新请求时放弃旧请求（如翻页、搜索输入）
+const slots = new Map();
+// 带 ETag 的响应缓存：url -> { etag, data }，Map 按插入顺序实现 LRU
+const responseCache = new Map();
+// js_api 桥接返回 unsupported 的接口（按 endpointOf 聚合），之后直接走 HTTP
+const bridgeUnsupported = new Set();
+let timingSamples = [];
+let flushTimer = null;
+
+/**
+ * 请求是否因被新请求取代而中止，调用方应静默忽略
+ * @param {Error} error - 捕获的错误
+ * @returns {boolean}
+ */
+export function isAbortError(error) {
+    return !!error && error.name === 'AbortError';
+}
+
+function endpointOf(url) {
+    // 按接口聚合耗时，去掉查询参数和路径中的 id
+    return new URL(url, window.location.origin).pathname.replace(/\/\d+(?=\/|$)/g, '/:id');
+}
+
+function recordTiming(url, started, source) {
+    timingSamples.push({ endpoint: endpointOf(url), ms: Math.round((performance.now() - started) * 10) / 10, source });
+    if (timingSamples.length >= METRICS_BATCH_SIZE) {
+        flushTimings();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(flushTimings, METRICS_FLUSH_INTERVAL);
+    }
+}
+
 /**
- * 通用API请求函数
+ * 把积累的耗时样本上报到 /api/metrics（页面隐藏时也会调用）
+ */
+export function flushTimings() {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+    if (timingSamples.length === 0) return;
+    const body = JSON.stringify({ samples: timingSamples });
+    timingSamples = [];
+    if (navigator.sendBeacon && navigator.sendBeacon(`${API_BASE}/metrics`, new Blob([body], { type: 'application/json' }))) {
+        return;
+    }
+    fetch(`${API_BASE}/metrics`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body, keepalive: true })
+        .catch(() => {});
+}
+
+if (typeof window !== 'undefined') {
+    window.addEventListener('pagehide', flushTimings);
+    // 在开发者工具控制台中比较桥接与 HTTP 的耗时
+    window.benchmarkBridge = benchmarkBridge;
+}
+
+function rememberResponse(url, etag, data) {
+    responseCache.delete(url);
+    responseCache.set(url, { etag, data });
+    while (responseCache.size > RESPONSE_CACHE_SIZE) {
+        responseCache.delete(responseCache.keys().next().value);
+    }
+}
+
+/**
+ * pywebview 注入的 js_api（打包后的窗口中存在；在浏览器中调试时为 null，全部走 HTTP）
+ * @returns {object|null}
+ */
+function bridgeApi() {
+    const api = typeof window !== 'undefined' && window.pywebview && window.pywebview.api;
+    return api && typeof api.request === 'function' ? api : null;
+}
+
+function abortable(promise, signal) {
+    // 桥接调用无法真正取消：被新请求取代时直接以 AbortError 结束，之后到达的结果丢弃
+    return new Promise((resolve, reject) => {
+        const onAbort = () => reject(new DOMException('The operation was aborted.', 'AbortError'));
+        if (signal.aborted) {
+            onAbort();
+            return;
+        }
+        signal.addEventListener('abort', onAbort, { once: true });
+        promise.then(resolve, reject).finally(() => signal.removeEventListener('abort', onAbort));
+    });
+}
+
+async function sendBridgeRequest(api, url, signal) {
+    const started = performance.now();
+    let result;
+    try {
+        result = await abortable(api.request(url), signal);
+    } catch (error) {
+        recordTiming(url, started, isAbortError(error) ? 'aborted' : 'error');
+        throw error;
+    }
+    if (result && result.unsupported) {
+        bridgeUnsupported.add(endpointOf(url));
+        return sendHttpRequest(url, signal);
+    }
+    if (!result || result.status !== 200) {
+        recordTiming(url, started, 'error');
+        const error = new Error((result && result.error) || 'bridge error');
+        error.status = result ? result.status : 500;
+        throw error;
+    }
+    recordTiming(url, started, 'bridge');
+    return result.data;
+}
+
+function sendRequest(url, signal) {
+    const api = bridgeApi();
+    if (api && !bridgeUnsupported.has(endpointOf(url))) {
+        return sendBridgeRequest(api, url, signal);
+    }
+    return sendHttpRequest(url, signal);
+}
+
+async function sendHttpRequest(url, signal) {
+    const started = performance.now();
+    const cached = responseCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    let response;
+    try {
+        // 自己处理 ETag，不让浏览器缓存再保存一份
+        response = await fetch(url, { headers, signal, cache: 'no-store' });
+    } catch (error) {
+        recordTiming(url, started, isAbortError(error) ? 'aborted' : 'error');
+        throw error;
+    }
+    if (response.status === 304 && cached) {
+        rememberResponse(url, cached.etag, cached.data);
+        recordTiming(url, started, 'revalidated');
+        return cached.data;
+    }
+    if (!response.ok) {
+        recordTiming(url, started, 'error');
+        // 接口返回的 { error } 作为错误信息（如查询语法错误）
+        const body = await response.json().catch(() => null);
+        const error = new Error((body && body.error) || `HTTP error! status: ${response.status}`);
+        error.status = response.status;
+        throw error;
+    }
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        rememberResponse(url, etag, data);
+    }
+    recordTiming(url, started, 'network');
+    return data;
+}
+
+function releaseOwner(key) {
+    const entry = inflight.get(key);
+    if (entry && --entry.owners <= 0) {
+        entry.controller.abort();
+        inflight.delete(key);
+    }
+}
+
+/**
+ * GET 一个 JSON 接口：相同 URL 的并发请求只发一次；带上次的 ETag 重新验证，304 时直接返回缓存结果
+ * 在 pywebview 窗口中，桥接支持的只读接口经 js_api 直接调用，不走 HTTP
+ * @param {string} url - 完整的 /api/... 地址
+ * @param {object} options - { slot }：同一槽位的新请求会中止仍在进行的旧请求（旧调用以 AbortError 结束）
+ * @returns {Promise} 返回解析后的 JSON
+ */
+export function requestJSON(url, { slot = null } = {}) {
+    if (slot) {
+        const previous = slots.get(slot);
+        if (previous === url) {
+            return inflight.has(url) ? inflight.get(url).promise : startRequest(url, slot);
+        }
+        cancelRequest(slot);
+    }
+    return startRequest(url, slot);
+}
+
+/**
+ * 放弃槽位上仍在进行的请求
+ * @param {string} slot - requestJSON 使用的槽位名
+ */
+export function cancelRequest(slot) {
+    const previous = slots.get(slot);
+    if (previous) {
+        slots.delete(slot);
+        releaseOwner(previous);
+    }
+}
+
+function startRequest(url, slot) {
+    let entry = inflight.get(url);
+    if (entry) {
+        entry.owners += 1;
+        recordTiming(url, performance.now(), 'deduped');
+    } else {
+        const controller = new AbortController();
+        entry = { controller, owners: 1, promise: null };
+        entry.promise = sendRequest(url, controller.signal).finally(() => {
+            if (inflight.get(url) === entry) {
+                inflight.delete(url);
+            }
+            if (slot && slots.get(slot) === url) {
+                slots.delete(slot);
+            }
+        });
+        inflight.set(url, entry);
+    }
+    if (slot) {
+        slots.set(slot, url);
+    }
+    return entry.promise;
+}
+
+function summarizeTimings(values) {
+    const sorted = [...values].sort((a, b) => a - b);
+    const pick = fraction => Math.round(sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * fraction))] * 10) / 10;
+    const avg = values.reduce((sum, value) => sum + value, 0) / (values.length || 1);
+    return { p50: pick(0.5), p95: pick(0.95), avg: Math.round(avg * 10) / 10 };
+}
+
+/**
+ * 对同一个 GET 接口交替经 js_api 桥接和 HTTP 请求，比较两者的耗时（毫秒）
+ * HTTP 请求不带 ETag 也不经过响应缓存，两边都包含完整的查询和 JSON 传输
+ * @param {string} url - 完整的 /api/... 地址，须是桥接支持的接口
+ * @param {number} rounds - 轮数
+ * @returns {Promise} 返回 { url, rounds, bridge: { p50, p95, avg }, http: { p50, p95, avg } }
+ */
+export async function benchmarkBridge(url = `${API_BASE}/total-count`, rounds = 20) {
+    const api = bridgeApi();
+    if (!api) {
+        throw new Error('pywebview js_api 不可用');
+    }
+    const timings = { bridge: [], http: [] };
+    for (let round = 0; round < rounds; round++) {
+        let started = performance.now();
+        const result = await api.request(url);
+        if (result && result.unsupported) {
+            throw new Error(`桥接不支持该接口: ${url}`);
+        }
+        timings.bridge.push(performance.now() - started);
+        started = performance.now();
+        const response = await fetch(url, { cache: 'no-store' });
+        await response.json();
+        timings.http.push(performance.now() - started);
+    }
+    return { url, rounds, bridge: summarizeTimings(timings.bridge), http: summarizeTimings(timings.http) };
+}
+
+/**
+ * 通用API请求函数（GET 请求经过 requestJSON 合并与 ETag 缓存）
  * @param {string} endpoint - API端点
  * @param {object} options - 请求选项
  * @returns {Promise} 返回Promise对象
  */
 export async function apiRequest(endpoint, options = {}) {
     const url = `${API_BASE}${endpoint}`;
+    if (!options.method || options.method === 'GET') {
+        return requestJSON(url, options);
+    }
     const defaultOptions = {
         headers: {
             'Content-Type': 'application/json'
@@ -192,6 +449,22 @@ export async function getRecordPage(recordId, pageSize) {
     return apiRequest(`/record/${recordId}?pageSize=${pageSize}`);
 }
 
+/**
+ * 一次请求定位记录、年月或渠道：返回位置、所在页以及该页记录
+ * @param {object} target - { record } / { yearMonth } / { channel }，可带 anchor: 'newest' | 'oldest'
+ * @param {number} pageSize - 每页大小
+ * @returns {Promise} 返回 { position, globalPosition, page, totalPages, total, records }
+ */
+export async function locate(target, pageSize) {
+    const params = new URLSearchParams({ pageSize: String(pageSize) });
+    Object.entries(target).forEach(([key, value]) => {
+        if (value !== undefined && value !== null) {
+            params.set(key, String(value));
+        }
+    });
+    return apiRequest(`/locate?${params.toString()}`);
+}
+
 /**
  * 获取摘要统计
  * @returns {Promise} 返回摘要统计数据
@@ -319,6 +592,11 @@ export function formatRecords(records) {
 
 export default {
     apiRequest,
+    requestJSON,
+    cancelRequest,
+    isAbortError,
+    flushTimings,
+    benchmarkBridge,
     getRecords,
     getRecord,
     addRecord,
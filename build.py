@@ -1,3 +1,8 @@
+import argparse
+import gzip
+import hashlib
+import json
+import re
 import subprocess
 import sys
 from pathlib import Path
@@ -5,6 +10,377 @@ from pathlib import Path
 
 ROOT = Path(__file__).parent.resolve()
 SRC = ROOT / "Gugusay1.0"
+ASSETS = SRC / "assets"
+
+ENTRY_HTML = "index.html"
+ENTRY_SCRIPT = "scripts.js"
+STYLESHEETS = ["styles.css", "styles/navigationSidebar.css"]
+FINGERPRINT_LEN = 10
+# Runtime dependencies the backend imports lazily, as {import name: pip name}. They are
+# installed before building and passed as hidden imports so the bundle always contains them.
+BUNDLED_PACKAGES = {
+    "PIL": "Pillow",
+    "numpy": "numpy",
+}
+HIDDEN_IMPORTS = ["PIL.Image", "PIL.ImageOps", "numpy"]
+
+STATIC_IMPORT_RE = re.compile(
+    r"^[ \t]*import\s+(?:(\{[^}]*\})\s+from\s+)?['\"]([^'\"]+)['\"]\s*;?[ \t]*$",
+    re.MULTILINE,
+)
+DYNAMIC_IMPORT_RE = re.compile(r"\bimport\(\s*['\"]([^'\"]+)['\"]\s*\)")
+EXPORT_DECL_RE = re.compile(
+    r"^([ \t]*)export\s+(?=(?:async\s+)?function\b|const\b|let\b|var\b|class\b)",
+    re.MULTILINE,
+)
+EXPORT_NAME_RE = re.compile(r"^(?:async\s+)?(?:function\*?|const|let|var|class)\s+([A-Za-z_$][\w$]*)")
+EXPORT_LIST_RE = re.compile(r"^[ \t]*export\s*(\{[^}]*\})\s*;?[ \t]*$", re.MULTILINE)
+EXPORT_DEFAULT_RE = re.compile(r"^([ \t]*)export\s+default\s+", re.MULTILINE)
+FUNCTION_DECL_RE = re.compile(r"^[ \t]*(?:export\s+)?(?:async\s+)?function\*?\s+([A-Za-z_$][\w$]*)", re.MULTILINE)
+
+# Characters after which a "/" starts a regex literal rather than a division.
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await"}
+
+BUNDLE_PRELUDE = """(function () {
+'use strict';
+const __modules = {};
+const __cache = {};
+function __require(key) {
+    const cached = __cache[key];
+    if (cached) {
+        return cached;
+    }
+    const exports = {};
+    __cache[key] = exports;
+    __modules[key](exports, __require, __import);
+    return exports;
+}
+function __import(key) {
+    try {
+        return Promise.resolve(__require(key));
+    } catch (error) {
+        return Promise.reject(error);
+    }
+}
+function __export(exports, getters) {
+    Object.keys(getters).forEach((name) => {
+        Object.defineProperty(exports, name, { enumerable: true, get: getters[name] });
+    });
+}
+"""
+
+
+def _read_text(path: Path) -> str:
+    return path.read_text(encoding="utf-8-sig")
+
+
+def _module_key(path: Path) -> str:
+    return path.resolve().relative_to(SRC).as_posix()
+
+
+def _resolve_specifier(specifier: str, importer: Path) -> Path:
+    if not specifier.startswith("."):
+        raise ValueError(f"bare module specifier not supported: {specifier} (in {_module_key(importer)})")
+    target = (importer.parent / specifier).resolve()
+    if not target.is_file():
+        raise FileNotFoundError(f"module not found: {specifier} (in {_module_key(importer)})")
+    return target
+
+
+def _parse_import_names(clause: str) -> list[tuple[str, str]]:
+    names = []
+    for item in clause.strip("{} \n\t").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split()
+        if len(parts) == 3 and parts[1] == "as":
+            names.append((parts[0], parts[2]))
+        else:
+            names.append((parts[0], parts[0]))
+    return names
+
+
+def collect_module_graph(entry: Path) -> dict[str, dict]:
+    """Walk the static and dynamic import graph starting at the entry script."""
+    graph: dict[str, dict] = {}
+    pending = [entry.resolve()]
+    while pending:
+        path = pending.pop()
+        key = _module_key(path)
+        if key in graph:
+            continue
+        source = _read_text(path)
+        imports = []
+        for match in STATIC_IMPORT_RE.finditer(source):
+            target = _resolve_specifier(match.group(2), path)
+            names = _parse_import_names(match.group(1)) if match.group(1) else []
+            imports.append((_module_key(target), names))
+            pending.append(target)
+        for match in DYNAMIC_IMPORT_RE.finditer(source):
+            pending.append(_resolve_specifier(match.group(1), path))
+        graph[key] = {"path": path, "source": source, "imports": imports}
+    return graph
+
+
+def _check_cycles(graph: dict[str, dict], entry_key: str) -> None:
+    """Imports are bound when the importing module runs, so a cyclic import may
+    only reference hoisted function declarations of a module still loading."""
+    functions = {key: set(FUNCTION_DECL_RE.findall(mod["source"])) for key, mod in graph.items()}
+    loading: list[str] = []
+    done: set[str] = set()
+
+    def visit(key):
+        loading.append(key)
+        for target, names in graph[key]["imports"]:
+            if target in loading:
+                unsafe = [name for name, _ in names if name not in functions[target]]
+                if unsafe:
+                    raise ValueError(f"cyclic import of non-function binding(s) {unsafe}: {key} -> {target}")
+            elif target not in done:
+                visit(target)
+        loading.pop()
+        done.add(key)
+
+    visit(entry_key)
+    for key in graph:
+        if key not in done:
+            visit(key)
+
+
+def transform_module(key: str, module: dict) -> str:
+    """Rewrite one ES module into a factory function of the bundle runtime."""
+    source = module["source"]
+    path = module["path"]
+    exports: dict[str, str] = {}
+
+    def replace_import(match):
+        target = _module_key(_resolve_specifier(match.group(2), path))
+        if not match.group(1):
+            return f"__require('{target}');"
+        names = _parse_import_names(match.group(1))
+        bindings = ", ".join(name if name == local else f"{name}: {local}" for name, local in names)
+        return f"const {{ {bindings} }} = __require('{target}');"
+
+    def replace_dynamic_import(match):
+        return f"__import('{_module_key(_resolve_specifier(match.group(1), path))}')"
+
+    def replace_export_decl(match):
+        declaration = match.string[match.end():match.end() + 200]
+        name = EXPORT_NAME_RE.match(declaration)
+        if name:
+            exports[name.group(1)] = name.group(1)
+        return match.group(1)
+
+    def replace_export_list(match):
+        for name, exported in _parse_import_names(match.group(1)):
+            exports[exported] = name
+        return ""
+
+    def replace_export_default(match):
+        exports["default"] = "__default"
+        return f"{match.group(1)}const __default = "
+
+    source = STATIC_IMPORT_RE.sub(replace_import, source)
+    source = DYNAMIC_IMPORT_RE.sub(replace_dynamic_import, source)
+    source = EXPORT_DECL_RE.sub(replace_export_decl, source)
+    source = EXPORT_LIST_RE.sub(replace_export_list, source)
+    source = EXPORT_DEFAULT_RE.sub(replace_export_default, source)
+
+    getters = ", ".join(f"{exported}: () => {local}" for exported, local in exports.items())
+    return (
+        f"__modules['{key}'] = function (__exports, __require, __import) {{\n"
+        f"__export(__exports, {{ {getters} }});\n"
+        f"{source}\n"
+        f"}};\n"
+    )
+
+
+def minify_js(source: str) -> str:
+    """Drop comments, indentation and blank lines while keeping line breaks,
+    so automatic semicolon insertion behaves exactly as in the source."""
+    out: list[str] = []
+    i = 0
+    n = len(source)
+    templates: list[int] = []  # brace depth at which each open template resumes
+    depth = 0
+    last_significant = ""
+    last_word = ""
+
+    def newline():
+        while out and out[-1] in (" ", "\t"):
+            out.pop()
+        if out and out[-1] != "\n":
+            out.append("\n")
+
+    while i < n:
+        ch = source[i]
+        nxt = source[i + 1] if i + 1 < n else ""
+
+        if ch == "/" and nxt == "/":
+            end = source.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if ch == "/" and nxt == "*":
+            end = source.find("*/", i + 2)
+            comment = source[i:n if end < 0 else end + 2]
+            i = n if end < 0 else end + 2
+            if "\n" in comment:
+                newline()
+            elif out and out[-1] not in (" ", "\n"):
+                out.append(" ")
+            continue
+        if ch in ("'", '"'):
+            start = i
+            i += 1
+            while i < n and source[i] != ch:
+                i += 2 if source[i] == "\\" else 1
+            i += 1
+            out.append(source[start:i])
+            last_significant, last_word = ch, ""
+            continue
+        if ch == "`" or (ch == "}" and templates and templates[-1] == depth):
+            if ch == "}":
+                templates.pop()
+            start = i
+            i += 1
+            while i < n:
+                if source[i] == "\\":
+                    i += 2
+                    continue
+                if source[i] == "`":
+                    i += 1
+                    break
+                if source[i] == "$" and i + 1 < n and source[i + 1] == "{":
+                    i += 2
+                    templates.append(depth)
+                    break
+                i += 1
+            out.append(source[start:i])
+            last_significant, last_word = "`", ""
+            continue
+        if ch == "/" and (last_significant in REGEX_PRECEDERS or last_significant == "" or last_word in REGEX_KEYWORDS):
+            start = i
+            i += 1
+            in_class = False
+            while i < n and source[i] != "\n":
+                c = source[i]
+                if c == "\\":
+                    i += 2
+                    continue
+                if c == "[":
+                    in_class = True
+                elif c == "]":
+                    in_class = False
+                elif c == "/" and not in_class:
+                    i += 1
+                    break
+                i += 1
+            while i < n and (source[i].isalnum() or source[i] == "_"):
+                i += 1
+            out.append(source[start:i])
+            last_significant, last_word = "/", ""
+            continue
+        if ch == "\n":
+            newline()
+            i += 1
+            while i < n and source[i] in (" ", "\t", "\r"):
+                i += 1
+            continue
+        if ch in (" ", "\t", "\r"):
+            if out and out[-1] not in (" ", "\n"):
+                out.append(" ")
+            i += 1
+            continue
+
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+        if ch.isalnum() or ch in "_$":
+            start = i
+            while i < n and (source[i].isalnum() or source[i] in "_$"):
+                i += 1
+            word = source[start:i]
+            out.append(word)
+            last_significant, last_word = word[-1], word
+            continue
+        out.append(ch)
+        last_significant, last_word = ch, ""
+        i += 1
+
+    return "".join(out).lstrip("\n")
+
+
+def minify_css(source: str) -> str:
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.DOTALL)
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def _fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:FINGERPRINT_LEN]
+
+
+def _write_asset(stem: str, suffix: str, text: str) -> str:
+    data = text.encode("utf-8")
+    name = f"{stem}.{_fingerprint(data)}{suffix}"
+    (ASSETS / name).write_bytes(data)
+    (ASSETS / f"{name}.gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    return name
+
+
+def bundle_frontend() -> dict:
+    """Bundle the module graph and stylesheets into fingerprinted, precompressed
+    files under assets/ and write an index.html that references them."""
+    entry = SRC / ENTRY_SCRIPT
+    graph = collect_module_graph(entry)
+    entry_key = _module_key(entry)
+    _check_cycles(graph, entry_key)
+
+    script = BUNDLE_PRELUDE
+    for key in sorted(graph):
+        script += transform_module(key, graph[key])
+    script += f"__require('{entry_key}');\n}})();\n"
+    script = minify_js(script)
+
+    styles = "".join(minify_css(_read_text(SRC / name)) for name in STYLESHEETS)
+
+    ASSETS.mkdir(parents=True, exist_ok=True)
+    for old in ASSETS.iterdir():
+        if old.is_file():
+            old.unlink()
+    script_name = _write_asset("app", ".js", script)
+    style_name = _write_asset("app", ".css", styles)
+
+    html = _read_text(SRC / ENTRY_HTML)
+    for index, name in enumerate(STYLESHEETS):
+        link = re.compile(r'[ \t]*<link rel="stylesheet" href="' + re.escape(name) + r'">\n?')
+        replacement = f'    <link rel="stylesheet" href="/assets/{style_name}">\n' if index == 0 else ""
+        html, count = link.subn(replacement, html)
+        if count != 1:
+            raise ValueError(f"stylesheet link not found in {ENTRY_HTML}: {name}")
+    html, count = re.subn(
+        r'<script type="module" src="' + re.escape(ENTRY_SCRIPT) + r'"></script>',
+        f'<script type="module" src="/assets/{script_name}"></script>',
+        html,
+    )
+    if count != 1:
+        raise ValueError(f"entry script tag not found in {ENTRY_HTML}")
+    (ASSETS / ENTRY_HTML).write_text(html, encoding="utf-8")
+
+    manifest = {
+        "entry": ENTRY_HTML,
+        "script": script_name,
+        "style": style_name,
+        "modules": sorted(graph),
+        # The server compares these sources' mtimes with the manifest to detect a stale bundle.
+        "stylesheets": STYLESHEETS,
+    }
+    with open(ASSETS / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
 
 
 def run_build():
@@ -37,6 +413,7 @@ def run_build():
         "PyGObject",
         "--exclude-module",
         "cefpython3",
+        *[arg for module in HIDDEN_IMPORTS for arg in ("--hidden-import", module)],
         "--add-data",
         "index.html;.",
         "--add-data",
@@ -50,6 +427,8 @@ def run_build():
         "--add-data",
         "favicon.ico;.",
         "--add-data",
+        "assets;assets",
+        "--add-data",
         "modules;modules",
         "--add-data",
         "utils;utils",
@@ -68,11 +447,30 @@ def run_build():
     subprocess.check_call(cmd, cwd=str(SRC))
 
 
+def ensure_build_dependencies():
+    missing = []
+    for module, package in {"PyInstaller": "pyinstaller", **BUNDLED_PACKAGES}.items():
+        try:
+            __import__(module)
+        except Exception:
+            missing.append(package)
+    if missing:
+        subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bundle frontend assets and build the portable app.")
+    parser.add_argument("--assets-only", action="store_true", help="Only regenerate the bundled frontend under assets/")
+    return parser.parse_args()
+
+
 def main():
-    try:
-        import PyInstaller  # noqa: F401
-    except Exception:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
+    args = parse_args()
+    manifest = bundle_frontend()
+    print(f"Bundled {len(manifest['modules'])} modules: assets/{manifest['script']}, assets/{manifest['style']}")
+    if args.assets_only:
+        return
+    ensure_build_dependencies()
     run_build()
     print("Build complete. Output: Gugusay1.0/dist/Twitter/Twitter.exe")
 